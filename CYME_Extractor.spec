@@ -10,7 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['pandas'],  # not used at runtime; keeps the frozen app small and quick to start
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,157 @@
+# Modules/BaseVoltage.py
+from __future__ import annotations
+import math
+import threading
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+import xml.etree.ElementTree as ET
+
+from Modules.General import file_fingerprint, read_xml
+
+# One base-voltage engine for every sheet.
+#
+# Base LN volts are seeded at the Voltage Source page sources (their KVLL),
+# flooded across lines/switches/cables of the same island, and carried across
+# transformers by kVp/kVs (Bus._propagate_ln_via_transformers). Buses nothing
+# reaches get DEFAULT_LN_V. The result only depends on the model file - not on
+# the island context - so it is solved once per file and cached by fingerprint.
+#
+#   bv = base_voltages(path)
+#   bv["ln"]["800"]          -> 14376.02     (V, line-to-neutral)
+#   bv["ll_kv"]["800"]       -> 24.9         (kV, line-to-line)
+#   bv["provenance"]["800"]  -> ("source", "800")
+#                               ("transformer", "transformer 832-888") / ("default", "")
+
+DEFAULT_LN_V = 7200.0
+
+_CACHE_SIZE = 2
+_CACHE: "OrderedDict[tuple, dict]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _ll_kv(ln_v: float) -> float:
+    return (float(ln_v) * math.sqrt(3.0)) / 1000.0
+
+
+def _solve(root: ET.Element, topology: dict) -> dict:
+    # Lazy import: Bus owns the section scan and imports this module
+    from Modules.Bus import (
+        _gather_vs_page_sources_and_kvll,
+        _collect_transformers_with_kvll,
+        _propagate_ln_via_transformers,
+    )
+
+    scan = topology["scan"]
+    adj: Dict[str, Set[str]] = scan["adj"]  # non-transformer branches only
+    known_bases: Set[str] = set(topology["node_phases"])
+
+    # -------- LN voltage assignment by BFS from VS-page sources (no transformers)
+    vs_slack_nodes, kvll_map = _gather_vs_page_sources_and_kvll(root)
+    ln: Dict[str, float] = {}
+    origin: Dict[str, Tuple[str, str]] = {}
+    for src in sorted(vs_slack_nodes):
+        kvll_v = kvll_map.get(src)
+        if kvll_v is None:
+            continue
+        ln_v = kvll_v / (3 ** 0.5)
+        q = deque()
+        visited: Set[str] = {src}
+        if src in adj:
+            q.append(src)
+        while q:
+            u = q.popleft()
+            if u in known_bases and u not in ln:
+                ln[u] = ln_v
+                origin[u] = ("source", src)
+            for v in adj.get(u, ()):
+                if v not in visited:
+                    visited.add(v)
+                    q.append(v)
+        # tag the source itself even if isolated
+        if src in known_bases and src not in ln:
+            ln[src] = ln_v
+            origin[src] = ("source", src)
+
+    # -------- Across transformers (and on downstream of them)
+    xf_pairs = _collect_transformers_with_kvll(root, scan["xf_sections"])
+    conflicts = _propagate_ln_via_transformers(ln, adj, xf_pairs, origin=origin)
+
+    # -------- Unreached buses fall back to the default
+    for node in known_bases:
+        if node not in ln:
+            ln[node] = DEFAULT_LN_V
+            origin[node] = ("default", "")
+
+    ll_kv = {node: _ll_kv(v) for node, v in ln.items()}
+    vals = [round(v, 3) for v in ll_kv.values() if v > 0]
+    default_ll_kv = Counter(vals).most_common(1)[0][0] if vals else _ll_kv(DEFAULT_LN_V)
+
+    return {
+        "ln": ln,
+        "ll_kv": ll_kv,
+        "provenance": origin,
+        "conflicts": conflicts,
+        "default_ln": DEFAULT_LN_V,
+        "default_ll_kv": default_ll_kv,
+    }
+
+
+def _report(bv: dict) -> None:
+    conflicts: List[tuple] = bv["conflicts"]
+    counts = Counter(kind for kind, _ in bv["provenance"].values())
+    print(
+        f"[BaseVoltage] {len(bv['ln'])} buses: {counts.get('source', 0)} from sources, "
+        f"{counts.get('transformer', 0)} via transformers, {counts.get('default', 0)} defaulted "
+        f"({DEFAULT_LN_V:.0f} V LN)"
+    )
+    if conflicts:
+        print(f"[BaseVoltage] {len(conflicts)} base-voltage conflict(s); first assignment kept:")
+        for node, cur, proposed, via in conflicts[:20]:
+            print(f"    - {node}: {cur:.1f} V LN kept, {proposed:.1f} V LN via {via}")
+        if len(conflicts) > 20:
+            print(f"    ... (+{len(conflicts) - 20} more)")
+
+
+def base_voltages(
+    input_path: str | Path,
+    *,
+    root: ET.Element | None = None,
+    topology: dict | None = None,
+) -> dict:
+    """
+    Per-bus base voltages for the model, solved once per file version.
+
+    Returns {"ln": {bus: V LN}, "ll_kv": {bus: kV LL},
+             "provenance": {bus: (kind, origin)}, "conflicts": [...],
+             "default_ln": V, "default_ll_kv": most common LL kV}.
+    Keys are sanitized bus names (no phase suffix). Bus passes the `root` and
+    `topology` it already built so a cold solve does not repeat them.
+    The returned dict is shared; callers must not modify it.
+    """
+    key = file_fingerprint(Path(input_path))
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None:
+            _CACHE.move_to_end(key)
+            return hit
+
+    if root is None:
+        root = read_xml(Path(input_path))
+    if topology is None:
+        from Modules.Bus import _bus_topology
+        topology = _bus_topology(root)
+    bv = _solve(root, topology)
+    _report(bv)
+
+    with _CACHE_LOCK:
+        _CACHE[key] = bv
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return bv
+
+
+def clear_base_voltage_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
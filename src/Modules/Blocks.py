@@ -0,0 +1,127 @@
+# Modules/Blocks.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Shared renderer for the block-template sheets (Load, Line, Transformer, Shunt)
+# and the plain tables (Bus, Switch).
+#
+# Template rules:
+#   - row 1 "Type", rows 2.. links to each block, rows 8-10 the notes
+#   - blocks start at row 11: title (+ "Go to Type List"), header, data rows,
+#     "End of ..." right after the last data row, then ONE empty row
+#
+# Data rows are written with write_row over runs of adjacent columns that share
+# a format (computed once per block), not cell by cell with a format lookup.
+
+FIRST_BLOCK_ROW = 10  # row 11 in Excel
+
+NOTES = (
+    "Default order of blocks and columns after row 11 must not change",
+    "One empty row between End of each block and the next block is mandatory; otherwise, empty rows are NOT allowed",
+)
+
+# One column run: (first col, last col + 1, format, optional). Optional runs are
+# single columns whose None / "" values are left as untouched (unformatted) cells.
+Run = Tuple[int, int, Any, bool]
+
+
+def start_template_sheet(xw, name: str, widths: Sequence[float]) -> Tuple[Any, Dict[str, Any]]:
+    """Add a block-template sheet: widths, 'Type' cell and notes. Returns (ws, formats)."""
+    wb = xw.book
+    ws = wb.add_worksheet(name)
+    xw.sheets[name] = ws
+
+    fmts = {
+        "bold": wb.add_format({"bold": True}),
+        "link": wb.add_format({"font_color": "blue", "underline": 1}),
+        "notes_hdr": wb.add_format({"bold": True, "font_color": "yellow", "bg_color": "#595959", "align": "left"}),
+        "notes_txt": wb.add_format({"font_color": "yellow", "bg_color": "#595959"}),
+        "th": wb.add_format({"bold": True, "bottom": 1}),
+    }
+    for c, w in enumerate(widths):
+        ws.set_column(c, c, w)
+
+    ws.write(0, 0, "Type", fmts["bold"])
+    ws.merge_range(7, 0, 7, 7, "Important notes:", fmts["notes_hdr"])
+    ws.merge_range(8, 0, 8, 7, NOTES[0], fmts["notes_txt"])
+    ws.merge_range(9, 0, 9, 7, NOTES[1], fmts["notes_txt"])
+    return ws, fmts
+
+
+def column_runs(col_formats: Sequence[Any], optional: Sequence[int] = ()) -> List[Run]:
+    """
+    Group adjacent columns with the same format. Columns listed in `optional`
+    may hold None / "" (left blank) and get a run of their own.
+    """
+    opt = set(optional)
+    runs: List[Run] = []
+    for c, fmt in enumerate(col_formats):
+        if c in opt:
+            runs.append((c, c + 1, fmt, True))
+        elif runs and not runs[-1][3] and runs[-1][2] is fmt:
+            c0, _c1, _f, _o = runs[-1]
+            runs[-1] = (c0, c + 1, fmt, False)
+        else:
+            runs.append((c, c + 1, fmt, False))
+    return runs
+
+
+def write_rows(ws, first_row: int, rows: Sequence[Sequence[Any]], runs: Sequence[Run]) -> int:
+    """Write data rows run by run; returns the row after the last one written."""
+    r = first_row
+    write_row = ws.write_row
+    for row in rows:
+        for c0, c1, fmt, optional in runs:
+            if optional:
+                v = row[c0]
+                if v is None or v == "":
+                    continue
+                ws.write(r, c0, v, fmt)
+            elif c1 - c0 == 1:
+                ws.write(r, c0, row[c0], fmt)
+            else:
+                write_row(r, c0, row[c0:c1], fmt)
+        r += 1
+    return r
+
+
+def write_block(
+    ws,
+    fmts: Dict[str, Any],
+    sheet: str,
+    top: int,
+    title: str,
+    header: Sequence[str],
+    rows: Sequence[Sequence[Any]] = (),
+    runs: Sequence[Run] = (),
+    end_text: Optional[str] = None,
+    *,
+    title_to: int = 1,
+    end_to: int = 1,
+) -> Dict[str, int]:
+    """
+    Title (merged A..title_to, "Go to Type List" right after), header, rows and
+    "End of <title>" (merged A..end_to). Returns the anchors
+    {"t", "h", "first", "e", "next"}; "next" leaves the one mandatory empty row.
+    """
+    t, h, first = top, top + 1, top + 2
+    ws.merge_range(t, 0, t, title_to, title, fmts["bold"])
+    ws.write_url(t, title_to + 1, f"internal:'{sheet}'!A1", fmts["link"], "Go to Type List")
+    ws.write_row(h, 0, list(header), fmts["th"])
+    e = write_rows(ws, first, rows, runs)
+    ws.merge_range(e, 0, e, end_to, end_text or f"End of {title}")
+    return {"t": t, "h": h, "first": first, "e": e, "next": e + 2}
+
+
+def write_type_link(ws, fmts: Dict[str, Any], sheet: str, row: int, col: int,
+                    label: str, block: Dict[str, int], last_col: str) -> None:
+    """Link in the 'Type' list selecting header..end of a block."""
+    h, e = block["h"], block["e"]
+    ws.write_url(row, col, f"internal:'{sheet}'!A{h+1}:{last_col}{max(h+1, e+1)}", fmts["link"], label)
+
+
+def write_table(ws, header: Sequence[str], header_fmt: Any, rows: Sequence[Sequence[Any]],
+                runs: Sequence[Run]) -> int:
+    """Plain table: header in row 1, data from row 2. Returns the next free row."""
+    ws.write_row(0, 0, list(header), header_fmt)
+    return write_rows(ws, 1, rows, runs)
@@ -5,8 +5,12 @@ from typing import Dict, List, Set, Tuple
 import xml.etree.ElementTree as ET
 
 # replace with
-from Modules.General import safe_name, get_island_context
+from Modules.General import safe_name, get_island_context, read_xml
 from Modules.IslandFilter import is_bus_allowed, allowed_buses
+from Modules.BaseVoltage import DEFAULT_LN_V, base_voltages
+from Modules.EquipmentDB import equipment_index
+from Modules.Reduction import removed_buses
+from Modules.Blocks import column_runs, write_table
 # (optional robust fallback for standalone use)
 try:
     from Modules.General import get_island_context  # already imported above; keeps Pylance happy
@@ -31,34 +35,37 @@ def _fnum(x: str | None) -> float | None:
         return None
 
 
-def _collect_transformers_with_kvll(root: ET.Element) -> list[tuple[str, str, float | None, float | None]]:
+def _collect_transformers_with_kvll(
+    root: ET.Element,
+    xf_sections: List[Tuple[str, str, ET.Element]] | None = None,
+) -> list[tuple[str, str, float | None, float | None]]:
     """
     Returns list of (from_bus, to_bus, KVLL_primary_volts, KVLL_secondary_volts).
     Uses TransformerDB when available; falls back to section fields if present.
+    `xf_sections` ([(from, to, <Transformer>)] from _scan_sections) avoids a re-scan.
     """
     # Map EquipmentID/DeviceID -> (kvp_ll, kvs_ll) in volts (LL)
     db: dict[str, tuple[float | None, float | None]] = {}
-    for tdb in root.findall(".//TransformerDB"):
-        eid = safe_name(tdb.findtext("EquipmentID"))
-        kvp = _fnum(tdb.findtext("PrimaryVoltage")) or _fnum(tdb.findtext("PrimaryKV"))
-        kvs = _fnum(tdb.findtext("SecondaryVoltage")) or _fnum(tdb.findtext("SecondaryKV"))
-        if kvp is not None:
-            kvp *= 1000.0
-        if kvs is not None:
-            kvs *= 1000.0
+    for eid_raw, rec in equipment_index(root)["transformer"].items():
+        eid = safe_name(eid_raw)
+        kvp, kvs = rec["kvp"], rec["kvs"]
         if eid:
-            db[eid] = (kvp, kvs)
+            db[eid] = (kvp * 1000.0 if kvp is not None else None,
+                       kvs * 1000.0 if kvs is not None else None)
+
+    if xf_sections is None:
+        xf_sections = []
+        for sec in root.findall(".//Sections/Section"):
+            xf = sec.find(".//Devices/Transformer")
+            if xf is None:
+                continue
+            fb = safe_name(sec.findtext("./FromNodeID"))
+            tb = safe_name(sec.findtext("./ToNodeID"))
+            if fb and tb:
+                xf_sections.append((fb, tb, xf))
 
     pairs: list[tuple[str, str, float | None, float | None]] = []
-    for sec in root.findall(".//Sections/Section"):
-        xf = sec.find(".//Devices/Transformer")
-        if xf is None:
-            continue
-        fb = safe_name(sec.findtext("./FromNodeID"))
-        tb = safe_name(sec.findtext("./ToNodeID"))
-        if not fb or not tb:
-            continue
-
+    for fb, tb, xf in xf_sections:
         dev_id = safe_name(xf.findtext("DeviceID"))
         kvp_ll = kvs_ll = None
 
@@ -80,74 +87,74 @@ def _collect_transformers_with_kvll(root: ET.Element) -> list[tuple[str, str, fl
     return pairs
 
 
+def _close(a: float, b: float, rel: float = 0.06) -> bool:
+    m = max(abs(a), abs(b), 1.0)
+    return abs(a - b) / m <= rel
+
+
 def _propagate_ln_via_transformers(
     hv_ln_assign: dict[str, float],
     adj_no_xfmr: dict[str, set[str]],
     xf_pairs: list[tuple[str, str, float | None, float | None]],
-) -> None:
+    origin: dict[str, tuple[str, str]] | None = None,
+) -> list[tuple[str, float, float, str]]:
     """
-    Fill in LN volts on the far side of transformers, then flood across the
-    non-transformer graph. Repeat until no changes (handles cascaded XFRs).
+    Fill in LN volts beyond transformers in ONE traversal of the combined graph:
+    line/switch edges carry ratio 1, transformer edges carry kVp/kVs. The side
+    of a transformer reached first decides its orientation: if it looks like
+    the primary (or not like the secondary) the far side gets kVs, else kVp.
+
+    Nodes already in hv_ln_assign are the seeds. Returns conflicts found along
+    the way as (node, assigned_ln, proposed_ln, via) - the first assignment wins.
+    When `origin` is given, new nodes are recorded as ("transformer", label) of
+    the transformer their value came through.
     """
     import math
-    def close(a: float, b: float, rel: float = 0.06) -> bool:
-        m = max(abs(a), abs(b), 1.0)
-        return abs(a - b) / m <= rel
-
-    def flood(start_node: str, ln_val: float) -> None:
-        # Push the assigned LN across NO-TRANSFORMER edges
-        stack = [start_node]
-        while stack:
-            u = stack.pop()
-            for v in adj_no_xfmr.get(u, ()):
-                if v not in hv_ln_assign:
-                    hv_ln_assign[v] = ln_val
-                    stack.append(v)
-
-    changed = True
-    while changed:
-        changed = False
-        for fb, tb, kvp_ll, kvs_ll in xf_pairs:
-            lf = hv_ln_assign.get(fb)
-            lt = hv_ln_assign.get(tb)
-            # Need at least one side assigned and both KVLLs to decide orientation
-            if (lf is None and lt is None) or (kvp_ll is None or kvs_ll is None):
-                continue
-
-            kvp_ln = kvp_ll / math.sqrt(3.0) if kvp_ll is not None else None
-            kvs_ln = kvs_ll / math.sqrt(3.0) if kvs_ll is not None else None
-            if kvp_ln is None or kvs_ln is None:
-                continue
-
-            # If From side looks like primary, set To as secondary (and propagate)
-            if lf is not None and lt is None and (close(lf, kvp_ln) or not close(lf, kvs_ln)):
-                hv_ln_assign[tb] = kvs_ln
-                flood(tb, kvs_ln)
-                changed = True
-                continue
-
-            # If From side looks like secondary, set To as primary
-            if lf is not None and lt is None and close(lf, kvs_ln):
-                hv_ln_assign[tb] = kvp_ln
-                flood(tb, kvp_ln)
-                changed = True
-                continue
-
-            # Mirror: To side known, From side unknown
-            if lt is not None and lf is None and (close(lt, kvp_ln) or not close(lt, kvs_ln)):
-                hv_ln_assign[fb] = kvs_ln
-                flood(fb, kvs_ln)
-                changed = True
-                continue
+    from collections import deque
 
-            if lt is not None and lf is None and close(lt, kvs_ln):
-                hv_ln_assign[fb] = kvp_ln
-                flood(fb, kvp_ln)
-                changed = True
-                continue
+    # transformer adjacency: node -> [(other, kvp_ln, kvs_ln, label)]
+    xf_adj: dict[str, list[tuple[str, float, float, str]]] = {}
+    for fb, tb, kvp_ll, kvs_ll in xf_pairs:
+        if kvp_ll is None or kvs_ll is None:
+            continue  # need both KVLLs to decide orientation
+        kvp_ln = kvp_ll / math.sqrt(3.0)
+        kvs_ln = kvs_ll / math.sqrt(3.0)
+        label = f"transformer {fb}-{tb}"
+        xf_adj.setdefault(fb, []).append((tb, kvp_ln, kvs_ln, label))
+        xf_adj.setdefault(tb, []).append((fb, kvp_ln, kvs_ln, label))
+
+    conflicts: list[tuple[str, float, float, str]] = []
+    seen_conflict: set[tuple[str, str]] = set()
+
+    def _assign(v: str, val: float, via: str, src: tuple[str, str]) -> None:
+        cur = hv_ln_assign.get(v)
+        if cur is None:
+            hv_ln_assign[v] = val
+            if origin is not None:
+                origin[v] = src
+            q.append(v)
+        elif not _close(cur, val) and (v, via) not in seen_conflict:
+            seen_conflict.add((v, via))
+            conflicts.append((v, cur, val, via))
+
+    q = deque(hv_ln_assign.keys())
+    seeds = set(q)
+    while q:
+        u = q.popleft()
+        val = hv_ln_assign[u]
+        # Seed islands were already filled from their sources (known buses only);
+        # only nodes assigned here flood across lines/switches.
+        if u not in seeds:
+            src = origin.get(u, ("transformer", "")) if origin is not None else ("transformer", "")
+            for v in adj_no_xfmr.get(u, ()):
+                _assign(v, val, f"line from {u}", src)
+        for v, kvp_ln, kvs_ln, label in xf_adj.get(u, ()):
+            far = kvs_ln if (_close(val, kvp_ln) or not _close(val, kvs_ln)) else kvp_ln
+            _assign(v, far, label, ("transformer", label))
+    return conflicts
 
 def _read_xml(path: Path) -> ET.Element:
-    return ET.fromstring(path.read_text(encoding="utf-8", errors="ignore"))
+    return read_xml(path)
 
 
 def _phase_set(s: str | None) -> Set[str]:
@@ -182,156 +189,123 @@ def _local_pseudos(sec: ET.Element) -> Set[str]:
                 pseudos.add(di)
     return pseudos
 
-def _gather_vs_page_sources_and_kvll(root: ET.Element) -> tuple[set[str], dict[str, float]]:
-    """
-    Return ({source_nodes}, {node -> KVLL_volts}) for sources that WILL SHOW
-    on the Voltage Source page:
-      - Topo where NetworkType == 'Substation'
-      - EquivalentMode != '1'
-      - Source must have an EquivalentSource block
-    """
-    nodes: set[str] = set()
-    kvll_map: dict[str, float] = {}
-    for topo in root.findall(".//Topo"):
-        ntype = (topo.findtext("NetworkType") or "").strip().lower()
-        eq_mode = (topo.findtext("EquivalentMode") or "").strip()
-        if ntype != "substation" or eq_mode == "1":
-            continue
-        srcs = topo.find("./Sources")
-        if srcs is None:
-            continue
-        for src in srcs.findall("./Source"):
-            nid = safe_name(src.findtext("SourceNodeID"))
-            eq = src.find("./EquivalentSourceModels/EquivalentSourceModel/EquivalentSource")
-            if not nid or eq is None:
-                continue
-            nodes.add(nid)
-            kvll_txt = eq.findtext("KVLL")
-            if kvll_txt not in (None, ""):
-                try:
-                    kvll_map[nid] = float(kvll_txt) * 1000.0  # kV -> V
-                except Exception:
-                    pass
-    return nodes, kvll_map
-
-def _parse_bus_rows(input_path: Path) -> List[Dict]:
-    """
-    Build rows for the Bus sheet.
+# Devices that connect From <-> To (endpoints/degree counting)
+BRANCH_TAGS = frozenset({
+    "OverheadLine", "OverheadLineUnbalanced", "OverheadByPhase",
+    "Underground", "UndergroundCable", "UndergroundCableUnbalanced", "UndergroundByPhase", "Cable",
+    "Transformer",
+    "Switch", "Fuse", "Recloser", "Breaker", "Sectionalizer", "Isolator",
+    "Miscellaneous",  # allow endpoints/degree counting across meter/LA, etc.
+})
+# Edges for voltage propagation: **exclude transformers** (Miscellaneous = conducting link)
+BRANCH_NO_XFMR_TAGS = BRANCH_TAGS - {"Transformer"}
+LOAD_DEVICE_TAGS = frozenset({"SpotLoad", "ShuntCapacitor", "ShuntReactor"})
 
-    Columns:
-      Bus | Base Voltage (V) | Initial Vmag | Unit | Angle | Type
 
-    Rules:
-      - Buses with no ACTIVE connections are prefixed with '//' (commented out).
-      - Only sources that appear on the Voltage Source page (Topo Substation & not EquivalentMode=1)
-        are marked SLACK.
-      - Islands without sources are commented via bad_buses in the island context.
-      - Base LN voltage is propagated from each VS-page source through the network
-        WITHOUT crossing transformers; i.e., KV only changes at a transformer.
+def _scan_sections(root: ET.Element) -> dict:
     """
-    root = _read_xml(Path(input_path))
-
-    # angles for A/B/C (display only)
-    phase_ang = {"A": 0.0, "B": -120.0, "C": 120.0}
-
-    # -------- source set & kVLL (from Voltage Source page only)
-    vs_slack_nodes, kvll_map = _gather_vs_page_sources_and_kvll(root)
-
-    # -------- PASS 1: scan sections (same pseudo filtering you had)
-    BRANCH_TAGS = [
-        "OverheadLine", "OverheadLineUnbalanced", "OverheadByPhase",
-        "Underground", "UndergroundCable", "UndergroundCableUnbalanced", "UndergroundByPhase", "Cable",
-        "Transformer",
-        "Switch", "Fuse", "Recloser", "Breaker", "Sectionalizer", "Isolator",
-        "Miscellaneous",  # NEW: allow endpoints/degree counting across meter/LA, etc.
-    ]
-    # Edges for voltage propagation: **exclude transformers**
-    BRANCH_NO_XFMR_TAGS = [
-        "OverheadLine", "OverheadLineUnbalanced", "OverheadByPhase",
-        "Underground", "UndergroundCable", "UndergroundCableUnbalanced", "UndergroundByPhase", "Cable",
-        "Switch", "Fuse", "Recloser", "Breaker", "Sectionalizer", "Isolator",
-        "Miscellaneous",  # NEW: treat as a conducting link (no voltage change)
-    ]
-
+    One sweep over <Section> collecting everything the Bus rules need:
+      records                     [(from, to, phase, has_branch, has_load_device)] (sanitized IDs)
+      branch_endpoints, all_from_nodes, device_terminal_candidates,
+      from_count, to_count_nonlocal, local_pseudo_to_candidates,
+      xf_endpoints, xf_sections   [(from, to, <Transformer>)]
+      adj                         non-transformer branch adjacency
+    """
+    records: List[Tuple[str, str, str, bool, bool]] = []
     branch_endpoints: Set[str] = set()
     all_from_nodes: Set[str] = set()
     device_terminal_candidates: Set[str] = set()
-
     from_count: Dict[str, int] = {}
     to_count_nonlocal: Dict[str, int] = {}
     local_pseudo_to_candidates: Set[str] = set()
-
-    raw_degree: Dict[str, int] = {}   # <-- ADD THIS LINE
     xf_endpoints: Set[str] = set()
-
-    # adjacency for BFS (non-transformer branches only)
+    xf_sections: List[Tuple[str, str, ET.Element]] = []
     adj: Dict[str, Set[str]] = {}
 
-    def _add_edge(a: str, b: str) -> None:
-        if not a or not b:
-            return
-        adj.setdefault(a, set()).add(b)
-        adj.setdefault(b, set()).add(a)
+    # == root.findall(".//Sections/Section"), but Element.iter runs in C
+    sections = (sec for holder in root.iter("Sections") for sec in holder.findall("Section"))
+    for sec in sections:
+        f = safe_name(sec.findtext("./FromNodeID"))
+        t = safe_name(sec.findtext("./ToNodeID"))
+        ph = (sec.findtext("./Phase") or "ABC").strip().upper()
 
-    for sec in root.findall(".//Sections/Section"):
-        f_raw = (sec.findtext("./FromNodeID") or "").strip()
-        t_raw = (sec.findtext("./ToNodeID") or "").strip()
-        f = safe_name(f_raw)
-        t = safe_name(t_raw)
+        devs = sec.find("./Devices")
+        tags = {d.tag for d in devs} if devs is not None else set()
 
-        if sec.find(".//Devices/Transformer") is not None:
+        if "Transformer" in tags:
             if f:
                 xf_endpoints.add(f)
             if t:
                 xf_endpoints.add(t)
+            if f and t:
+                xf_sections.append((f, t, devs.find("Transformer")))
 
         if f:
             all_from_nodes.add(f)
             from_count[f] = from_count.get(f, 0) + 1
 
-        has_branch = _has_any(sec, BRANCH_TAGS)
-        has_branch_no_xfmr = _has_any(sec, BRANCH_NO_XFMR_TAGS)
-        has_spot = sec.find(".//Devices/SpotLoad") is not None
-        has_shunt = (
-            sec.find(".//Devices/ShuntCapacitor") is not None
-            or sec.find(".//Devices/ShuntReactor") is not None
-        )
+        has_branch = not tags.isdisjoint(BRANCH_TAGS)
+        has_load_dev = not tags.isdisjoint(LOAD_DEVICE_TAGS)
 
         if has_branch:
             if f:
                 branch_endpoints.add(f)
-                raw_degree[f] = raw_degree.get(f, 0) + 1
             if t:
                 branch_endpoints.add(t)
-                raw_degree[t] = raw_degree.get(t, 0) + 1
-            if t:
-                lp = _local_pseudos(sec)
-                if t in lp:
+                if t in _local_pseudos(sec):
                     local_pseudo_to_candidates.add(t)
                 else:
                     to_count_nonlocal[t] = to_count_nonlocal.get(t, 0) + 1
 
-        if has_spot or has_shunt:
-            if f:
-                raw_degree[f] = raw_degree.get(f, 0) + 1
-            if t:
-                device_terminal_candidates.add(t)
+        if has_load_dev and t:
+            device_terminal_candidates.add(t)
 
         # Build **non-transformer** adjacency
-        if has_branch_no_xfmr and f and t:
-            _add_edge(f, t)
+        if f and t and not tags.isdisjoint(BRANCH_NO_XFMR_TAGS):
+            adj.setdefault(f, set()).add(t)
+            adj.setdefault(t, set()).add(f)
+
+        records.append((f, t, ph, has_branch, has_load_dev))
+
+    return {
+        "records": records,
+        "branch_endpoints": branch_endpoints,
+        "all_from_nodes": all_from_nodes,
+        "device_terminal_candidates": device_terminal_candidates,
+        "from_count": from_count,
+        "to_count_nonlocal": to_count_nonlocal,
+        "local_pseudo_to_candidates": local_pseudo_to_candidates,
+        "xf_endpoints": xf_endpoints,
+        "xf_sections": xf_sections,
+        "adj": adj,
+    }
+
+
+def _bus_topology(root: ET.Element) -> dict:
+    """
+    Island-independent part of the Bus rules:
+      scan           _scan_sections(root)
+      node_phases    {node: {phases}} for real buses (terminal exclusions applied)
+      active_degree  {node: active branch/load connections}
+    """
+    scan = _scan_sections(root)
+    records = scan["records"]
+    xf_endpoints: Set[str] = scan["xf_endpoints"]
+    from_count: Dict[str, int] = scan["from_count"]
+    to_count_nonlocal: Dict[str, int] = scan["to_count_nonlocal"]
 
     terminal_exclusions_1: Set[str] = {
-        n for n in device_terminal_candidates if n not in branch_endpoints and n not in all_from_nodes
+        n for n in scan["device_terminal_candidates"]
+        if n not in scan["branch_endpoints"] and n not in scan["all_from_nodes"]
     }
     terminal_exclusions_2: Set[str] = {
-        n for n in local_pseudo_to_candidates if from_count.get(n, 0) == 0 and to_count_nonlocal.get(n, 0) == 0
+        n for n in scan["local_pseudo_to_candidates"]
+        if from_count.get(n, 0) == 0 and to_count_nonlocal.get(n, 0) == 0
     }
     terminal_exclusions: Set[str] = (terminal_exclusions_1 | terminal_exclusions_2) - xf_endpoints
 
-    # -------- PASS 2: node -> phases map (with exclusions)
-    def _is_real_bus(nid: str | None) -> bool:
-        nid = safe_name(nid)
+    # -------- node -> phases map (with exclusions)
+    def _is_real_bus(nid: str) -> bool:
         if not nid:
             return False
         if nid in xf_endpoints:  # always keep transformer ends
@@ -342,26 +316,14 @@ def _parse_bus_rows(input_path: Path) -> List[Dict]:
 
     node_phases: Dict[str, Set[str]] = {}
 
-    def _add(nid: str | None, pstr: str) -> None:
-        nid = safe_name(nid)
+    def _add(nid: str, pstr: str) -> None:
         if not _is_real_bus(nid):
             return
         s = node_phases.setdefault(nid, set())
         s |= _phase_set(pstr)
 
-    for sec in root.findall(".//Sections/Section"):
-        ph = (sec.findtext("./Phase") or "ABC").strip().upper()
-        f = sec.findtext("./FromNodeID")
-        t = sec.findtext("./ToNodeID")
-
-        has_branch = _has_any(sec, BRANCH_TAGS)
-        has_spot = sec.find(".//Devices/SpotLoad") is not None
-        has_shunt = (
-            sec.find(".//Devices/ShuntCapacitor") is not None
-            or sec.find(".//Devices/ShuntReactor") is not None
-        )
-
-        if has_spot or has_shunt:
+    for f, t, ph, has_branch, has_load_dev in records:
+        if has_load_dev:
             _add(f, ph)
             continue
 
@@ -374,58 +336,83 @@ def _parse_bus_rows(input_path: Path) -> List[Dict]:
 
     known_bases: Set[str] = set(node_phases.keys())
 
-    # -------- PASS 3: ACTIVE usage (for commenting rules)
+    # -------- ACTIVE usage (for commenting rules)
     active_degree: Dict[str, int] = {}
-    for sec in root.findall(".//Sections/Section"):
-        f = safe_name(sec.findtext("./FromNodeID"))
-        t = safe_name(sec.findtext("./ToNodeID"))
-
-        has_branch = _has_any(sec, BRANCH_TAGS)
-        has_spot   = sec.find(".//Devices/SpotLoad") is not None
-        has_shunt  = (
-            sec.find(".//Devices/ShuntCapacitor") is not None
-            or sec.find(".//Devices/ShuntReactor") is not None
-        )
-
+    for f, t, _ph, has_branch, has_load_dev in records:
         if has_branch:
             if f and t and (f in known_bases) and (t in known_bases):
                 active_degree[f] = active_degree.get(f, 0) + 1
                 active_degree[t] = active_degree.get(t, 0) + 1
 
-        if has_spot or has_shunt:
+        if has_load_dev:
             if f and (f in known_bases):
                 active_degree[f] = active_degree.get(f, 0) + 1
 
-    # -------- LN voltage assignment by BFS from VS-page sources (no transformers)
-    hv_ln_assign: Dict[str, float] = {}
-    from collections import deque
+    return {"scan": scan, "node_phases": node_phases, "active_degree": active_degree}
 
-    for src in vs_slack_nodes:
-        kvll_v = kvll_map.get(src)
-        if kvll_v is None:
+
+def _gather_vs_page_sources_and_kvll(root: ET.Element) -> tuple[set[str], dict[str, float]]:
+    """
+    Return ({source_nodes}, {node -> KVLL_volts}) for sources that WILL SHOW
+    on the Voltage Source page:
+      - Topo where NetworkType == 'Substation'
+      - EquivalentMode != '1'
+      - Source must have an EquivalentSource block
+    """
+    nodes: set[str] = set()
+    kvll_map: dict[str, float] = {}
+    for topo in root.iter("Topo"):
+        ntype = (topo.findtext("NetworkType") or "").strip().lower()
+        eq_mode = (topo.findtext("EquivalentMode") or "").strip()
+        if ntype != "substation" or eq_mode == "1":
             continue
-        ln_v = kvll_v / (3 ** 0.5)
-        q = deque()
-        visited: Set[str] = set()
-        if src in adj:
-            q.append(src)
-            visited.add(src)
-        else:
-            visited.add(src)
-        while q:
-            u = q.popleft()
-            if u in known_bases and u not in hv_ln_assign:
-                hv_ln_assign[u] = ln_v
-            for v in adj.get(u, ()):
-                if v not in visited:
-                    visited.add(v)
-                    q.append(v)
-        # tag the source itself even if isolated
-        if src in known_bases and src not in hv_ln_assign:
-            hv_ln_assign[src] = ln_v
-            
-    xf_pairs = _collect_transformers_with_kvll(root)
-    _propagate_ln_via_transformers(hv_ln_assign, adj, xf_pairs)
+        srcs = topo.find("./Sources")
+        if srcs is None:
+            continue
+        for src in srcs.findall("./Source"):
+            nid = safe_name(src.findtext("SourceNodeID"))
+            eq = src.find("./EquivalentSourceModels/EquivalentSourceModel/EquivalentSource")
+            if not nid or eq is None:
+                continue
+            nodes.add(nid)
+            kvll_txt = eq.findtext("KVLL")
+            if kvll_txt not in (None, ""):
+                try:
+                    kvll_map[nid] = float(kvll_txt) * 1000.0  # kV -> V
+                except Exception:
+                    pass
+    return nodes, kvll_map
+
+def _parse_bus_rows(input_path: Path) -> List[Dict]:
+    """
+    Build rows for the Bus sheet.
+
+    Columns:
+      Bus | Base Voltage (V) | Initial Vmag | Unit | Angle | Type
+
+    Rules:
+      - Buses with no ACTIVE connections are prefixed with '//' (commented out).
+      - Only sources that appear on the Voltage Source page (Topo Substation & not EquivalentMode=1)
+        are marked SLACK.
+      - Islands without sources are commented via bad_buses in the island context.
+      - Base LN voltage comes from Modules.BaseVoltage (propagated from each VS-page
+        source; KV only changes at a transformer).
+    """
+    root = _read_xml(Path(input_path))
+
+    # angles for A/B/C (display only)
+    phase_ang = {"A": 0.0, "B": -120.0, "C": 120.0}
+
+    # -------- Sections, exclusion rules, phases and active usage (island independent)
+    topo = _bus_topology(root)
+    scan = topo["scan"]
+    records = scan["records"]
+    adj: Dict[str, Set[str]] = scan["adj"]  # non-transformer branches only
+    node_phases: Dict[str, Set[str]] = topo["node_phases"]
+    active_degree: Dict[str, int] = topo["active_degree"]
+
+    # -------- Base LN voltages (shared engine; solved once per model)
+    hv_ln_assign: Dict[str, float] = base_voltages(input_path, root=root, topology=topo)["ln"]
 
     # -------- Expand kept buses across non-transformer branches
     # Include buses reachable via lines/cables/switches from allowed islands,
@@ -451,7 +438,7 @@ def _parse_bus_rows(input_path: Path) -> List[Dict]:
     # Build node -> (KVLL, OperatingVoltage1..3 LN, OperatingAngle1..3) and per-phase p.u.
     node_oper_mag: Dict[str, Dict[str, float]] = {}
     node_oper_pu: Dict[str, Dict[str, float]] = {}
-    for topo in root.findall(".//Topo"):
+    for topo in root.iter("Topo"):
         ntype = (topo.findtext("NetworkType") or "").strip().lower()
         eq_mode = (topo.findtext("EquivalentMode") or "").strip()
         if ntype != "substation" or eq_mode == "1":
@@ -536,12 +523,10 @@ def _parse_bus_rows(input_path: Path) -> List[Dict]:
     # but this node would be filtered out by island policy. Ensures no "line to nothing".
     allowed_set = set(allowed_buses())
     boundary_keep: Set[str] = set()
-    for sec in root.findall(".//Sections/Section"):
-        f = safe_name(sec.findtext("./FromNodeID"))
-        t = safe_name(sec.findtext("./ToNodeID"))
+    for f, t, _ph, has_branch, _ld in records:
         if not f or not t:
             continue
-        if not _has_any(sec, BRANCH_TAGS):
+        if not has_branch:
             continue
         f_allowed = f in allowed_set
         t_allowed = t in allowed_set
@@ -550,11 +535,16 @@ def _parse_bus_rows(input_path: Path) -> List[Dict]:
         elif t_allowed and not f_allowed:
             boundary_keep.add(f)
 
+    # Internal buses of merged line chains (optional reduction) are not written at all
+    reduced_out = removed_buses(input_path)
+
     rows: List[Dict] = []
     for node in sorted(node_phases):
         # Keep only buses that are allowed by the island filter
         if not is_bus_allowed(node) and node not in boundary_keep and node not in expanded_keep:
             continue
+        if node in reduced_out:
+            continue
         island = bus_to_island.get(node)
         is_in_bad_island = node in bad_buses
         is_active = active_degree.get(node, 0) > 0
@@ -566,8 +556,8 @@ def _parse_bus_rows(input_path: Path) -> List[Dict]:
         else:
             bus_type = "PQ"
 
-        # per-node base LN volts: use BFS assignment; if not assigned, default (e.g., 7.2 kV LN)
-        node_ln_v = hv_ln_assign.get(node, 7200.0)
+        # per-node base LN volts (unreached buses already carry the 7.2 kV LN default)
+        node_ln_v = hv_ln_assign.get(node, DEFAULT_LN_V)
 
         for ph in sorted(node_phases[node], key=pkey):
             bus_name = f"{node}_{ph.lower()}"
@@ -622,13 +612,10 @@ def write_bus_sheet(xw, input_path: Path) -> None:
     ws.set_column(3, 3, 8)
     ws.set_column(4, 5, 10)
 
-    ws.write_row(0, 0, ["Bus", "Base Voltage (V)", "Initial Vmag", "Unit", "Angle", "Type"], hdr)
-    r = 1
-    for row in rows:
-        ws.write(r, 0, row["Bus"])
-        ws.write_number(r, 1, float(row["Base Voltage (V)"]), num0)
-        ws.write_number(r, 2, float(row["Initial Vmag"]), num0)
-        ws.write(r, 3, row["Unit"])
-        ws.write_number(r, 4, float(row["Angle"]), num2)
-        ws.write(r, 5, row["Type"])
-        r += 1
+    table = [
+        (row["Bus"], float(row["Base Voltage (V)"]), float(row["Initial Vmag"]),
+         row["Unit"], float(row["Angle"]), row["Type"])
+        for row in rows
+    ]
+    write_table(ws, ["Bus", "Base Voltage (V)", "Initial Vmag", "Unit", "Angle", "Type"], hdr, table,
+                column_runs([None, num0, num0, None, num2, None]))
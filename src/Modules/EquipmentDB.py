@@ -0,0 +1,154 @@
+# Modules/EquipmentDB.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import xml.etree.ElementTree as ET
+
+# Equipment library index.
+#
+# CYME keeps every equipment record (<TransformerDB>, <OverheadLineUnbalancedDB>,
+# <RegulatorDB>, ...) as a child of an <EquipmentDBs> container. This module
+# visits only those containers, reads each record's fields once, and serves
+# typed views to the sheet writers:
+#
+#   idx = equipment_index(root)
+#   idx["line"]["LINE601"]       -> {"SelfResistanceA": 0.12, ..., "ZeroSequenceReactance": 0.0}
+#   idx["transformer"]["XFM-1"]  -> {"kvp": 24.9, "kvs": 4.16, "kva": 500.0, ...}
+#   idx["regulator"]["REG1"]     -> {"kvln": 14.376, "kva": 1000.0, "ntaps": 32.0, ...}
+#   idx["by_tag"]["SwitchDB"]["S1"] -> {"Amps": "600", ...}   (raw text fields)
+#
+# Keys are EquipmentID as written in the file (stripped, not sanitized).
+# Later records with the same ID replace earlier ones, as before.
+
+# Line/cable per-length fields (R/X per km, B in uS/km)
+LINE_PER_PHASE_KEYS = (
+    "SelfResistanceA", "SelfResistanceB", "SelfResistanceC",
+    "SelfReactanceA",  "SelfReactanceB",  "SelfReactanceC",
+    "ShuntSusceptanceA", "ShuntSusceptanceB", "ShuntSusceptanceC",
+    "MutualResistanceAB", "MutualResistanceBC", "MutualResistanceCA",
+    "MutualReactanceAB",  "MutualReactanceBC",  "MutualReactanceCA",
+    "MutualShuntSusceptanceAB", "MutualShuntSusceptanceBC", "MutualShuntSusceptanceCA",
+)
+LINE_SEQ_KEYS = (
+    "PositiveSequenceResistance", "PositiveSequenceReactance", "PositiveSequenceShuntSusceptance",
+    "ZeroSequenceResistance",     "ZeroSequenceReactance",     "ZeroSequenceShuntSusceptance",
+)
+
+# Indexes keyed by the parsed tree (read_xml keeps a tree alive while cached)
+_INDEX_CACHE_SIZE = 2
+_INDEX_CACHE: "OrderedDict[int, tuple[ET.Element, dict]]" = OrderedDict()
+_INDEX_LOCK = threading.Lock()
+
+
+def _num(x: Optional[str]) -> Optional[float]:
+    """XML text -> float; None when missing/blank/unparseable. Tolerates '330deg'."""
+    try:
+        if x is None:
+            return None
+        s = x.strip()
+        if not s:
+            return None
+        if s.lower().endswith("deg"):
+            s = s[:-3]
+        return float(s)
+    except Exception:
+        return None
+
+
+def _fields(rec: ET.Element) -> Dict[str, str]:
+    """Child tag -> text (first occurrence wins, like findtext)."""
+    out: Dict[str, str] = {}
+    for c in rec:
+        if c.tag not in out:
+            out[c.tag] = c.text or ""
+    return out
+
+
+def _line_record(fields: Dict[str, str]) -> Optional[Dict[str, float]]:
+    """Per-length line/cable values (0.0 when absent); None if the record has none."""
+    vals: Dict[str, float] = {}
+    has_any = False
+    for k in LINE_PER_PHASE_KEYS + LINE_SEQ_KEYS:
+        v = _num(fields.get(k)) or 0.0
+        vals[k] = v
+        has_any = has_any or (v != 0.0)
+    return vals if has_any else None
+
+
+def _transformer_record(rec: ET.Element, fields: Dict[str, str]) -> Dict[str, Any]:
+    """TransformerDB: voltages in kV LL, rating in kVA; LTC data from <LoadTapChanger>."""
+    ltc = rec.find("./LoadTapChanger")
+    ltc_fields = _fields(ltc) if ltc is not None else {}
+    return {
+        "kvp": _num(fields.get("PrimaryVoltage")) or _num(fields.get("PrimaryKV")),
+        "kvs": _num(fields.get("SecondaryVoltage")) or _num(fields.get("SecondaryKV")),
+        "kva": _num(fields.get("NominalRatingKVA")) or _num(fields.get("NominalRating")),
+        "z_pct": _num(fields.get("PositiveSequenceImpedancePercent")),
+        "xr": _num(fields.get("XRRatio")),
+        "conn": (fields.get("TransformerConnection") or fields.get("Connection") or "").strip(),
+        "ntaps": _num(ltc_fields.get("NumberOfTaps")),
+        "minreg": _num(ltc_fields.get("MinimumRegulationRange")),
+        "maxreg": _num(ltc_fields.get("MaximumRegulationRange")),
+    }
+
+
+def _regulator_record(fields: Dict[str, str]) -> Dict[str, Any]:
+    """RegulatorDB (regulators are modeled as 1:1 transformers)."""
+    return {
+        "kvln": _num(fields.get("RatedKVLN")),
+        "kva": _num(fields.get("RatedKVA")) or _num(fields.get("FirstRatedKVA")),
+        "ntaps": _num(fields.get("NumberOfTaps")),
+        "minreg": _num(fields.get("MaximumBuck")),
+        "maxreg": _num(fields.get("MaximumBoost")),
+    }
+
+
+def _build_index(root: ET.Element) -> dict:
+    by_tag: Dict[str, Dict[str, Dict[str, str]]] = {}
+    line: Dict[str, Dict[str, float]] = {}
+    transformer: Dict[str, Dict[str, Any]] = {}
+    regulator: Dict[str, Dict[str, Any]] = {}
+
+    for holder in root.iter("EquipmentDBs"):
+        for rec in holder:
+            tag = rec.tag
+            if not isinstance(tag, str) or not tag.endswith("DB"):
+                continue
+            fields = _fields(rec)
+            eid = fields.get("EquipmentID", "").strip()
+            if not eid:
+                continue
+            by_tag.setdefault(tag, {})[eid] = fields
+
+            vals = _line_record(fields)
+            if vals is not None:
+                line[eid] = vals
+            if tag == "TransformerDB":
+                transformer[eid] = _transformer_record(rec, fields)
+            elif tag == "RegulatorDB":
+                regulator[eid] = _regulator_record(fields)
+
+    return {"line": line, "transformer": transformer, "regulator": regulator, "by_tag": by_tag}
+
+
+def equipment_index(root: ET.Element) -> dict:
+    """
+    Equipment library of a parsed model, built once per tree and shared by
+    every writer. The returned dicts are shared; callers must not modify them.
+    """
+    key = id(root)
+    with _INDEX_LOCK:
+        hit = _INDEX_CACHE.get(key)
+        if hit is not None and hit[0] is root:
+            _INDEX_CACHE.move_to_end(key)
+            return hit[1]
+
+    idx = _build_index(root)
+
+    with _INDEX_LOCK:
+        _INDEX_CACHE[key] = (root, idx)
+        _INDEX_CACHE.move_to_end(key)
+        while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    return idx
@@ -1,11 +1,19 @@
 # Modules/General.py
 from __future__ import annotations
-from pathlib import Path
-from typing import List, Tuple, Optional
+import codecs
+import gzip
+import itertools
+import lzma
+import mmap
 import re
+import threading
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Tuple, Optional
 import xml.etree.ElementTree as ET
-import re
 from typing import Optional, Any, Dict
+from Modules.Jobs import checkpoint
 
 # ================================
 # Editable constants
@@ -47,6 +55,426 @@ def set_island_context(ctx: Dict[str, Any]) -> None:
 def get_island_context() -> Dict[str, Any]:
     return _ISLAND_CTX
 
+# --------------- Input fingerprint ---------------
+def file_fingerprint(path: str | Path) -> Tuple[str, int, int]:
+    """
+    (resolved path, mtime_ns, size) of an input file. Used as a cheap cache key
+    so analyses are reused until the file on disk changes.
+    """
+    p = Path(path).expanduser().resolve()
+    pinned = _PINNED.get(str(p))
+    if pinned is not None:
+        return pinned["fingerprint"]
+    st = p.stat()
+    return (str(p), int(st.st_mtime_ns), int(st.st_size))
+
+# --------------- Pinned (in-memory) models ---------------
+# A model built in memory (Modules.Merge) is registered under a path that does
+# not exist on disk. file_fingerprint / read_xml / scan_header serve it from
+# here, so every writer and cache handles it like a file. Re-pinning a path
+# bumps its fingerprint, which retires everything cached for the old tree.
+_PINNED: Dict[str, Dict[str, Any]] = {}
+_PIN_VERSIONS = itertools.count(1)
+
+def pin_xml(path: str | Path, root: ET.Element, *, sources: Optional[List[str]] = None, size: int = 0) -> Path:
+    """Register `root` as the model at `path`; `sources` are the files it was built from."""
+    p = Path(path).expanduser().resolve()
+    with _PARSE_LOCK:
+        _PINNED[str(p)] = {"root": root, "sources": [str(s) for s in sources or []],
+                           "fingerprint": (str(p), next(_PIN_VERSIONS), int(size))}
+    return p
+
+def unpin_xml(path: str | Path) -> None:
+    with _PARSE_LOCK:
+        _PINNED.pop(str(Path(path).expanduser().resolve()), None)
+
+def pinned_sources(path: str | Path) -> Optional[List[str]]:
+    """Input files of a pinned model (None when `path` is not pinned)."""
+    pinned = _PINNED.get(str(Path(path).expanduser().resolve()))
+    return None if pinned is None else list(pinned["sources"])
+
+# --------------- Shared XML reader ---------------
+_READ_CHUNK_BYTES = 1 << 20  # 1 MB per parser feed
+
+# Parsed trees keyed by file fingerprint, least recently used first. Writers
+# treat the tree as read-only, so one parse serves every sheet of an export
+# (and repeated exports of the same file in a long-lived GUI/worker process).
+_PARSE_CACHE: Dict[Tuple[str, int, int], ET.Element] = {}
+_PARSE_CACHE_SIZE = 2
+_PARSE_LOCK = threading.Lock()
+
+def read_xml(path: str | Path) -> ET.Element:
+    """
+    Parse a CYME export into an Element tree (cached until the file changes).
+
+    Bytes are fed to the parser in 1 MB chunks with a cancellation checkpoint
+    between them, so a superseded background job stops mid-parse instead of
+    running to the end. Plain files are memory-mapped; gzip / xz / zip exports
+    are decompressed as a stream into the parser (no temporary file). Expat
+    decodes using the XML declaration; no decoded copy of the file is held.
+    The header scan (scan_header) is fed the same chunks.
+    """
+    fp = file_fingerprint(path)
+    pinned = _PINNED.get(fp[0])
+    if pinned is not None:
+        return pinned["root"]
+    with _PARSE_LOCK:
+        root = _PARSE_CACHE.pop(fp, None)
+        if root is not None:
+            _PARSE_CACHE[fp] = root
+            return root
+
+    scan = _HeaderScan(counts=False)
+    root = _parse_xml_file(path, scan)
+    _store_scan((fp, False), scan.result(path))
+    with _PARSE_LOCK:
+        _PARSE_CACHE[fp] = root
+        while len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
+            del _PARSE_CACHE[next(iter(_PARSE_CACHE))]
+    return root
+
+def parse_xml(path: str | Path) -> ET.Element:
+    """Uncached parse of a file: a fresh tree the caller may modify."""
+    return _parse_xml_file(path)
+
+def is_xml_cached(path: str | Path) -> bool:
+    """Whether read_xml(path) would return without parsing (cached or pinned)."""
+    fp = file_fingerprint(path)
+    with _PARSE_LOCK:
+        return fp in _PARSE_CACHE or fp[0] in _PINNED
+
+def read_xml_cache_info() -> list[str]:
+    """Paths of the currently cached parsed models (least recent first)."""
+    with _PARSE_LOCK:
+        return [fp[0] for fp in _PARSE_CACHE]
+
+def clear_xml_cache() -> None:
+    with _PARSE_LOCK:
+        _PARSE_CACHE.clear()
+
+# --------------- Input files (plain or compressed) ---------------
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"\xfd7zXZ\x00", "xz"), (b"PK\x03\x04", "zip"))
+COMPRESSED_SUFFIXES = (".gz", ".xz", ".zip")
+_ZIP_MEMBER_SUFFIXES = (".txt", ".xml", ".sxst")
+
+def compression(path: str | Path) -> Optional[str]:
+    """"gzip" | "xz" | "zip" from the file's magic bytes, None for a plain export."""
+    with open(Path(path), "rb") as fh:
+        head = fh.read(6)
+    return next((kind for magic, kind in _MAGIC if head.startswith(magic)), None)
+
+def input_stem(path: str | Path) -> str:
+    """File stem without a compression suffix ("feeder.txt.gz" -> "feeder")."""
+    p = Path(path)
+    if p.suffix.lower() in COMPRESSED_SUFFIXES:
+        p = Path(p.stem)
+    return p.stem
+
+def _zip_member(zf: "zipfile.ZipFile") -> str:
+    files = [i for i in zf.infolist() if not i.is_dir()]
+    picks = [i for i in files if i.filename.lower().endswith(_ZIP_MEMBER_SUFFIXES)] or files
+    if len(picks) != 1:
+        names = ", ".join(i.filename for i in picks) or "none"
+        raise ValueError(f"{zf.filename}: expected one CYME export in the archive, found {names}")
+    return picks[0].filename
+
+@contextmanager
+def input_buffer(path: str | Path) -> Iterator[Any]:
+    """
+    Read-only bytes of a plain input file: a memory map where the OS allows it
+    (zero-copy, pages shared with every other reader of the file), else the
+    bytes read once (empty files, pipes, some network shares).
+    """
+    with open(Path(path), "rb") as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mm = None
+        if mm is None:
+            yield fh.read()
+            return
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+@contextmanager
+def input_chunks(path: str | Path, size: int = _READ_CHUNK_BYTES) -> Iterator[Iterator[bytes]]:
+    """
+    The decompressed bytes of an export as an iterator of chunks: slices of a
+    memory map for plain files, a streaming gzip / xz / zip reader otherwise.
+    """
+    kind = compression(path)
+    if kind is None:
+        with input_buffer(path) as buf:
+            yield (bytes(buf[i:i + size]) for i in range(0, len(buf), size))
+        return
+
+    def _stream(fh) -> Iterator[bytes]:
+        while True:
+            chunk = fh.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    if kind == "zip":
+        with zipfile.ZipFile(Path(path)) as zf, zf.open(_zip_member(zf)) as fh:
+            yield _stream(fh)
+    else:
+        opener = gzip.open if kind == "gzip" else lzma.open
+        with opener(Path(path), "rb") as fh:
+            yield _stream(fh)
+
+_XML_DECL_RE = re.compile(rb"""^<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+
+def xml_encoding(buf: Any) -> str:
+    """Encoding of an XML byte buffer: BOM, else the declaration, else UTF-8."""
+    head = bytes(buf[:256])
+    if head.startswith(b"\xef\xbb\xbf"):
+        return "utf-8"
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    m = _XML_DECL_RE.match(head)
+    return m.group(1).decode("ascii").lower() if m else "utf-8"
+
+def _parse_xml_file(path: str | Path, scan: Optional["_HeaderScan"] = None) -> ET.Element:
+    head = b""
+    try:
+        parser = ET.XMLParser()
+        with input_chunks(path) as chunks:
+            for chunk in chunks:
+                checkpoint()
+                head = head or chunk[:256]
+                parser.feed(chunk)
+                if scan is not None and not scan.done:
+                    scan.feed(chunk)
+        return parser.close()
+    except ET.ParseError as e:
+        first = e
+    # Not valid in its declared encoding (e.g. stray cp1252 bytes in a "UTF-8"
+    # export): decode per chunk dropping undecodable bytes, as exports always were
+    enc = xml_encoding(head)
+    print(f"[XML] {Path(path).name}: {first}; re-reading as {enc} with undecodable bytes dropped")
+    decoder = codecs.getincrementaldecoder(_text_codec(enc))(errors="ignore")
+    parser = ET.XMLParser()  # fed text, expat ignores the declared encoding
+    if scan is not None:
+        scan.reset()  # the first pass may have stopped before GlobalParameters
+    with input_chunks(path) as chunks:
+        for chunk in chunks:
+            checkpoint()
+            parser.feed(decoder.decode(chunk))
+            if scan is not None and not scan.done:
+                scan.feed(chunk)
+    parser.feed(decoder.decode(b"", final=True))
+    return parser.close()
+
+def _text_codec(enc: str) -> str:
+    try:
+        name = codecs.lookup(enc).name
+    except LookupError:
+        return "utf-8-sig"
+    return "utf-8-sig" if name == "utf-8" else name
+
+# --------------- Header scanner ---------------
+# Walks the raw (decompressed) bytes in chunks - no decode, no XML parse - and
+# stops as soon as it has what was asked for: the <GlobalParameters> block and,
+# with counts=True, a tag count of the <Networks> part (sections, devices,
+# sources). CYME writes Networks before Equipments (where GlobalParameters
+# lives), so a summary reads the file up to GlobalParameters at most; files
+# without the block are read to the end. Counts are plain byte matches of
+# "<Tag>", so they are a preview, not a substitute for the parsed model.
+_SCAN_CHUNK_BYTES = 1 << 20
+_GP_OPEN, _GP_CLOSE = b"<GlobalParameters", b"</GlobalParameters>"
+_NETWORKS_CLOSE = b"</Networks>"
+SUMMARY_TAGS: Dict[str, Tuple[bytes, ...]] = {
+    "networks":      (b"<Network>",),
+    "substations":   (b"<NetworkType>Substation</NetworkType>",),
+    "nodes":         (b"<Node>",),
+    "sections":      (b"<Section>",),
+    "sources":       (b"<Source>",),
+    "loads":         (b"<SpotLoad>", b"<DistributedLoad>"),
+    "lines":         (b"<OverheadLine>", b"<OverheadLineUnbalanced>", b"<OverheadByPhase>",
+                      b"<Underground>", b"<UndergroundCable>"),
+    "transformers":  (b"<Transformer>",),
+    "switches":      (b"<Switch>", b"<Breaker>", b"<Fuse>", b"<Recloser>", b"<Sectionalizer>"),
+    "shunts":        (b"<ShuntCapacitor>",),
+}
+_SCAN_TAIL = max(len(t) for tags in SUMMARY_TAGS.values() for t in tags) + len(_NETWORKS_CLOSE)
+
+_SCAN_CACHE: Dict[Tuple[Tuple[str, int, int], bool], Dict[str, Any]] = {}
+_SCAN_CACHE_SIZE = 8
+
+def scan_header(path: str | Path, *, counts: bool = False) -> Dict[str, Any]:
+    """
+    {"frequency", "base_mva", "counts" (SUMMARY_TAGS keys, or None), "size",
+     "bytes_read", "compression"} of a CYME export, from a prefix of its
+    (decompressed) bytes. Cached until the file changes (read_xml fills the
+    cache from the chunks it parses).
+    """
+    key = (file_fingerprint(path), counts)
+    with _PARSE_LOCK:
+        hit = _SCAN_CACHE.pop(key, None)
+        if hit is not None:
+            _SCAN_CACHE[key] = hit
+            return hit
+
+    pinned = _PINNED.get(key[0][0])
+    if pinned is not None:
+        info = _tree_scan(pinned, counts)
+        _store_scan(key, info)
+        return info
+
+    scan = _HeaderScan(counts=counts)
+    with input_chunks(path, _SCAN_CHUNK_BYTES) as chunks:
+        for chunk in chunks:
+            checkpoint()
+            scan.feed(chunk)
+            if scan.done:
+                break
+    info = scan.result(path)
+    _store_scan(key, info)
+    return info
+
+def _store_scan(key: Tuple[Tuple[str, int, int], bool], info: Dict[str, Any]) -> None:
+    with _PARSE_LOCK:
+        _SCAN_CACHE[key] = info
+        while len(_SCAN_CACHE) > _SCAN_CACHE_SIZE:
+            del _SCAN_CACHE[next(iter(_SCAN_CACHE))]
+
+class _HeaderScan:
+    """Incremental scanner: feed() chunks in file order until `done`."""
+
+    def __init__(self, *, counts: bool) -> None:
+        self._counts = counts
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything fed so far (start over from the first byte)."""
+        counts = self._counts
+        self.tally = {name: 0 for name in SUMMARY_TAGS} if counts else None
+        self.counting = counts
+        self.gp: Optional[bytes] = None
+        self.gp_buf: Optional[bytearray] = None   # from "<GlobalParameters" on, until its close tag
+        self.tail = b""
+        self.head = b""
+        self.read = 0
+
+    @property
+    def done(self) -> bool:
+        return self.gp is not None and not self.counting
+
+    def feed(self, chunk: bytes) -> None:
+        self.read += len(chunk)
+        self.head = self.head or chunk[:256]
+        tail = self.tail
+        joined = tail + chunk
+
+        if self.counting:
+            end = joined.find(_NETWORKS_CLOSE)
+            part = joined if end < 0 else joined[:end]
+            for name, tags in SUMMARY_TAGS.items():
+                # `tail` (the previous chunk's end) can hold whole tags, counted
+                # last time; subtracting tail.count(t) leaves only the new matches,
+                # including those straddling the chunk boundary
+                self.tally[name] += sum(part.count(t) - tail.count(t) for t in tags)
+            if end >= 0:
+                self.counting = False
+
+        if self.gp is None:
+            if self.gp_buf is None:
+                start = joined.find(_GP_OPEN)
+                if start >= 0:
+                    self.gp_buf = bytearray(joined[start:])
+            else:
+                self.gp_buf += chunk
+            if self.gp_buf is not None:
+                stop = self.gp_buf.find(_GP_CLOSE)
+                if stop >= 0:
+                    self.gp = bytes(self.gp_buf[:stop + len(_GP_CLOSE)])
+                    self.gp_buf = None
+        self.tail = joined[-_SCAN_TAIL:]
+
+    def result(self, path: str | Path) -> Dict[str, Any]:
+        freq = base_mva = None
+        if self.gp is not None:
+            m = _GP_BLOCK_RE.search(self.gp.decode(_text_codec(xml_encoding(self.head)), errors="ignore"))
+            if m:
+                block = ET.fromstring("<GlobalParameters>" + m.group(1) + "</GlobalParameters>")
+                freq = _to_float(block.findtext("Frequency"))
+                base_mva = _to_float(block.findtext("BaseMVA"))
+        return {"frequency": freq, "base_mva": base_mva, "counts": self.tally,
+                "size": Path(path).stat().st_size, "bytes_read": self.read, "compression": compression(path)}
+
+_TREE_TAGS = {t[1:-1].decode(): name for name, tags in SUMMARY_TAGS.items() if name != "substations" for t in tags}
+
+def _tree_scan(pinned: Dict[str, Any], counts: bool) -> Dict[str, Any]:
+    """scan_header result of a pinned model, taken from its tree (same fields and counts)."""
+    root = pinned["root"]
+    gp = next(root.iter("GlobalParameters"), None)
+    tally = None
+    if counts:
+        tally = {name: 0 for name in SUMMARY_TAGS}
+        for nets in root.iter("Networks"):
+            for el in nets.iter():
+                name = _TREE_TAGS.get(el.tag)
+                if name is not None:
+                    tally[name] += 1
+                elif el.tag == "NetworkType" and (el.text or "").strip() == "Substation":
+                    tally["substations"] += 1
+    size = pinned["fingerprint"][2]
+    return {"frequency": _to_float(gp.findtext("Frequency")) if gp is not None else None,
+            "base_mva": _to_float(gp.findtext("BaseMVA")) if gp is not None else None,
+            "counts": tally, "size": size, "bytes_read": size, "compression": None}
+
+def describe_file(path: str | Path) -> str:
+    """One-line preview of a CYME export (file summary in the GUI)."""
+    info = scan_header(path, counts=True)
+    c = info["counts"]
+    size = info["size"]
+    parts = [f"{size / 1e6:.1f} MB" if size >= 1e5 else f"{size / 1e3:.1f} kB"]
+    if info["compression"]:
+        parts[0] += f" {info['compression']}"
+    if info["frequency"] is not None:
+        parts.append(f"{info['frequency']:g} Hz")
+    if info["base_mva"] is not None:
+        parts.append(f"{info['base_mva']:g} MVA base")
+    parts.append(f"{c['networks']} network(s), {c['substations']} substation(s)")
+    parts.append(", ".join(f"{c[k]} {k}" for k in ("sections", "sources", "loads", "lines",
+                                                 "transformers", "switches", "shunts")))
+    return " · ".join(parts)
+
+# --------------- Export options ---------------
+# Per-run switches read by the sheet writers (set by the export service, like the
+# island context). Unknown keys are kept so callers can pass through extras.
+#   line_model: "full"       three-phase lines as full phase matrices (block 4)
+#               "sequential" three-phase lines as R0/X0/R1/X1/B0/B1 per length (block 5)
+#   reduce_chains: merge series line chains (Modules.Reduction)
+#   load_aggregation: "none" | "bus" | "transformer" (Modules.LoadAggregation)
+LINE_MODELS = ("full", "sequential")
+LOAD_AGGREGATIONS = ("none", "bus", "transformer")
+PINS_LAYOUTS = ("rows", "vertical")
+EXPORT_OPTION_DEFAULTS: Dict[str, Any] = {"line_model": "full", "reduce_chains": False, "load_aggregation": "none",
+                                          "pins_layout": "rows", "pin_rules": None}
+_EXPORT_OPTS: Dict[str, Any] = dict(EXPORT_OPTION_DEFAULTS)
+
+def set_export_options(opts: Optional[Dict[str, Any]]) -> None:
+    global _EXPORT_OPTS
+    merged = dict(EXPORT_OPTION_DEFAULTS)
+    merged.update({k: v for k, v in (opts or {}).items() if v is not None})
+    if merged["line_model"] not in LINE_MODELS:
+        raise ValueError(f"line_model must be one of {LINE_MODELS}, got {merged['line_model']!r}")
+    if merged["load_aggregation"] not in LOAD_AGGREGATIONS:
+        raise ValueError(f"load_aggregation must be one of {LOAD_AGGREGATIONS}, got {merged['load_aggregation']!r}")
+    if merged["pins_layout"] not in PINS_LAYOUTS:
+        raise ValueError(f"pins_layout must be one of {PINS_LAYOUTS}, got {merged['pins_layout']!r}")
+    if merged["pin_rules"] is not None:
+        from Modules.PinSelection import parse_rules  # lazy: PinSelection imports this module
+        merged["pin_rules"] = parse_rules(merged["pin_rules"])
+    _EXPORT_OPTS = merged
+
+def get_export_options() -> Dict[str, Any]:
+    return _EXPORT_OPTS
+
 # --------------- General Page ---------------
 def _to_float(x: Optional[str]) -> Optional[float]:
     if x is None:
@@ -58,28 +486,22 @@ def _to_float(x: Optional[str]) -> Optional[float]:
 
 def _parse_general(file_path: Path) -> list[tuple[str, Optional[float] | str]]:
     """
-    Parse <GlobalParameters> from the CYME text and return the 2-column rows
-    we want to write on the 'General' sheet.
+    Read <GlobalParameters> (header scan, no full parse) and return the
+    2-column rows we want to write on the 'General' sheet.
     """
-    text = Path(file_path).read_text(encoding="utf-8", errors="ignore")
-
-    m = _GP_BLOCK_RE.search(text)
-    if not m:
-        freq = None
-        base_mva = None
-    else:
-        gp_chunk = "<GlobalParameters>" + m.group(1) + "</GlobalParameters>"
-        gp = ET.fromstring(gp_chunk)
-        freq = _to_float(gp.findtext("Frequency"))
-        base_mva = _to_float(gp.findtext("BaseMVA"))
-
+    info = scan_header(file_path)
     return [
         ("Excel file version", EXCEL_FILE_VERSION),
         ("Name", SYSTEM_NAME),
-        ("Frequency (Hz)", freq),
-        ("Power Base (MVA)", base_mva),
+        ("Frequency (Hz)", info["frequency"]),
+        ("Power Base (MVA)", info["base_mva"]),
     ]
 
+def base_mva_from_root(root: ET.Element) -> Optional[float]:
+    """BaseMVA of the first <GlobalParameters> block (same block the General sheet shows)."""
+    gp = next(root.iter("GlobalParameters"), None)
+    return _to_float(gp.findtext("BaseMVA")) if gp is not None else None
+
 # --- Backward-compat helper (keeps your old call site working) ---
 def get_general(file_path: str | Path) -> List[Tuple[str, Optional[float] | str]]:
     return _parse_general(Path(file_path))
@@ -95,7 +517,7 @@ def write_general_sheet(xw, input_path: Path) -> None:
     ws = wb.add_worksheet("General")
     # (Optional) store handle for consistency with your other modules
     try:
-        xw.sheets["General"] = ws  # pandas.ExcelWriter keeps this dict
+        xw.sheets["General"] = ws  # WorkbookWriter keeps this dict
     except Exception:
         pass
 
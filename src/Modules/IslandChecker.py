@@ -1,10 +1,12 @@
 # Modules/IslandChecker.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import xml.etree.ElementTree as ET
 
-from Modules.General import safe_name, set_island_context
+from Modules.General import safe_name, set_island_context, read_xml, file_fingerprint
+from Modules.Jobs import checkpoint
+from Modules.SectionRecords import SectionRecord, section_model
 
 # Device groups considered as *topology* edges between FromNodeID <-> ToNodeID
 LINE_LIKE = {
@@ -17,7 +19,7 @@ TRANSFORMERS = {"Transformer"}
 
 
 def _read_xml(path: Path) -> ET.Element:
-    return ET.fromstring(Path(path).read_text(encoding="utf-8", errors="ignore"))
+    return read_xml(path)
 
 
 def _dev_is_closed(dev: ET.Element) -> bool:
@@ -114,32 +116,52 @@ def _vs_page_source_nodes(root: ET.Element) -> Set[str]:
     return out
 
 
-def _shunt_buses(root: ET.Element) -> Set[str]:
+def _topo_source_nodes(root: ET.Element) -> Set[str]:
+    """
+    Substation Topo sources regardless of EquivalentSource (looser than
+    _vs_page_source_nodes). The GUI uses this set to decide which islands
+    are kept when no island is selected.
+    """
     out: Set[str] = set()
-    for sec in root.findall(".//Sections/Section"):
-        devs = sec.find("./Devices")
-        if devs is None:
+    for topo in root.findall(".//Topo"):
+        ntype = (topo.findtext("NetworkType") or "").strip().lower()
+        eq_mode = (topo.findtext("EquivalentMode") or "").strip()
+        if ntype != "substation" or eq_mode == "1":
             continue
-        if devs.find("ShuntCapacitor") is not None or devs.find("ShuntReactor") is not None:
-            fb = safe_name(sec.findtext("FromNodeID"))
+        srcs = topo.find("./Sources")
+        if srcs is None:
+            continue
+        for src in srcs.findall("./Source"):
+            nid = safe_name(src.findtext("SourceNodeID") or "")
+            if nid:
+                out.add(nid)
+    return out
+
+
+def _shunt_buses(records: List[SectionRecord]) -> Set[str]:
+    out: Set[str] = set()
+    for rec in records:
+        if any(tag in ("ShuntCapacitor", "ShuntReactor") for tag, _num, _detail in rec.devices):
+            fb = safe_name(rec.from_node)
             if fb:
                 out.add(fb)
     return out
 
 
-def _build_graph(root: ET.Element) -> Tuple[Dict[str, Set[str]], int, int]:
-    """Undirected graph of sanitized bus names using closed devices only."""
+def _build_graph(records: List[SectionRecord]) -> Tuple[Dict[str, Set[str]], int, int]:
+    """Undirected graph of sanitized bus names using closed devices only (SectionRecords)."""
     adj: Dict[str, Set[str]] = {}
     edges_closed = 0
     edges_open_ignored = 0
 
-    for sec in root.findall(".//Sections/Section"):
-        fb = safe_name(sec.findtext("FromNodeID"))
-        tb = safe_name(sec.findtext("ToNodeID"))
+    for rec in records:
+        checkpoint()
+        fb = safe_name(rec.from_node)
+        tb = safe_name(rec.to_node)
         if not fb or not tb:
             continue
 
-        if _section_has_closed_connection(sec):
+        if rec.closed:
             adj.setdefault(fb, set()).add(tb)
             adj.setdefault(tb, set()).add(fb)
             edges_closed += 1
@@ -160,6 +182,7 @@ def _components(adj: Dict[str, Set[str]]) -> List[Set[str]]:
     for v in adj:
         if v in seen:
             continue
+        checkpoint()
         stack = [v]
         comp: Set[str] = set()
         while stack:
@@ -173,26 +196,13 @@ def _components(adj: Dict[str, Set[str]]) -> List[Set[str]]:
     return comps
 
 
-def check_islands(xml_path: Path) -> Dict:
-    """
-    Returns:
-      {
-        'count': int,
-        'components': [
-           {'index': i, 'size': n, 'nodes': [...], 'limited_node_sample': [...],
-            'has_source': bool, 'has_shunt': bool}
-        ],
-        'edges_closed': int,
-        'edges_open_ignored': int,
-        'nodes_total': int
-      }
-    """
-    root = _read_xml(xml_path)
-    adj, e_closed, e_ignored = _build_graph(root)
+def _summarize(model: Dict[str, Any]) -> Tuple[Dict, Set[str]]:
+    """Island summary (see check_islands) plus the VS-page source nodes, from one section model."""
+    adj, e_closed, e_ignored = _build_graph(model["records"])
     comps = _components(adj)
 
-    source_nodes = _vs_page_source_nodes(root)
-    shunt_nodes = _shunt_buses(root)
+    source_nodes = _vs_page_source_nodes(model["root"])
+    shunt_nodes = _shunt_buses(model["records"])
 
     # Sort "good" islands (with sources) first, then by size desc, then lexicographically
     comps_info = []
@@ -214,18 +224,35 @@ def check_islands(xml_path: Path) -> Dict:
             "has_shunt": has_shunt,
         })
 
-    return {
+    summary = {
         "count": len(comps),
         "components": out_list,
         "edges_closed": e_closed,
         "edges_open_ignored": e_ignored,
         "nodes_total": len(adj),
     }
+    return summary, source_nodes
 
 
-def log_islands(xml_path: Path, per_island_limit: int | None = None) -> None:
-    """Console-friendly vertical printout."""
-    s = check_islands(xml_path)
+def check_islands(xml_path: Path) -> Dict:
+    """
+    Returns:
+      {
+        'count': int,
+        'components': [
+           {'index': i, 'size': n, 'nodes': [...], 'limited_node_sample': [...],
+            'has_source': bool, 'has_shunt': bool}
+        ],
+        'edges_closed': int,
+        'edges_open_ignored': int,
+        'nodes_total': int
+      }
+    """
+    summary, _ = _summarize(section_model(xml_path))
+    return summary
+
+
+def _print_summary(s: Dict, per_island_limit: int | None = None) -> None:
     print(f"[Islands] Count={s['count']}  Nodes={s['nodes_total']}  "
           f"ClosedEdges={s['edges_closed']}  OpenIgnored={s['edges_open_ignored']}")
     print("-" * 72)
@@ -245,19 +272,12 @@ def log_islands(xml_path: Path, per_island_limit: int | None = None) -> None:
         print("")
 
 
-def build_island_context(xml_path: Path) -> dict:
-    """
-    Build a context writers can use:
-      {
-        'bus_to_island': {bus_base: island_idx, ...},
-        'bad_buses': set(bus_base, ...),            # reserved for truly bad pseudo terminals (left empty by default)
-        'slack_per_island': {island_idx: bus_base}, # exactly one per island WITH a source
-        'islands': {island_idx: set(bus_base, ...)},
-        'sourceful_islands': set([island_idx, ...]) # convenience for UI/filters
-      }
-    """
-    s = check_islands(xml_path)
+def log_islands(xml_path: Path, per_island_limit: int | None = None) -> None:
+    """Console-friendly vertical printout."""
+    _print_summary(check_islands(xml_path), per_island_limit=per_island_limit)
+
 
+def _context_from_summary(s: Dict, source_nodes: Set[str], topo_source_nodes: Set[str]) -> dict:
     # Map each bus -> island index; collect island sets
     bus_to_island: Dict[str, int] = {}
     islands: Dict[int, Set[str]] = {}
@@ -271,9 +291,6 @@ def build_island_context(xml_path: Path) -> dict:
         has_source_by_island[idx] = bool(comp["has_source"])
 
     # Source nodes used for slack selection (VS page sources only)
-    root = _read_xml(xml_path)
-    source_nodes = _vs_page_source_nodes(root)
-
     slack_per_island: Dict[int, str] = {}
     for idx, bases in islands.items():
         if not has_source_by_island.get(idx, False):
@@ -294,12 +311,145 @@ def build_island_context(xml_path: Path) -> dict:
         "slack_per_island": slack_per_island,
         "islands": islands,
         "sourceful_islands": sourceful_islands,
+        "source_nodes": set(source_nodes),
+        "topo_source_nodes": set(topo_source_nodes),
     }
 
 
-def analyze_and_set_island_context(xml_path: Path, *, per_island_limit: int | None = None) -> dict:
-    """Print vertical summary and store context globally for writers."""
-    log_islands(xml_path, per_island_limit=per_island_limit)
-    ctx = build_island_context(xml_path)
+def build_island_context(xml_path: Path) -> dict:
+    """
+    Build a context writers can use:
+      {
+        'bus_to_island': {bus_base: island_idx, ...},
+        'bad_buses': set(bus_base, ...),            # reserved for truly bad pseudo terminals (left empty by default)
+        'slack_per_island': {island_idx: bus_base}, # exactly one per island WITH a source
+        'islands': {island_idx: set(bus_base, ...)},
+        'sourceful_islands': set([island_idx, ...]) # convenience for UI/filters
+        'source_nodes': set(bus_base, ...),         # VS-page sources
+        'topo_source_nodes': set(bus_base, ...),    # all Substation Topo sources
+      }
+    """
+    model = section_model(xml_path)
+    s, source_nodes = _summarize(model)
+    return _context_from_summary(s, source_nodes, _topo_source_nodes(model["root"]))
+
+
+def copy_island_context(ctx: dict) -> dict:
+    """Copy deep enough that callers can filter/mutate without touching the cached analysis."""
+    out = {}
+    for k, v in (ctx or {}).items():
+        if isinstance(v, dict):
+            out[k] = {kk: (set(vv) if isinstance(vv, set) else vv) for kk, vv in v.items()}
+        elif isinstance(v, set):
+            out[k] = set(v)
+        else:
+            out[k] = v
+    return out
+
+
+def select_island_context(ctx: dict, active_island: int) -> dict:
+    """
+    Export context for a user-selected island: only its buses are allowed and
+    only its slack is kept. A selected island without a source is still exported.
+    """
+    islands: Dict[int, Set[str]] = dict(ctx.get("islands", {}))
+    bus_to_island: Dict[str, int] = dict(ctx.get("bus_to_island", {}))
+    slack_per_island: Dict[int, str] = dict(ctx.get("slack_per_island", {}))
+    if islands:
+        keep = set(islands.get(active_island, set()))
+    else:
+        keep = {b for b, i in bus_to_island.items() if i == active_island}
+    return {
+        "bus_to_island": {b: active_island for b in keep},
+        "bad_buses": set(),
+        "slack_per_island": {active_island: slack_per_island.get(active_island, "")},
+        "islands": {active_island: keep},
+    }
+
+
+def sourceful_islands_context(ctx: dict, vs_nodes: Optional[Set[str]] = None) -> dict:
+    """
+    Export context when no island is selected: keep ALL islands mapped (for the
+    UI) and mark only islands without a Substation Topo source as bad.
+    """
+    islands: Dict[int, Set[str]] = dict(ctx.get("islands", {}))
+    bus_to_island: Dict[str, int] = dict(ctx.get("bus_to_island", {}))
+    slack_per_island: Dict[int, str] = dict(ctx.get("slack_per_island", {}))
+    if vs_nodes is None:
+        vs_nodes = set(ctx.get("topo_source_nodes", set()))
+
+    # If the analysis didn't include "islands", synthesize from bus_to_island.
+    if not islands and bus_to_island:
+        for b, isl in bus_to_island.items():
+            islands.setdefault(isl, set()).add(b)
+
+    # Islands that intersect VS-page nodes are sourceful (good)
+    sourceful = {i for i, buses in islands.items() if any(b in vs_nodes for b in buses)}
+    bad_islands = set(islands.keys()) - sourceful
+
+    return {
+        "bus_to_island": {b: i for i, buses in islands.items() for b in buses},
+        "slack_per_island": slack_per_island,
+        "bad_buses": set().union(*(islands[i] for i in bad_islands)) if islands else set(),
+        "islands": islands,
+        "source_nodes": set(ctx.get("source_nodes", set())),
+        "topo_source_nodes": set(vs_nodes),
+    }
+
+
+# Recent analyses, keyed by file fingerprint (path, mtime, size); least recent first
+_ANALYSIS_CACHE: Dict[Tuple[str, int, int], dict] = {}
+_ANALYSIS_CACHE_SIZE = 4
+
+
+def analyze_and_set_island_context(
+    xml_path: Path,
+    *,
+    per_island_limit: int | None = None,
+    progress: Optional[Callable[[int, str], None]] = None,
+    use_cache: bool = True,
+    store: bool = True,
+    full_tree: bool = True,
+) -> dict:
+    """
+    Print vertical summary and store context globally for writers.
+
+    One parse per analysis. When the file fingerprint is unchanged since the
+    last call the cached result is reused (no parse, no console dump).
+    `progress(percent, message)` is called at each stage when given.
+    store=False keeps the result out of the cache (e.g. a temporarily modified tree).
+    full_tree=False: with parallel section parsing (SectionRecords) only the
+    parts of the file outside the sections are parsed here (analysis only).
+    """
+    def _report(pct: int, msg: str) -> None:
+        if progress is not None:
+            progress(pct, msg)
+
+    fp = file_fingerprint(xml_path)
+    cached = _ANALYSIS_CACHE.pop(fp, None) if use_cache else None
+    if cached is not None:
+        _ANALYSIS_CACHE[fp] = cached  # most recently used
+        print(f"[Islands] File unchanged - reusing previous analysis ({len(cached['islands'])} islands)")
+        _report(100, "Reusing previous island analysis")
+        ctx = copy_island_context(cached)
+        set_island_context(ctx)
+        return ctx
+
+    _report(0, "Reading file")
+    model = section_model(xml_path, full_tree=full_tree, use_cache=use_cache)
+    _report(60, "Building island graph")
+    s, source_nodes = _summarize(model)
+    topo_sources = _topo_source_nodes(model["root"])
+    del model
+    _print_summary(s, per_island_limit=per_island_limit)
+    _report(90, "Building island context")
+    ctx = _context_from_summary(s, source_nodes, topo_sources)
+
+    if store:
+        _ANALYSIS_CACHE.pop(fp, None)
+        _ANALYSIS_CACHE[fp] = copy_island_context(ctx)
+        while len(_ANALYSIS_CACHE) > _ANALYSIS_CACHE_SIZE:
+            del _ANALYSIS_CACHE[next(iter(_ANALYSIS_CACHE))]
     set_island_context(ctx)
+    _report(100, f"Found {s['count']} island(s)")
     return ctx
@@ -0,0 +1,599 @@
+# Modules/IslandMap.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any
+
+from Modules.General import read_xml
+from Modules.Jobs import checkpoint
+
+# Island map layout (no Tk): parse the selected island's sections and diagram
+# coordinates and return unit-square coords/polylines for the GUI canvas.
+# Kept free of UI state so the GUI thread pool and the warm worker share it.
+
+
+def compute_island_map_data(isl: int | None, bus_to_island: dict[str, int], in_path: Path) -> dict:
+    out: dict[str, Any] = {"version": 4, "isl": isl}
+    try:
+        if isl is None or not isinstance(bus_to_island, dict):
+            out["error"] = "no island"
+            return out
+        # Selected island nodes
+        nodes = sorted([b for b, i in bus_to_island.items() if i == isl])
+        if not nodes:
+            out["coords_unit"] = {}
+            out["edges"] = []
+            out["polylines_unit"] = {}
+            return out
+
+        import xml.etree.ElementTree as ET
+        import math as _m
+        from Modules.General import safe_name as _safe
+        xml_root = read_xml(in_path)
+
+        nodes_set = set()  # will be set after ID normalization
+
+        # Build adjacency and capture polylines per section
+        adj: dict[str, set[str]] = {n: set() for n in nodes}
+        edges: list[tuple[str, str]] = []
+        section_polylines: dict[str, list[list[tuple[float, float]]]] = {}
+        # Track tertiary per base edge to allow polyline splitting later
+        tert_by_edge: dict[str, set[str]] = {}
+        # Device collections
+        bus_sources: set[str] = set()
+        bus_loads: dict[str, int] = {}
+        bus_shunts: dict[str, int] = {}
+        inline_devs: dict[str, list[dict[str, str]]] = {}
+
+        def edge_key(a: str, b: str) -> str:
+            return "|".join(sorted((a, b)))
+
+        def _finite(v: float | None) -> bool:
+            try:
+                return v is not None and _m.isfinite(v) and abs(float(v)) < 1e12
+            except Exception:
+                return False
+
+        def _read_xy(el: ET.Element) -> tuple[float | None, float | None]:
+            # Strictly geometry fields only
+            cand = [
+                (el.findtext('X'), el.findtext('Y')),
+                (el.findtext('PosX'), el.findtext('PosY')),
+                (el.findtext('CoordX'), el.findtext('CoordY')),
+                (el.findtext('MapX'), el.findtext('MapY')),
+            ]
+            # Attribute forms
+            cand.extend([
+                (el.get('x'), el.get('y')),
+                (el.get('X'), el.get('Y')),
+                (el.get('XCoord'), el.get('YCoord')),
+                (el.get('XCOORD'), el.get('YCOORD')),
+            ])
+            for xs, ys in cand:
+                try:
+                    xv = float(xs) if xs not in (None, '') else None
+                    yv = float(ys) if ys not in (None, '') else None
+                except Exception:
+                    xv = None; yv = None
+                if _finite(xv) and _finite(yv):
+                    return xv, yv
+            # Embedded Position node
+            pos = el.find('Position') or el.find('Coordinates')
+            if pos is not None:
+                px, py = _read_xy(pos)
+                if _finite(px) and _finite(py):
+                    return px, py
+            return None, None
+
+        def _gather_section_polylines(sec: ET.Element) -> list[list[tuple[float, float]]]:
+            outp: list[list[tuple[float, float]]] = []
+            # Accept only known geometry containers
+            holders = [
+                sec.find('Breakpoints'),
+                sec.find('ShapePoints'),
+                sec.find('Polyline'),
+                sec.find('IntermediatePoints'),  # some templates store the path here
+            ]
+            for holder in holders:
+                if holder is None:
+                    continue
+                pts: list[tuple[float, float]] = []
+                for child in list(holder):
+                    tag = child.tag.split('}')[-1].lower()
+                    if tag in ('breakpoint', 'point'):
+                        x, y = _read_xy(child)
+                        if _finite(x) and _finite(y) and not (abs(float(x)) == 0.0 and abs(float(y)) == 0.0):
+                            pts.append((float(x), float(y)))  # type: ignore[arg-type]
+                if pts:
+                    outp.append(pts)
+            return outp
+
+        # ID normalizer wraps project safe_name and adds phase/whitespace handling
+        def _norm_id(s: str) -> str:
+            try:
+                t = _safe((s or '').strip())
+                t = t.replace('\n', '').replace('\r', '')
+                t = t.replace('__', '-')
+                t = t.casefold()
+                # strip trailing phase suffix _a/_b/_c if present
+                if len(t) > 2 and t.endswith(('_a','_b','_c')):
+                    t = t[:-2]
+                return t
+            except Exception:
+                return (s or '').strip()
+
+        # Normalize node ids first
+        nodes = [(_safe(n) or n) for n in nodes]
+        nodes = [(_safe(n) or n) for n in nodes]  # ensure safe then norm
+        def _norm_id(s: str) -> str:
+            try:
+                t = _safe((s or '').strip())
+                t = t.replace('\n', '').replace('\r', '')
+                t = t.replace('__', '-')
+                t = t.casefold()
+                if len(t) > 2 and t.endswith(('_a','_b','_c')):
+                    t = t[:-2]
+                return t
+            except Exception:
+                return (s or '').strip()
+        nodes = [_norm_id(n) for n in nodes]
+        nodes_set = set(nodes)
+
+        for sec in xml_root.findall('.//Sections/Section'):
+            checkpoint()
+            fb = _norm_id((sec.findtext('FromNodeID') or ''))
+            tb = _norm_id((sec.findtext('ToNodeID') or ''))
+            if not fb or not tb:
+                continue
+            if fb in nodes_set and tb in nodes_set:
+                if tb not in adj[fb]:
+                    adj[fb].add(tb); adj[tb].add(fb)
+                    edges.append((fb, tb))
+            # Tertiary: split into two logical edges
+            tert = _norm_id((sec.findtext('TertiaryNodeID') or ''))
+            if tert:
+                if tert in nodes_set and fb in nodes_set:
+                    if tert not in adj[fb]:
+                        adj[fb].add(tert); adj[tert].add(fb)
+                        edges.append((fb, tert))
+                if tert in nodes_set and tb in nodes_set:
+                    if tb not in adj[tert]:
+                        adj[tert].add(tb); adj[tb].add(tert)
+                        edges.append((tert, tb))
+                # Record for later polyline splitting
+                tert_by_edge.setdefault(edge_key(fb, tb), set()).add(tert)
+
+            # Geometry polylines if present
+            polylists = _gather_section_polylines(sec)
+            if polylists and fb and tb:
+                section_polylines.setdefault(edge_key(fb, tb), []).extend(polylists)
+
+        # Devices under this section
+        devs = sec.find('./Devices')
+        if devs is not None:
+            # Loads attach to From bus per sheet rules
+            if devs.find('SpotLoad') is not None or devs.find('DistributedLoad') is not None:
+                if fb in nodes_set:
+                    bus_loads[fb] = bus_loads.get(fb, 0) + 1
+            # Shunt devices at From bus
+            if devs.find('ShuntCapacitor') is not None or devs.find('ShuntReactor') is not None:
+                if fb in nodes_set:
+                    bus_shunts[fb] = bus_shunts.get(fb, 0) + 1
+            # Switch-like inline devices
+            for tag in ('Switch', 'Sectionalizer', 'Breaker', 'Fuse', 'Recloser'):
+                for d in devs.findall(tag):
+                    loc = (d.findtext('Location') or 'Middle').strip().lower()
+                    name = (d.findtext('Name') or d.findtext('DeviceID') or tag)
+                    # heuristic state parse
+                    state = (d.findtext('NormalOpen') or d.findtext('NormallyOpen') or d.findtext('Open') or d.findtext('Status') or '')
+                    closed: bool | None
+                    sv = (state or '').strip().lower()
+                    if sv in ('open', '1', 'true'):
+                        closed = False
+                    elif sv in ('closed', '0', 'false'):
+                        closed = True
+                    else:
+                        closed = None
+                    rec = {'type': 'switch', 'loc': loc}
+                    if name:
+                        rec['name'] = name
+                    if closed is not None:
+                        rec['closed'] = closed
+                    inline_devs.setdefault(edge_key(fb, tb), []).append(rec)
+            # Some miscellaneous behave as inline switches (RB, LA)
+            for d in devs.findall('Miscellaneous'):
+                did = ((d.findtext('DeviceID') or '').strip().upper())
+                if did in {'RB', 'LA'}:
+                    loc = (d.findtext('Location') or 'Middle').strip().lower()
+                    inline_devs.setdefault(edge_key(fb, tb), []).append({'type': 'switch', 'loc': loc, 'name': did})
+            # Transformers inline (or regulators)
+            if devs.find('Transformer') is not None or devs.find('Regulator') is not None:
+                xf = devs.find('Transformer')
+                loc = (xf.findtext('Location') if xf is not None else 'Middle') or 'Middle'
+                name = (xf.findtext('Name') if xf is not None else '') or 'Transformer'
+                inline_devs.setdefault(edge_key(fb, tb), []).append({'type': 'xfmr', 'loc': loc.strip().lower(), 'name': name})
+
+        # Real coordinates per node (best-effort)
+        def _num(x: str | None) -> float | None:
+            try:
+                return float(x) if x not in (None, '') else None
+            except Exception:
+                return None
+        coords_real: dict[str, tuple[float, float]] = {}
+        used_geo = False  # lat/long detected
+        for elem in xml_root.iter():
+            checkpoint()
+            tag = elem.tag.split('}')[-1].lower()
+            if tag in ('tag', 'tags'):
+                continue  # ignore label containers entirely
+            # NodeID may be in text or attribute; try both
+            nid_raw = (elem.findtext('NodeID') or elem.get('NodeID') or elem.get('NodeId') or elem.get('node') or '')
+            if not nid_raw:
+                continue
+            # Prefer diagram units first (X/Y families)
+            nx, ny = _read_xy(elem)
+            # Else try geographic
+            if not (_finite(nx) and _finite(ny)):
+                lon_txt = elem.findtext('Longitude'); lat_txt = elem.findtext('Latitude')
+                try:
+                    lon = float(lon_txt) if lon_txt not in (None, '') else None
+                    lat = float(lat_txt) if lat_txt not in (None, '') else None
+                except Exception:
+                    lon = None; lat = None
+                if _finite(lon) and _finite(lat):
+                    # Web Mercator projection to planar meters
+                    R = 6378137.0
+                    lon_rad = _m.radians(float(lon))
+                    lat_rad = _m.radians(max(-85.06, min(85.06, float(lat))))
+                    nx = R * lon_rad
+                    ny = R * _m.log(_m.tan(_m.pi/4.0 + lat_rad/2.0))
+                    used_geo = True
+            if not (_finite(nx) and _finite(ny)):
+                continue
+            if abs(float(nx)) == 0.0 and abs(float(ny)) == 0.0:
+                continue
+            nid = _norm_id(nid_raw)
+            if nid in nodes_set:
+                coords_real.setdefault(nid, (float(nx), float(ny)))  # type: ignore[arg-type]
+
+        # Voltage sources from Substation topo (normalize ids)
+        try:
+            for topo in xml_root.findall('.//Topo'):
+                ntype = (topo.findtext('NetworkType') or '').strip().lower()
+                eq_mode = (topo.findtext('EquivalentMode') or '').strip()
+                if ntype != 'substation' or eq_mode == '1':
+                    continue
+                srcs = topo.find('./Sources')
+                if srcs is None:
+                    continue
+                for src in srcs.findall('./Source'):
+                    nid = _norm_id(src.findtext('SourceNodeID') or '')
+                    if nid and nid in nodes_set:
+                        bus_sources.add(nid)
+        except Exception:
+            pass
+
+        # Snap polyline endpoints to node anchors in RAW space; promote anchors from polylines when needed
+        try:
+            # Compute a robust epsilon based on current raw span
+            raw_xs = [x for (x, _) in coords_real.values()]
+            raw_ys = [y for (_, y) in coords_real.values()]
+            for plist in section_polylines.values():
+                for pts in plist:
+                    for (x, y) in pts:
+                        raw_xs.append(x); raw_ys.append(y)
+            if raw_xs and raw_ys:
+                rx_span = max(1.0, max(raw_xs) - min(raw_xs))
+                ry_span = max(1.0, max(raw_ys) - min(raw_ys))
+                eps = 1e-6 * max(rx_span, ry_span)
+            else:
+                eps = 1e-3
+
+            def _snap_poly(poly: list[tuple[float, float]], frm_xy: tuple[float, float] | None, to_xy: tuple[float, float] | None, eps: float) -> list[tuple[float, float]]:
+                if not poly or len(poly) < 2:
+                    return poly
+                p = list(poly)
+                if frm_xy is not None:
+                    d0 = (p[0][0]-frm_xy[0])**2 + (p[0][1]-frm_xy[1])**2
+                    d1 = (p[-1][0]-frm_xy[0])**2 + (p[-1][1]-frm_xy[1])**2
+                    if min(d0, d1) <= eps*eps:
+                        if d0 <= d1:
+                            p[0] = frm_xy
+                        else:
+                            p[-1] = frm_xy
+                if to_xy is not None:
+                    d0 = (p[0][0]-to_xy[0])**2 + (p[0][1]-to_xy[1])**2
+                    d1 = (p[-1][0]-to_xy[0])**2 + (p[-1][1]-to_xy[1])**2
+                    if min(d0, d1) <= eps*eps:
+                        if d1 <= d0:
+                            p[-1] = to_xy
+                        else:
+                            p[0] = to_xy
+                return p
+
+            poly_anchored: set[str] = set()
+            for k, plist in list(section_polylines.items()):
+                try:
+                    u, v = k.split('|', 1)
+                except Exception:
+                    continue
+                u_xy = coords_real.get(u)
+                v_xy = coords_real.get(v)
+                new_list: list[list[tuple[float, float]]] = []
+                for pts in plist:
+                    sp = _snap_poly(pts, u_xy, v_xy, eps)
+                    new_list.append(sp)
+                    if u_xy is None and v_xy is None and sp:
+                        coords_real[u] = sp[0]
+                        coords_real[v] = sp[-1]
+                        poly_anchored.add(u); poly_anchored.add(v)
+                        u_xy = coords_real.get(u); v_xy = coords_real.get(v)
+                section_polylines[k] = new_list
+        except Exception:
+            poly_anchored = set()
+
+        # Fallback BFS layout for structure
+        from collections import deque as _dq
+        # Try to root at slack if available
+        try:
+            ctx = get_island_context() or {}
+            slack_per_island: dict[int, str] = dict(ctx.get('slack_per_island', {}))
+            root_node = slack_per_island.get(isl) or (nodes[0] if nodes else None)
+        except Exception:
+            root_node = nodes[0] if nodes else None
+        depth: dict[str, int] = {}
+        if root_node:
+            q = _dq([root_node]); depth[root_node] = 0
+            while q:
+                checkpoint()
+                u = q.popleft()
+                for v in sorted(adj.get(u, set())):
+                    if v not in depth:
+                        depth[v] = depth[u] + 1
+                        q.append(v)
+        for n in nodes:
+            depth.setdefault(n, 0)
+        columns: dict[int, list[str]] = {}
+        for n in nodes:
+            columns.setdefault(depth[n], []).append(n)
+        for col in columns.values():
+            col.sort()
+        coords_bfs: dict[str, tuple[float, float]] = {}
+        for dlevel, col_nodes in columns.items():
+            k = max(1, len(col_nodes))
+            for i, n in enumerate(col_nodes):
+                x = float(dlevel)
+                y = float(i) / float(k - 1 if k > 1 else 1)
+                coords_bfs[n] = (x, y)
+        try:
+            dmax = max((xy[0] for xy in coords_bfs.values()), default=1.0)
+            if dmax <= 0:
+                dmax = 1.0
+            for n, (x, y) in list(coords_bfs.items()):
+                coords_bfs[n] = (x / dmax, y)
+        except Exception:
+            pass
+
+        # If there are two or more anchors, align BFS axis with the anchors' principal direction (PCA)
+        try:
+            anchors_u = [coords_real.get(n) for n in nodes if n in coords_real]
+            anchors_u = [(x, y) for (x, y) in anchors_u if isinstance(x, float) and isinstance(y, float)]
+            if len(anchors_u) >= 2:
+                import math as _pm
+                ax = [x for (x, _) in anchors_u]; ay = [y for (_, y) in anchors_u]
+                mx = sum(ax)/len(ax); my = sum(ay)/len(ay)
+                vx = sum((x-mx)*(x-mx) for x in ax); vy = sum((y-my)*(y-my) for y in ay); vxy = sum((ax[i]-mx)*(ay[i]-my) for i in range(len(ax)))
+                theta = 0.5 * _pm.atan2(2.0*vxy, (vx - vy) if (vx!=vy or vxy!=0) else 1.0)
+                ct, st = _pm.cos(theta), _pm.sin(theta)
+                coords_bfs = {n: (x*ct - y*st, x*st + y*ct) for n,(x,y) in coords_bfs.items()}
+        except Exception:
+            pass
+
+        # Collect polyline raw points (for normalization even if no node coords)
+        poly_points: list[tuple[float, float]] = []
+        for plist in section_polylines.values():
+            for pts in plist:
+                poly_points.extend(pts)
+
+        # Build a normalization over whatever real geometry we have (filter bad values/outliers)
+        if coords_real or poly_points:
+            xs_all = [p[0] for p in coords_real.values()] + [p[0] for p in poly_points]
+            ys_all = [p[1] for p in coords_real.values()] + [p[1] for p in poly_points]
+            minxr, maxxr = min(xs_all), max(xs_all)
+            minyr, maxyr = min(ys_all), max(ys_all)
+            spanxr = max(1.0, maxxr - minxr)
+            spanyr = max(1.0, maxyr - minyr)
+            # Drop extreme outliers beyond ~5 sigma from median (basic safeguard)
+            try:
+                import statistics as _st
+                mx = _st.median(xs_all); my = _st.median(ys_all)
+                sx = _st.pstdev(xs_all) or 1.0; sy = _st.pstdev(ys_all) or 1.0
+                limx = 5.0*sx; limy = 5.0*sy
+                def _okx(x: float) -> bool: return abs(x - mx) <= limx
+                def _oky(y: float) -> bool: return abs(y - my) <= limy
+                coords_real = {n:(x,y) for n,(x,y) in coords_real.items() if _okx(x) and _oky(y)}
+                poly_points = [(x,y) for (x,y) in poly_points if _okx(x) and _oky(y)]
+                if coords_real or poly_points:
+                    xs_all = [p[0] for p in coords_real.values()] + [p[0] for p in poly_points]
+                    ys_all = [p[1] for p in coords_real.values()] + [p[1] for p in poly_points]
+                    minxr, maxxr = min(xs_all), max(xs_all)
+                    minyr, maxyr = min(ys_all), max(ys_all)
+                    spanxr = max(1.0, maxxr - minxr)
+                    spanyr = max(1.0, maxyr - minyr)
+            except Exception:
+                pass
+            def _norm_geom_to_unit(x: float, y: float) -> tuple[float, float]:
+                return (x - minxr) / spanxr, (y - minyr) / spanyr
+            coords_real_unit = {n: _norm_geom_to_unit(x, y) for n, (x, y) in coords_real.items()}
+        else:
+            coords_real_unit = {}
+
+        # Merge: BFS unit, overridden by any real-unit positions
+        coords_unit: dict[str, tuple[float, float]] = dict(coords_bfs)
+        for n, xy in coords_real_unit.items():
+            coords_unit[n] = xy
+        # Pull nodes with no real coords toward average of real neighbors (jittered)
+        # Soft relaxation only on synthetic nodes, never move anchored
+        try:
+            for _ in range(8):
+                checkpoint()
+                for n in nodes:
+                    if n in coords_real_unit:
+                        continue  # locked anchors
+                    neigh_u = [coords_unit.get(v) for v in adj.get(n, set())]
+                    neigh_u = [(x, y) for (x, y) in neigh_u if x is not None and y is not None]
+                    if not neigh_u:
+                        continue
+                    ax = sum(x for x, _ in neigh_u) / float(len(neigh_u))
+                    ay = sum(y for _, y in neigh_u) / float(len(neigh_u))
+                    px, py = coords_unit.get(n, (ax, ay))
+                    # small step toward neighbors average
+                    s = 0.2
+                    nx = px + s * (ax - px)
+                    ny = py + s * (ay - py)
+                    coords_unit[n] = (min(1.0, max(0.0, nx)), min(1.0, max(0.0, ny)))
+        except Exception:
+            pass
+
+        # Normalize polylines to unit using geometry extents if available
+        polylines_unit: dict[str, list[list[tuple[float, float]]]] = {}
+        try:
+            if coords_real or poly_points:
+                def _norm_geom_to_unit(x: float, y: float) -> tuple[float, float]:
+                    return (x - minxr) / spanxr, (y - minyr) / spanyr  # type: ignore[name-defined]
+                for k, plist in section_polylines.items():
+                    out_list: list[list[tuple[float, float]]] = []
+                    for pts in plist:
+                        out_list.append([_norm_geom_to_unit(px, py) for (px, py) in pts])
+                    if out_list:
+                        polylines_unit[k] = out_list
+        except Exception:
+            pass
+
+        # If we have tertiary nodes and a base-edge polyline, split the polyline at
+        # the junction nearest to the tertiary anchor so each branch gets its shape.
+        try:
+            for k, tert_set in tert_by_edge.items():
+                if k not in polylines_unit:
+                    continue
+                try:
+                    u, v = k.split('|', 1)
+                except Exception:
+                    continue
+                for tert in list(tert_set):
+                    if tert not in coords_unit:
+                        continue
+                    tx, ty = coords_unit[tert]
+                    base_list = polylines_unit.get(k) or []
+                    add_uv: list[list[tuple[float, float]]] = []
+                    add_tv: list[list[tuple[float, float]]] = []
+                    tol = 0.02  # unit-space tolerance for tee snapping
+                    tol2 = tol * tol
+                    for pts in base_list:
+                        if not pts:
+                            continue
+                        # find nearest poly point to tertiary
+                        best_i = 0; best_d = 1e9
+                        for i, (px, py) in enumerate(pts):
+                            d = (px - tx) * (px - tx) + (py - ty) * (py - ty)
+                            if d < best_d:
+                                best_d = d; best_i = i
+                        if best_d <= tol2:
+                            left = pts[:best_i+1]
+                            right = pts[best_i:]
+                            if left and right:
+                                add_uv.append(left)
+                                add_tv.append(right)
+                    # attach splits and leave original polyline as-is (renderer prefers edge-specific ones)
+                    if add_uv:
+                        polylines_unit.setdefault(edge_key(u, tert), []).extend(add_uv)
+                    if add_tv:
+                        polylines_unit.setdefault(edge_key(tert, v), []).extend(add_tv)
+        except Exception:
+            pass
+
+        # If nodes lack real coords, try to infer their positions from polyline endpoints
+        if polylines_unit:
+            inferred: dict[str, list[tuple[float, float]]] = {}
+            for (u, v) in edges:
+                k = edge_key(u, v)
+                plist = polylines_unit.get(k)
+                if not plist:
+                    continue
+                # Choose ends per edge to match BFS orientation
+                bu = coords_bfs.get(u, (0.0, 0.0))
+                bv = coords_bfs.get(v, (1.0, 1.0))
+                for pts in plist:
+                    if not pts:
+                        continue
+                    a = pts[0]; b = pts[-1]
+                    try:
+                        s1 = (bu[0]-a[0])**2 + (bu[1]-a[1])**2 + (bv[0]-b[0])**2 + (bv[1]-b[1])**2
+                        s2 = (bu[0]-b[0])**2 + (bu[1]-b[1])**2 + (bv[0]-a[0])**2 + (bv[1]-a[1])**2
+                        if s1 <= s2:
+                            inferred.setdefault(u, []).append(a)
+                            inferred.setdefault(v, []).append(b)
+                        else:
+                            inferred.setdefault(u, []).append(b)
+                            inferred.setdefault(v, []).append(a)
+                    except Exception:
+                        continue
+            # Average candidates
+            for n, lst in inferred.items():
+                if n in coords_real_unit:
+                    continue
+                if not lst:
+                    continue
+                ax = sum(x for x, _ in lst) / float(len(lst))
+                ay = sum(y for _, y in lst) / float(len(lst))
+                coords_unit[n] = (ax, ay)
+
+        # Prepare result
+        out["coords_unit"] = coords_unit
+        out["edges"] = edges
+        out["polylines_unit"] = polylines_unit
+        # Heuristic Y flip: diagram-like (no geo) tends to be y-down. If we have
+        # polylines, sample gradients; otherwise fall back to diagram default.
+        y_down = True
+        try:
+            if used_geo:
+                y_down = False
+            else:
+                grads = []
+                for plist in polylines_unit.values():
+                    for pts in plist:
+                        for i in range(len(pts)-1):
+                            (x0, y0), (x1, y1) = pts[i], pts[i+1]
+                            if abs(x1 - x0) + abs(y1 - y0) > 1e-6:
+                                grads.append(y1 - y0)
+                if grads:
+                    # If most segments increase y downward (positive), treat as y-down
+                    pos = sum(1 for g in grads if g > 0)
+                    neg = sum(1 for g in grads if g < 0)
+                    y_down = pos >= neg
+        except Exception:
+            pass
+        out["y_down"] = y_down
+        # Devices
+        out["bus_sources"] = [b for b in bus_sources if b in nodes_set]
+        out["bus_loads"] = bus_loads
+        out["bus_shunts"] = bus_shunts
+        out["inline_devs"] = inline_devs
+        # Diagnostics
+        try:
+            anchors_count = len({n for n in nodes if n in coords_real_unit})
+            poly_sec_count = sum(1 for k,v in (polylines_unit or {}).items() if v)
+            poly_pts_count = sum(len(pts) for plist in (polylines_unit or {}).values() for pts in plist)
+            synth_nodes = [n for n in nodes if n not in coords_real_unit]
+            out["diag"] = {
+                "anchors": anchors_count,
+                "poly_sections": poly_sec_count,
+                "poly_points": poly_pts_count,
+                "synthetic_nodes": len(synth_nodes),
+                "y_down": y_down,
+            }
+        except Exception:
+            pass
+        return out
+    except Exception as e:
+        out["error"] = str(e)
+        return out
@@ -0,0 +1,151 @@
+# Modules/Jobs.py
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# Background job scheduler with cooperative cancellation.
+#
+# - At most one active job per *kind* ("map", "island", "export", ...).
+#   Submitting a new job of the same kind cancels the previous one.
+# - Long loops (XML parse, island graph, map layout) call checkpoint(),
+#   which raises JobCancelled in the worker thread as soon as its token is set.
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a worker when its job was cancelled or superseded.
+    Derives from BaseException (like KeyboardInterrupt) so the many
+    best-effort `except Exception` blocks in parsers/writers do not swallow it.
+    """
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+_local = threading.local()
+
+
+def current_token() -> Optional[CancelToken]:
+    """Token of the job running on this thread (None outside scheduled jobs)."""
+    return getattr(_local, "token", None)
+
+
+def checkpoint() -> None:
+    """Cooperative cancellation point. No-op when not running inside a job."""
+    tok = getattr(_local, "token", None)
+    if tok is not None and tok.cancelled:
+        raise JobCancelled()
+
+
+class Job:
+    def __init__(self, job_id: int, kind: str) -> None:
+        self.id = job_id
+        self.kind = kind
+        self.token = CancelToken()
+        self.thread: Optional[threading.Thread] = None
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+
+class JobScheduler:
+    """
+    Run callables on daemon threads, one active job per kind.
+
+    Callbacks (on_done / on_error / on_cancel) run on the worker thread;
+    GUI callers should forward them to the Tk thread (e.g., via a queue).
+    on_done is never called for a job that was cancelled, even if the
+    callable happened to finish before noticing.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._active: Dict[str, Job] = {}
+        self._counter = 0
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        on_cancel: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        with self._lock:
+            prev = self._active.get(kind)
+            if prev is not None:
+                prev.cancel()
+            self._counter += 1
+            job = Job(self._counter, kind)
+            self._active[kind] = job
+
+        def _run() -> None:
+            _local.token = job.token
+            try:
+                result = fn(*args)
+            except JobCancelled:
+                if on_cancel is not None:
+                    on_cancel()
+            except Exception as e:
+                if job.cancelled:
+                    if on_cancel is not None:
+                        on_cancel()
+                elif on_error is not None:
+                    on_error(e)
+            else:
+                if job.cancelled:
+                    if on_cancel is not None:
+                        on_cancel()
+                elif on_done is not None:
+                    on_done(result)
+            finally:
+                _local.token = None
+                with self._lock:
+                    if self._active.get(kind) is job:
+                        del self._active[kind]
+
+        job.thread = threading.Thread(target=_run, name=f"job-{kind}-{job.id}", daemon=True)
+        job.thread.start()
+        return job
+
+    def cancel(self, kind: str) -> bool:
+        """Cancel the active job of this kind. Returns True if one was running."""
+        with self._lock:
+            job = self._active.get(kind)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            jobs = list(self._active.values())
+        for job in jobs:
+            job.cancel()
+
+    def is_active(self, kind: str) -> bool:
+        with self._lock:
+            return kind in self._active
+
+    def is_current(self, job: Job) -> bool:
+        """True while `job` is the latest submitted job of its kind."""
+        with self._lock:
+            return self._active.get(job.kind) is job
@@ -5,15 +5,21 @@ from pathlib import Path
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Optional, Tuple
 import re
+import numpy as np
 from Modules.Bus import extract_bus_data  # reuse Bus page logic (and comment filtering)
 from Modules.IslandFilter import should_comment_branch, should_drop_branch, drop_mode_enabled
-from Modules.General import safe_name
+from Modules.General import safe_name, read_xml, get_export_options, base_mva_from_root
+from Modules.BaseVoltage import base_voltages
+from Modules.EquipmentDB import equipment_index
+from Modules.Blocks import FIRST_BLOCK_ROW, column_runs, start_template_sheet, write_block, write_type_link
+from Modules.Reduction import chain_reduction, reduce_line_items, reduction_enabled, write_reduction_sheet
 
 
 # ---- constants / small helpers ----
 MI_PER_M = 0.000621371192
 MI_PER_KM = 0.621371192  # multiply (per-km) to get per-mile
 PHASE_SUFFIX = {"A": "_a", "B": "_b", "C": "_c"}
+DEFAULT_BASE_MVA = 100.0  # per-unit base when GlobalParameters has no BaseMVA
 
 _PHASE_SUFFIX_RE = re.compile(r"_(a|b|c)$")
 
@@ -41,63 +47,11 @@ def _f(s: Optional[str]) -> float:
         return 0.0
 
 
-# ---- read line/cable databases (per-length) ----
-def _read_line_db_map(root: ET.Element) -> Dict[str, Dict[str, float]]:
-    """
-    EquipmentID -> dict of per-length values (assumed per-km for R/X and ÂµS/km for B).
-    Supports BOTH:
-      - per-phase set: SelfResistance*, SelfReactance*, ShuntSusceptance*, Mutual*
-      - sequence set:  PositiveSequenceResistance/Reactance/ShuntSusceptance,
-                       ZeroSequenceResistance/Reactance/ShuntSusceptance
-    """
-    per_phase_keys = [
-        "SelfResistanceA", "SelfResistanceB", "SelfResistanceC",
-        "SelfReactanceA",  "SelfReactanceB",  "SelfReactanceC",
-        "ShuntSusceptanceA", "ShuntSusceptanceB", "ShuntSusceptanceC",
-        "MutualResistanceAB", "MutualResistanceBC", "MutualResistanceCA",
-        "MutualReactanceAB",  "MutualReactanceBC",  "MutualReactanceCA",
-        "MutualShuntSusceptanceAB", "MutualShuntSusceptanceBC", "MutualShuntSusceptanceCA",
-    ]
-    seq_keys = [
-        "PositiveSequenceResistance", "PositiveSequenceReactance", "PositiveSequenceShuntSusceptance",
-        "ZeroSequenceResistance",     "ZeroSequenceReactance",     "ZeroSequenceShuntSusceptance",
-    ]
-
-    db: Dict[str, Dict[str, float]] = {}
-    for node in root.iter():
-        tag = node.tag.split("}")[-1] if isinstance(node.tag, str) else ""
-        if not tag.endswith("DB"):
-            continue
-        eid = (node.findtext("EquipmentID") or "").strip()
-        if not eid:
-            continue
-
-        vals: Dict[str, float] = {}
-        has_any = False
-
-        # collect per-phase fields
-        for k in per_phase_keys:
-            v = _f(node.findtext(k))
-            vals[k] = v
-            has_any = has_any or (v != 0.0)
-
-        # collect positive/zero sequence fields
-        for k in seq_keys:
-            v = _f(node.findtext(k))
-            vals[k] = v
-            has_any = has_any or (v != 0.0)
-
-        if has_any:
-            db[eid] = vals
-
-    return db
-
-
 # ---- parse section blocks ----
 def _iter_lines(root: ET.Element):
     """
     Yield dicts describing each line/cable section.
-      {type, id, from, to, phase, length_m, line_id}
+      {type, id, section_id, from, to, phase, length_m, line_id}
 
     NOTE: from/to and id are sanitized to [A-Za-z0-9_].
     The database lookup key (line_id/cable_id) is NOT sanitized.
@@ -106,6 +60,7 @@ def _iter_lines(root: ET.Element):
         from_bus_raw = (sec.findtext("FromNodeID") or "").strip()
         to_bus_raw   = (sec.findtext("ToNodeID") or "").strip()
         phase        = (sec.findtext("Phase") or "").strip().upper() or "ABC"
+        section_id   = (sec.findtext("SectionID") or "").strip()
 
         # sanitize bus names for output/IDs
         from_bus = safe_name(from_bus_raw)
@@ -118,6 +73,7 @@ def _iter_lines(root: ET.Element):
             yield {
                 "type": "OverheadLineUnbalanced",
                 "id": row_id,
+                "section_id": section_id,
                 "from": from_bus, "to": to_bus,
                 "phase": phase,
                 "length_m": _f(olu.findtext("Length")),
@@ -131,6 +87,7 @@ def _iter_lines(root: ET.Element):
             yield {
                 "type": "OverheadByPhase",
                 "id": row_id,
+                "section_id": section_id,
                 "from": from_bus, "to": to_bus,
                 "phase": phase,
                 "length_m": _f(obp.findtext("Length")),
@@ -144,6 +101,7 @@ def _iter_lines(root: ET.Element):
             yield {
                 "type": "OverheadLine",
                 "id": row_id,
+                "section_id": section_id,
                 "from": from_bus, "to": to_bus,
                 "phase": phase,
                 "length_m": _f(ol.findtext("Length")),
@@ -163,6 +121,7 @@ def _iter_lines(root: ET.Element):
             yield {
                 "type": "Underground",
                 "id": row_id,
+                "section_id": section_id,
                 "from": from_bus, "to": to_bus,
                 "phase": phase,
                 "length_m": _f(ug.findtext("Length")),
@@ -220,47 +179,81 @@ def _per_phase_matrix_from_seq(dbvals: Dict[str, float]) -> Tuple[float, float,
     return r_self, x_self, b_self, r_mut, x_mut, b_mut
 
 
-def _series_shunt_for_pair(dbvals: Dict[str, float], p1: str, p2: Optional[str] = None):
+# ---- line-code table: one 3x3 R/X/B set per EquipmentID ----
+_PH_INDEX = {"A": 0, "B": 1, "C": 2}
+# DB mutual keys -> (row, col) in the lower triangle (the matrices are symmetric)
+_MUTUAL_CELLS = (("AB", 1, 0), ("BC", 2, 1), ("CA", 2, 0))
+
+
+def _line_code_table(dbmap: Dict[str, Dict[str, float]]):
     """
-    Return (r11, x11, b11, r21, x21, b21, r22, x22, b22) per mile.
-    Works with either per-phase DBs or sequence-only DBs.
-    - If sequence-only: use transposed-line relations above.
-    - For 2-Ï†, we set r22/x22/b22 = r11/x11/b11 and r21/x21/b21 = mutual.
+    Per-mile phase-domain matrices for every line/cable code, computed once.
+    Returns (index, R, X, B): index maps EquipmentID -> row, R/X/B are
+    (n, 3, 3) float64 arrays. Row 0 is the all-zero code used when a section
+    has no DB record. Per-phase DBs fill self/mutual cells directly;
+    sequence-only DBs use the transposed-line equivalents.
     """
-    if _has_per_phase(dbvals):
-        # per-phase data available
-        r11 = _scaled(dbvals.get(f"SelfResistance{p1}", 0.0))
-        x11 = _scaled(dbvals.get(f"SelfReactance{p1}", 0.0))
-        b11 = _scaled(dbvals.get(f"ShuntSusceptance{p1}", 0.0))
+    n = len(dbmap) + 1
+    R = np.zeros((n, 3, 3))
+    X = np.zeros((n, 3, 3))
+    B = np.zeros((n, 3, 3))
+    index: Dict[str, int] = {}
+    for k, (eid, dbvals) in enumerate(dbmap.items(), start=1):
+        index[eid] = k
+        if _has_per_phase(dbvals):
+            for ph, i in _PH_INDEX.items():
+                R[k, i, i] = _scaled(dbvals.get(f"SelfResistance{ph}", 0.0))
+                X[k, i, i] = _scaled(dbvals.get(f"SelfReactance{ph}", 0.0))
+                B[k, i, i] = _scaled(dbvals.get(f"ShuntSusceptance{ph}", 0.0))
+            for key, i, j in _MUTUAL_CELLS:
+                R[k, i, j] = R[k, j, i] = _scaled(dbvals.get(f"MutualResistance{key}", 0.0))
+                X[k, i, j] = X[k, j, i] = _scaled(dbvals.get(f"MutualReactance{key}", 0.0))
+                B[k, i, j] = B[k, j, i] = _scaled(dbvals.get(f"MutualShuntSusceptance{key}", 0.0))
+        else:
+            r_s, x_s, b_s, r_m, x_m, b_m = _per_phase_matrix_from_seq(dbvals)
+            R[k] = r_m; X[k] = x_m; B[k] = b_m
+            np.fill_diagonal(R[k], r_s); np.fill_diagonal(X[k], x_s); np.fill_diagonal(B[k], b_s)
+    return index, R, X, B
 
-        if not p2:
-            return r11, x11, b11, None, None, None, None, None, None
 
-        r22 = _scaled(dbvals.get(f"SelfResistance{p2}", 0.0))
-        x22 = _scaled(dbvals.get(f"SelfReactance{p2}", 0.0))
-        b22 = _scaled(dbvals.get(f"ShuntSusceptance{p2}", 0.0))
+# Symmetrical components: V_abc = A @ V_012, so Z_012 = A^-1 @ Z_abc @ A
+_SEQ_A = np.array([[1, 1, 1],
+                   [1, np.exp(-2j * np.pi / 3), np.exp(2j * np.pi / 3)],
+                   [1, np.exp(2j * np.pi / 3), np.exp(-2j * np.pi / 3)]])
+_SEQ_A_INV = np.linalg.inv(_SEQ_A)
 
-        pair = "".join(sorted([p1, p2]))  # AB, AC, BC
-        key = {"AB": "AB", "AC": "CA", "BC": "BC"}[pair]  # DB uses AB, BC, CA
-        r21 = _scaled(dbvals.get(f"MutualResistance{key}", 0.0)) * 2.0
-        x21 = _scaled(dbvals.get(f"MutualReactance{key}", 0.0)) * 2.0
-        b21 = _scaled(dbvals.get(f"MutualShuntSusceptance{key}", 0.0)) * 2.0
-        return r11, x11, b11, r21, x21, b21, r22, x22, b22
 
-    # sequence-only â†’ build equivalents
-    r_s, x_s, b_s, r_m, x_m, b_m = _per_phase_matrix_from_seq(dbvals)
+def _sequence_table(R: np.ndarray, X: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """
+    Zero/positive-sequence values of every line code in one batched transform.
+    Returns (n, 6): R0, X0, R1, X1, B0, B1 (per mile; B in uS). Off-diagonal
+    sequence coupling of untransposed codes is dropped, as in any sequence model.
+    """
+    z012 = _SEQ_A_INV @ (R + 1j * X) @ _SEQ_A
+    b012 = (_SEQ_A_INV @ B.astype(complex) @ _SEQ_A).real
+    return np.stack([
+        z012[:, 0, 0].real, z012[:, 0, 0].imag, z012[:, 1, 1].real, z012[:, 1, 1].imag,
+        b012[:, 0, 0], b012[:, 1, 1],
+    ], axis=1)
 
-    if not p2:
-        return r_s, x_s, b_s, None, None, None, None, None, None
 
-    # two-phase: equal self on each phase, mutual between them
-    return r_s, x_s, b_s, r_m * 2.0, x_m * 2.0, b_m * 2.0, r_s, x_s, b_s
+def sequence_per_unit(seq: np.ndarray, length_mi: np.ndarray, kv_ll: np.ndarray, base_mva: float) -> np.ndarray:
+    """
+    Per-unit sequence values of whole sections from _sequence_table rows.
+    Returns (n, 6): R1, X1, B1, R0, X0, B0 on `base_mva` and each section's LL
+    base (Zbase = kV^2 / MVA; B in uS per mile becomes S * Zbase).
+    """
+    zbase = kv_ll * kv_ll / base_mva
+    z = seq[:, :4] * (length_mi / zbase)[:, None]
+    b = seq[:, 4:6] * (1e-6 * length_mi * zbase)[:, None]
+    return np.stack([z[:, 2], z[:, 3], b[:, 1], z[:, 0], z[:, 1], b[:, 0]], axis=1)
 
 
 # ---- sheet writer ----
 def write_line_sheet(xw, input_path: Path) -> None:
-    root = ET.fromstring(Path(input_path).read_text(encoding="utf-8", errors="ignore"))
-    dbmap = _read_line_db_map(root)
+    root = read_xml(input_path)
+    # EquipmentID -> per-length values (per-km R/X, uS/km B), per-phase and/or sequence set
+    dbmap = equipment_index(root)["line"]
 
     # Build known (ACTIVE) bus set from the Bus sheet logic
     known_buses = _bus_base_set_from_bus_sheet(input_path)
@@ -269,11 +262,29 @@ def write_line_sheet(xw, input_path: Path) -> None:
         # bus_base is sanitized already by pipeline
         return bus_base if bus_base in known_buses else f"{bus_base}_unknown"
 
-    single_rows: List[List[object]] = []
-    two_rows: List[List[object]] = []
-    three_full_rows: List[List[object]] = []
+    code_index, R, X, B = _line_code_table(dbmap)
+
+    def _code_for(item: dict) -> int:
+        dbid = item["line_id"]
+        if dbid and dbid in code_index:
+            return code_index[dbid]
+        if item["type"] == "OverheadByPhase" and "DEFAULT" in code_index:
+            # Prefer file's DEFAULT DB when OverheadByPhase has no LineID/CableID
+            return code_index["DEFAULT"]
+        # Keep old heuristic for other files
+        return code_index.get("LINE601" if item["phase"] == "ABC" else "LINE603", 0)
 
-    for item in _iter_lines(root):
+    # Per phase group: (id, from, to, phase) text and the numeric columns gathered below
+    groups: Dict[int, Dict[str, list]] = {
+        n: {"text": [], "code": [], "length_m": [], "from_base": []} for n in (1, 2, 3)
+    }
+
+    items = _iter_lines(root)
+    red = chain_reduction(input_path) if reduction_enabled() else None
+    if red is not None:
+        items = reduce_line_items(items, red)
+
+    for item in items:
         phase = item["phase"]
 
         # base names (already sanitized by _iter_lines)
@@ -296,192 +307,143 @@ def write_line_sheet(xw, input_path: Path) -> None:
 
         # Comment only if BOTH endpoints are inactive/missing; otherwise keep visible for troubleshooting.
         id_out = ("//" if (comment_for_island and (unknown_from and unknown_to)) else "") + item["id"]
-        length_mi = (item["length_m"] or 0.0) * MI_PER_M
-        status = 1
 
-        # --- pick DB values BEFORE computing rows ---
-        dbid = item["line_id"]
-        if dbid and dbid in dbmap:
-            dbvals = dbmap[dbid]
-        elif item["type"] == "OverheadByPhase" and "DEFAULT" in dbmap:
-            # Prefer file's DEFAULT DB when OverheadByPhase has no LineID/CableID
-            dbvals = dbmap["DEFAULT"]
-        else:
-            # Keep old heuristic for other files
-            fallback = "LINE601" if phase == "ABC" else "LINE603"
-            dbvals = dbmap.get(fallback, {})
-
-        if phase in ("A", "B", "C"):
-            p = phase
-            r11, x11, b11, *_ = _series_shunt_for_pair(dbvals, p)
-            single_rows.append([
-                id_out, status, length_mi,
-                f"{from_bus}{PHASE_SUFFIX[p]}",
-                f"{to_bus}{PHASE_SUFFIX[p]}",
-                r11, x11, b11
-            ])
-
-        elif phase in ("AB", "BC", "AC"):
-            p1, p2 = phase[0], phase[1]
-            r11, x11, b11, r21, x21, b21, r22, x22, b22 = _series_shunt_for_pair(dbvals, p1, p2)
-            two_rows.append([
-                id_out, status, length_mi,
-                f"{from_bus}{PHASE_SUFFIX[p1]}", f"{from_bus}{PHASE_SUFFIX[p2]}",
-                f"{to_bus}{PHASE_SUFFIX[p1]}",   f"{to_bus}{PHASE_SUFFIX[p2]}",
-                r11, x11, r21, x21, r22, x22, b11, b21, b22
-            ])
-
-        else:  # ABC
-            if _has_per_phase(dbvals):
-                r11 = _scaled(dbvals.get("SelfResistanceA", 0.0)); x11 = _scaled(dbvals.get("SelfReactanceA", 0.0))
-                r22 = _scaled(dbvals.get("SelfResistanceB", 0.0)); x22 = _scaled(dbvals.get("SelfReactanceB", 0.0))
-                r33 = _scaled(dbvals.get("SelfResistanceC", 0.0)); x33 = _scaled(dbvals.get("SelfReactanceC", 0.0))
-
-                r21 = _scaled(dbvals.get("MutualResistanceAB", 0.0)); x21 = _scaled(dbvals.get("MutualReactanceAB", 0.0))
-                r31 = _scaled(dbvals.get("MutualResistanceCA", 0.0)); x31 = _scaled(dbvals.get("MutualReactanceCA", 0.0))
-                r32 = _scaled(dbvals.get("MutualResistanceBC", 0.0)); x32 = _scaled(dbvals.get("MutualReactanceBC", 0.0))
-
-                b11 = _scaled(dbvals.get("ShuntSusceptanceA", 0.0))
-                b22 = _scaled(dbvals.get("ShuntSusceptanceB", 0.0))
-                b33 = _scaled(dbvals.get("ShuntSusceptanceC", 0.0))
-                b21 = _scaled(dbvals.get("MutualShuntSusceptanceAB", 0.0))
-                b31 = _scaled(dbvals.get("MutualShuntSusceptanceCA", 0.0))
-                b32 = _scaled(dbvals.get("MutualShuntSusceptanceBC", 0.0))
-            else:
-                # sequence-only â†’ build full matrix from Z1/Z0 and B1/B0
-                r_s, x_s, b_s, r_m, x_m, b_m = _per_phase_matrix_from_seq(dbvals)
-                r11 = r22 = r33 = r_s; x11 = x22 = x33 = x_s
-                r21 = r31 = r32 = r_m; x21 = x31 = x32 = x_m
-                b11 = b22 = b33 = b_s; b21 = b31 = b32 = b_m
-
-            three_full_rows.append([
-                id_out, status, length_mi,
-                f"{from_bus}_a", f"{from_bus}_b", f"{from_bus}_c",
-                f"{to_bus}_a",   f"{to_bus}_b",   f"{to_bus}_c",
-                r11, x11, r21, x21, r22, x22, r31, x31, r32, x32, r33, x33,
-                b11, b21, b22, b31, b32, b33
-            ])
+        nph = 1 if phase in ("A", "B", "C") else 2 if phase in ("AB", "BC", "AC") else 3
+        g = groups[nph]
+        g["text"].append((id_out, from_bus, to_bus, phase))
+        g["code"].append(_code_for(item))
+        g["length_m"].append(item["length_m"] or 0.0)
+        g["from_base"].append(from_base)
+
+    status = 1
+
+    def _gather(nph: int):
+        """Row text, lengths (mi, vectorized) and line-code indices for one phase group."""
+        g = groups[nph]
+        code = np.asarray(g["code"], dtype=np.intp)
+        length_mi = np.asarray(g["length_m"], dtype=float) * MI_PER_M
+        return g["text"], length_mi, code
+
+    # Single-phase: self terms of the section's phase
+    text, length_mi, code = _gather(1)
+    p = np.asarray([_PH_INDEX[t[3]] for t in text], dtype=np.intp)
+    cols = np.stack([R[code, p, p], X[code, p, p], B[code, p, p]], axis=1).tolist()
+    single_rows: List[List[object]] = [
+        [id_out, status, length, f"{fb}{PHASE_SUFFIX[ph]}", f"{tb}{PHASE_SUFFIX[ph]}", *vals]
+        for (id_out, fb, tb, ph), length, vals in zip(text, length_mi.tolist(), cols)
+    ]
+
+    # Two-phase: 2x2 block; mutual terms are doubled (r21 = 2 * Zm)
+    text, length_mi, code = _gather(2)
+    p1 = np.asarray([_PH_INDEX[t[3][0]] for t in text], dtype=np.intp)
+    p2 = np.asarray([_PH_INDEX[t[3][1]] for t in text], dtype=np.intp)
+    cols = np.stack([
+        R[code, p1, p1], X[code, p1, p1], R[code, p1, p2] * 2.0, X[code, p1, p2] * 2.0,
+        R[code, p2, p2], X[code, p2, p2],
+        B[code, p1, p1], B[code, p1, p2] * 2.0, B[code, p2, p2],
+    ], axis=1).tolist()
+    two_rows: List[List[object]] = [
+        [id_out, status, length,
+         f"{fb}{PHASE_SUFFIX[ph[0]]}", f"{fb}{PHASE_SUFFIX[ph[1]]}",
+         f"{tb}{PHASE_SUFFIX[ph[0]]}", f"{tb}{PHASE_SUFFIX[ph[1]]}",
+         *vals]
+        for (id_out, fb, tb, ph), length, vals in zip(text, length_mi.tolist(), cols)
+    ]
+
+    # Three-phase: one block per the export option (full matrices by default)
+    line_model = get_export_options().get("line_model", "full")
+    text, length_mi, code = _gather(3)
+    three_full_rows: List[List[object]] = []
+    seq_rows: List[List[object]] = []
+
+    if line_model == "full":
+        # full lower triangle, r11 x11 r21 x21 r22 x22 r31 x31 r32 x32 r33 x33, then B
+        Rs, Xs, Bs = R[code], X[code], B[code]
+        cols = np.stack([
+            Rs[:, 0, 0], Xs[:, 0, 0], Rs[:, 1, 0], Xs[:, 1, 0], Rs[:, 1, 1], Xs[:, 1, 1],
+            Rs[:, 2, 0], Xs[:, 2, 0], Rs[:, 2, 1], Xs[:, 2, 1], Rs[:, 2, 2], Xs[:, 2, 2],
+            Bs[:, 0, 0], Bs[:, 1, 0], Bs[:, 1, 1], Bs[:, 2, 0], Bs[:, 2, 1], Bs[:, 2, 2],
+        ], axis=1).tolist()
+        three_full_rows = [
+            [id_out, status, length,
+             f"{fb}_a", f"{fb}_b", f"{fb}_c", f"{tb}_a", f"{tb}_b", f"{tb}_c",
+             *vals]
+            for (id_out, fb, tb, _ph), length, vals in zip(text, length_mi.tolist(), cols)
+        ]
+    else:
+        # (sections, 6): R0 X0 R1 X1 B0 B1 per mile, then the section in per unit
+        # on BaseMVA and the from-bus LL base of the Bus sheet's base voltages
+        seq = _sequence_table(R, X, B)[code]
+        base_mva = base_mva_from_root(root)
+        if not base_mva or base_mva <= 0:
+            print(f"[Line] BaseMVA missing or zero in GlobalParameters; using {DEFAULT_BASE_MVA:g} MVA")
+            base_mva = DEFAULT_BASE_MVA
+        bv = base_voltages(input_path)
+        kv = np.asarray([bv["ll_kv"].get(b, bv["default_ll_kv"]) for b in groups[3]["from_base"]], dtype=float)
+        pu = sequence_per_unit(seq, length_mi, kv, base_mva)
+        seq_rows = [
+            [id_out, status, length,
+             f"{fb}_a", f"{fb}_b", f"{fb}_c", f"{tb}_a", f"{tb}_b", f"{tb}_c",
+             *vals, *vals_pu]
+            for (id_out, fb, tb, _ph), length, vals, vals_pu
+            in zip(text, length_mi.tolist(), seq.tolist(), pu.tolist())
+        ]
 
     # ---- write sheet (xlsxwriter) ----
-    wb = xw.book
-    ws = wb.add_worksheet("Line")
-    xw.sheets["Line"] = ws
-
-    # Formats
-    bold = wb.add_format({"bold": True})
-    link_fmt = wb.add_format({"font_color": "blue", "underline": 1})
-    notes_hdr = wb.add_format({"bold": True, "font_color": "yellow", "bg_color": "#595959", "align": "left"})
-    notes_txt = wb.add_format({"font_color": "yellow", "bg_color": "#595959"})
-    th = wb.add_format({"bold": True, "bottom": 1})
-    num6 = wb.add_format({"num_format": "0.000000"})
-    num4 = wb.add_format({"num_format": "0.0000"})
-
-    # Column widths
     widths = [28, 8, 12, 12, 12, 13, 13, 13, 12, 12, 12, 12, 12, 12,
               12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12]
-    for c, w in enumerate(widths):
-        ws.set_column(c, c, w)
-
-    # Type + top links
-    ws.write(0, 0, "Type", bold)
-
-    # Anchors
-    r = 10
-    b1_t, b1_h, b1_e = r, r + 1, r + 2; r = b1_e + 2
-    b2_t, b2_h, b2_first = r, r + 1, r + 2; b2_e = b2_first + len(single_rows); r = b2_e + 2
-    b3_t, b3_h, b3_first = r, r + 1, r + 2; b3_e = b3_first + len(two_rows);  r = b3_e + 2
-    b4_t, b4_h, b4_first = r, r + 1, r + 2; b4_e = b4_first + len(three_full_rows); r = b4_e + 2
-    b5_t, b5_h, b5_e = r, r + 1, r + 2
-
-    # Top link ranges
-    ws.write_url(1, 0, f"internal:'Line'!A{b1_h+1}:G{b1_e+1}", link_fmt, "PositiveSeqLine")
-    ws.write_url(2, 0, f"internal:'Line'!A{b2_h+1}:H{b2_e+1}", link_fmt, "SinglePhaseLine")
-    ws.write_url(3, 0, f"internal:'Line'!A{b3_h+1}:P{b3_e+1}", link_fmt, "TwoPhaseLine")
-    ws.write_url(4, 0, f"internal:'Line'!A{b4_h+1}:AA{max(b4_h+1, b4_e+1)}", link_fmt, "ThreePhaseLineFullData")
-    ws.write_url(5, 0, f"internal:'Line'!A{b5_h+1}:O{b5_e+1}", link_fmt, "ThreePhaseLineSequentialData")
-
-    # Notes
-    ws.merge_range(7, 0, 7, 7, "Important notes:", notes_hdr)
-    ws.merge_range(8, 0, 8, 7, "Default order of blocks and columns after row 11 must not change", notes_txt)
-    ws.merge_range(9, 0, 9, 7, "One empty row between End of each block and the next block is mandatory; otherwise, empty rows are NOT allowed", notes_txt)
-
-    # Block 1 (empty)
-    ws.merge_range(b1_t, 0, b1_t, 1, "Positive-Sequence Line", bold)
-    ws.write_url(b1_t, 2, "internal:'Line'!A1", link_fmt, "Go to Type List")
-    ws.write_row(b1_h, 0, ["ID", "Status", "From bus", "To bus", "R (pu)", "X (pu)", "B (pu)"], th)
-    ws.merge_range(b1_e, 0, b1_e, 1, "End of Positive-Sequence Line")
-
-    # Block 2: Single-Phase
-    ws.merge_range(b2_t, 0, b2_t, 1, "Single-Phase Line", bold)
-    ws.write_url(b2_t, 2, "internal:'Line'!A1", link_fmt, "Go to Type List")
-    ws.write_row(b2_h, 0, ["ID","Status","Length","From1","To1","r11 (Ohm/length_unit)","x11 (Ohm/length_unit)","b11 (uS/length_unit)"], th)
-    rcur = b2_first
-    for row in single_rows:
-        ws.write(rcur, 0, row[0]); ws.write_number(rcur, 1, row[1])
-        ws.write_number(rcur, 2, row[2], num6); ws.write(rcur, 3, row[3]); ws.write(rcur, 4, row[4])
-        ws.write_number(rcur, 5, row[5], num4); ws.write_number(rcur, 6, row[6], num4); ws.write_number(rcur, 7, row[7], num4)
-        rcur += 1
-    ws.merge_range(b2_e, 0, b2_e, 1, "End of Single-Phase Line")
-
-    # Block 3: Two-Phase
-    ws.merge_range(b3_t, 0, b3_t, 1, "Two-Phase Line", bold)
-    ws.write_url(b3_t, 2, "internal:'Line'!A1", link_fmt, "Go to Type List")
-    ws.write_row(
-        b3_h, 0,
-        ["ID","Status","Length","From1","From2","To1","To2",
-         "r11 (Ohm/length_unit)","x11 (Ohm/length_unit)",
-         "r21 (Ohm/length_unit)","x21 (Ohm/length_unit)",
-         "r22 (Ohm/length_unit)","x22 (Ohm/length_unit)",
-         "b11 (uS/length_unit)","b21 (uS/length_unit)","b22 (uS/length_unit)"],
-        th
-    )
-    rcur = b3_first
-    for row in two_rows:
-        for c, v in enumerate(row):
-            if c in (2, 7, 8, 9, 10, 11, 12, 13, 14, 15):  # numeric cols
-                fmt = num6 if c == 2 else num4
-                ws.write_number(rcur, c, v if v is not None else 0.0, fmt)
-            else:
-                ws.write(rcur, c, v if v is not None else "")
-        rcur += 1
-    ws.merge_range(b3_e, 0, b3_e, 1, "End of Two-Phase Line")
-
-    # Block 4: Three-Phase Full Data
-    ws.merge_range(b4_t, 0, b4_t, 1, "Three-Phase Line with Full Data", bold)
-    ws.write_url(b4_t, 2, "internal:'Line'!A1", link_fmt, "Go to Type List")
-    ws.write_row(
-        b4_h, 0,
-        ["ID","Status","Length","From1","From2","From3","To1","To2","To3",
-         "r11 (Ohm/length_unit)","x11 (Ohm/length_unit)",
-         "r21 (Ohm/length_unit)","x21 (Ohm/length_unit)",
-         "r22 (Ohm/length_unit)","x22 (Ohm/length_unit)",
-         "r31 (Ohm/length_unit)","x31 (Ohm/length_unit)",
-         "r32 (Ohm/length_unit)","x32 (Ohm/length_unit)",
-         "r33 (Ohm/length_unit)","x33 (Ohm/length_unit)",
-         "b11 (uS/length_unit)","b21 (uS/length_unit)","b22 (uS/length_unit)",
-         "b31 (uS/length_unit)","b32 (uS/length_unit)","b33 (uS/length_unit)"],
-        th
-    )
-    rcur = b4_first
-    for row in three_full_rows:
-        for c, v in enumerate(row):
-            if c in (2, 9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25):  # numeric
-                fmt = num6 if c == 2 else num4
-                ws.write_number(rcur, c, v if v is not None else 0.0, fmt)
-            else:
-                ws.write(rcur, c, v if v is not None else "")
-        rcur += 1
-    ws.merge_range(b4_e, 0, b4_e, 1, "End of Three-Phase Line with Full Data")
-
-    # Block 5: Sequential (template)
-    ws.merge_range(b5_t, 0, b5_t, 1, "Three-Phase Line with Sequential Data", bold)
-    ws.write_url(b5_t, 2, "internal:'Line'!A1", link_fmt, "Go to Type List")
-    ws.write_row(
-        b5_h, 0,
-        ["ID","Status","Length","From1","From2","From3","To1","To2","To3",
-         "R0 (Ohm/length_unit)","X0 (Ohm/length_unit)","R1 (Ohm/length_unit)",
-         "X1 (Ohm/length_unit)","B0 (uS/length_unit)","B1 (uS/length_unit)"],
-        th
-    )
-    ws.merge_range(b5_e, 0, b5_e, 2, "End of Three-Phase Line with Sequential Data")
-
+    ws, fmts = start_template_sheet(xw, "Line", widths)
+    num6 = xw.book.add_format({"num_format": "0.000000"})
+    num4 = xw.book.add_format({"num_format": "0.0000"})
+    sci = xw.book.add_format({"num_format": "0.0000E+00"})
+
+    # Per-column formats: ID/bus text unformatted, Length 0.000000, impedances 0.0000,
+    # per-unit sequence values in scientific notation (sections are small on BaseMVA)
+    single_runs = column_runs([None, None, num6, None, None] + [num4] * 3)
+    two_runs = column_runs([None, None, num6] + [None] * 4 + [num4] * 9)
+    # (b33, the last column, has always been written without a number format)
+    full_runs = column_runs([None, None, num6] + [None] * 6 + [num4] * 17 + [None])
+    seq_runs = column_runs([None, None, num6] + [None] * 6 + [num4] * 6 + [sci] * 6)
+
+    r = FIRST_BLOCK_ROW
+    # Block 1 stays empty: the phase-domain Bus sheet has no positive-sequence buses
+    b1 = write_block(ws, fmts, "Line", r, "Positive-Sequence Line",
+                     ["ID", "Status", "From bus", "To bus", "R (pu)", "X (pu)", "B (pu)"],
+                     [], [])
+    b2 = write_block(ws, fmts, "Line", b1["next"], "Single-Phase Line",
+                     ["ID","Status","Length","From1","To1","r11 (Ohm/length_unit)","x11 (Ohm/length_unit)","b11 (uS/length_unit)"],
+                     single_rows, single_runs)
+    b3 = write_block(ws, fmts, "Line", b2["next"], "Two-Phase Line",
+                     ["ID","Status","Length","From1","From2","To1","To2",
+                      "r11 (Ohm/length_unit)","x11 (Ohm/length_unit)",
+                      "r21 (Ohm/length_unit)","x21 (Ohm/length_unit)",
+                      "r22 (Ohm/length_unit)","x22 (Ohm/length_unit)",
+                      "b11 (uS/length_unit)","b21 (uS/length_unit)","b22 (uS/length_unit)"],
+                     two_rows, two_runs)
+    b4 = write_block(ws, fmts, "Line", b3["next"], "Three-Phase Line with Full Data",
+                     ["ID","Status","Length","From1","From2","From3","To1","To2","To3",
+                      "r11 (Ohm/length_unit)","x11 (Ohm/length_unit)",
+                      "r21 (Ohm/length_unit)","x21 (Ohm/length_unit)",
+                      "r22 (Ohm/length_unit)","x22 (Ohm/length_unit)",
+                      "r31 (Ohm/length_unit)","x31 (Ohm/length_unit)",
+                      "r32 (Ohm/length_unit)","x32 (Ohm/length_unit)",
+                      "r33 (Ohm/length_unit)","x33 (Ohm/length_unit)",
+                      "b11 (uS/length_unit)","b21 (uS/length_unit)","b22 (uS/length_unit)",
+                      "b31 (uS/length_unit)","b32 (uS/length_unit)","b33 (uS/length_unit)"],
+                     three_full_rows, full_runs)
+    b5 = write_block(ws, fmts, "Line", b4["next"], "Three-Phase Line with Sequential Data",
+                     ["ID","Status","Length","From1","From2","From3","To1","To2","To3",
+                      "R0 (Ohm/length_unit)","X0 (Ohm/length_unit)","R1 (Ohm/length_unit)",
+                      "X1 (Ohm/length_unit)","B0 (uS/length_unit)","B1 (uS/length_unit)",
+                      "R1 (pu)","X1 (pu)","B1 (pu)","R0 (pu)","X0 (pu)","B0 (pu)"],
+                     seq_rows, seq_runs, end_to=2)
+
+    # Type list
+    write_type_link(ws, fmts, "Line", 1, 0, "PositiveSeqLine", b1, "G")
+    write_type_link(ws, fmts, "Line", 2, 0, "SinglePhaseLine", b2, "H")
+    write_type_link(ws, fmts, "Line", 3, 0, "TwoPhaseLine", b3, "P")
+    write_type_link(ws, fmts, "Line", 4, 0, "ThreePhaseLineFullData", b4, "AA")
+    write_type_link(ws, fmts, "Line", 5, 0, "ThreePhaseLineSequentialData", b5, "U")
+
+    if red is not None:
+        write_reduction_sheet(xw, red)
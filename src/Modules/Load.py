@@ -1,144 +1,25 @@
 # Modules/Load.py
 from __future__ import annotations
 
+from array import array
 from pathlib import Path
 import math
-import re
+import numpy as np
 import xml.etree.ElementTree as ET
-from collections import deque
 from typing import Dict, List, Tuple, Any, Set
-from Modules.General import safe_name
+from Modules.General import safe_name, read_xml
+from Modules.BaseVoltage import base_voltages
+from Modules.LoadAggregation import aggregate_load_rows, aggregation_mode, write_aggregation_sheet
+from Modules.Blocks import FIRST_BLOCK_ROW, column_runs, start_template_sheet, write_block, write_type_link
 from Modules.IslandFilter import should_comment_branch, should_comment_bus, should_drop_bus, is_bus_allowed
 
 PHASES = ("A", "B", "C")
 PHASE_SUFFIX = {"A": "_a", "B": "_b", "C": "_c"}
+_PH_CODE = {"A": 0, "B": 1, "C": 2}
 EPS = 1e-6  # numerical zero
 
-_PHASE_SUFFIX_RE = re.compile(r"_(a|b|c)$")
-
 def _read_xml(path: Path) -> ET.Element:
-    return ET.fromstring(path.read_text(encoding="utf-8", errors="ignore"))
-
-
-# =======================
-# Voltage map (KVLL) builder
-# =======================
-def _get_source_kvll(root: ET.Element) -> float:
-    eq = root.find(".//Sources/Source/EquivalentSourceModels/EquivalentSourceModel/EquivalentSource")
-    if eq is not None:
-        try:
-            v = eq.findtext("KVLL")
-            return float(v) if v not in (None, "") else 0.0
-        except Exception:
-            return 0.0
-    return 0.0
-
-
-def _read_transformer_db(root: ET.Element) -> Dict[str, Dict[str, float]]:
-    out: Dict[str, Dict[str, float]] = {}
-    for tdb in root.findall(".//TransformerDB"):
-        eid = (tdb.findtext("EquipmentID") or "").strip()
-        if not eid:
-            continue
-
-        def f(name: str) -> float:
-            v = tdb.findtext(name)
-            try:
-                return float(v) if v not in (None, "") else 0.0
-            except Exception:
-                return 0.0
-
-        out[eid] = {
-            "kvp": f("PrimaryVoltage") or f("PrimaryKV"),
-            "kvs": f("SecondaryVoltage") or f("SecondaryKV"),
-        }
-    return out
-
-
-def _build_voltage_map(txt_path: Path) -> Dict[str, float]:
-    """
-    Seed KVLL from <Sources> and transformer DB, then propagate through
-    'pure network' branches (lines/cables/switches) that do not host loads/shunts.
-    All node IDs are sanitized so they match sheet outputs.
-    """
-    root = _read_xml(Path(txt_path))
-    kvll_default = _get_source_kvll(root)
-    tdb = _read_transformer_db(root)
-
-    G: Dict[str, Set[str]] = {}
-
-    def add_edge(a_raw: str, b_raw: str) -> None:
-        a, b = safe_name(a_raw), safe_name(b_raw)
-        if not a or not b:
-            return
-        G.setdefault(a, set()).add(b)
-        G.setdefault(b, set()).add(a)
-
-    seeds: Dict[str, float] = {}
-    src_node = safe_name(root.findtext(".//Sources/Source/SourceNodeID"))
-    if src_node and kvll_default > 0:
-        seeds[src_node] = kvll_default
-
-    for sec in root.findall(".//Sections/Section"):
-        f_raw = (sec.findtext("./FromNodeID") or "").strip()
-        t_raw = (sec.findtext("./ToNodeID") or "").strip()
-        f = safe_name(f_raw)
-        t = safe_name(t_raw)
-
-        has_spot = sec.find(".//Devices/SpotLoad") is not None
-        has_dist = sec.find(".//Devices/DistributedLoad") is not None   # NEW: distributed
-        has_shunt = (sec.find(".//Devices/ShuntCapacitor") is not None
-                     or sec.find(".//Devices/ShuntReactor") is not None)
-
-        xf = sec.find(".//Devices/Transformer")
-        if xf is not None:
-            dev_id = (xf.findtext("DeviceID") or "").strip()
-            normal = safe_name(xf.findtext("NormalFeedingNodeID"))
-            vals = tdb.get(dev_id, {})
-            kvp = vals.get("kvp") or 0.0
-            kvs = vals.get("kvs") or 0.0
-            if kvp > 0 or kvs > 0:
-                if normal and normal == f:
-                    if kvp > 0: seeds.setdefault(f, kvp)
-                    if kvs > 0: seeds.setdefault(t, kvs)
-                elif normal and normal == t:
-                    if kvp > 0: seeds.setdefault(t, kvp)
-                    if kvs > 0: seeds.setdefault(f, kvs)
-                else:
-                    if kvp > 0: seeds.setdefault(f, kvp)
-                    if kvs > 0: seeds.setdefault(t, kvs)
-            continue
-
-        has_line = (
-            sec.find(".//Devices/OverheadLine") is not None
-            or sec.find(".//Devices/OverheadLineUnbalanced") is not None
-            or sec.find(".//Devices/OverheadByPhase") is not None
-            or sec.find(".//Devices/UndergroundCable") is not None
-            or sec.find(".//Devices/Underground") is not None
-        )
-        has_switch = sec.find(".//Devices/Switch") is not None
-
-        # Do NOT connect across sections that host any load (spot or distributed) or shunt
-        if (has_line or has_switch) and not (has_spot or has_dist or has_shunt):
-            add_edge(f, t)
-
-    # BFS propagate (on sanitized node names)
-    bus_kv: Dict[str, float] = {}
-
-    for start, kv in seeds.items():
-        if start in bus_kv:
-            continue
-        q = deque([start])
-        bus_kv[start] = kv
-        while q:
-            u = q.popleft()
-            for v in G.get(u, ()):
-                if v not in bus_kv:
-                    bus_kv[v] = kv
-                    q.append(v)
-
-    bus_kv["_default_"] = kvll_default if kvll_default > 0 else 0.0
-    return bus_kv
+    return read_xml(path)
 
 
 # =======================
@@ -256,13 +137,40 @@ def _expand_phases(phase_tag: str | None) -> List[str]:
     return []
 
 
-def _parse_spot_and_distributed_loads(txt_path: Path) -> List[Dict[str, Any]]:
+class _Interner:
+    """String <-> small int code, codes in first-seen order."""
+    __slots__ = ("codes", "values")
+
+    def __init__(self) -> None:
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def __call__(self, s: str) -> int:
+        c = self.codes.get(s)
+        if c is None:
+            c = self.codes[s] = len(self.values)
+            self.values.append(s)
+        return c
+
+
+def _parse_spot_and_distributed_loads(txt_path: Path) -> Dict[str, Any]:
     """
-    Build observations per declared phase from BOTH SpotLoad and DistributedLoad.
-    All bus/ID fields sanitized. We keep zero values; grouping decides visibility.
+    Per-phase load observations from BOTH SpotLoad and DistributedLoad, held
+    columnar: one entry per declared phase of each CustomerLoadValue.
+
+      arrays  load, bus, phase (0..2 = A..C), status, lvt, conn, cust  (int codes)
+              kw, kvar                                                 (float64)
+      strings load, bus, lvt, conn, cust  (code -> sanitized/trimmed text)
+
+    Load codes follow first appearance, which is the row order of the sheet.
+    We keep zero values; grouping decides visibility.
     """
     root = _read_xml(Path(txt_path))
-    out: List[Dict[str, Any]] = []
+
+    ids, buses, lvts, conns, custs = _Interner(), _Interner(), _Interner(), _Interner(), _Interner()
+    c_load, c_bus, c_phase = array("i"), array("i"), array("b")
+    c_status, c_lvt, c_conn, c_cust = array("b"), array("i"), array("i"), array("i")
+    c_kw, c_kvar = array("d"), array("d")
 
     for sec in root.findall(".//Sections/Section"):
         section_id = safe_name(sec.findtext("./SectionID"))
@@ -274,117 +182,116 @@ def _parse_spot_and_distributed_loads(txt_path: Path) -> List[Dict[str, Any]]:
         devices = list(sec.findall(".//Devices/SpotLoad")) + list(sec.findall(".//Devices/DistributedLoad"))
         if not devices:
             continue
+        bus_code = buses(from_bus)
 
         for dev in devices:
             dev_num = safe_name(dev.findtext("./DeviceNumber"))
-            conn_cfg = (dev.findtext("./ConnectionConfiguration") or "").strip()
             # Status & type live under CustomerLoad
             status_txt = (dev.findtext(".//CustomerLoad/ConnectionStatus") or "").strip().lower()
             status = 1 if status_txt == "connected" else 0
-            cust_type = (dev.findtext(".//CustomerLoad/CustomerType") or "").strip()
             # Load value type (for ZIP flags)
             lvt = (dev.findtext(".//CustomerLoadModel/LoadValueType") or "").strip().upper()
+            conn_cfg = (dev.findtext("./ConnectionConfiguration") or "").strip()
+            cust_type = (dev.findtext(".//CustomerLoad/CustomerType") or "").strip()
 
-            load_id = _norm_load_id(dev_num, section_id, from_bus)
-
+            load_code = None
             for val in dev.findall(".//CustomerLoadValue"):
                 phases = _expand_phases(val.findtext("./Phase"))
                 if not phases:
                     continue
+                if load_code is None:
+                    load_code = ids(_norm_load_id(dev_num, section_id, from_bus))
+                    dev_codes = (lvts(lvt), conns(conn_cfg), custs(cust_type))
                 kw, kvar = _kw_kvar_from_value(val)
                 share_p = float((kw or 0.0) / len(phases))
                 share_q = float((kvar or 0.0) / len(phases))
                 for p in phases:
-                    out.append({
-                        "id": load_id,
-                        "bus": from_bus,
-                        "phase": p,
-                        "conn": conn_cfg,
-                        "kw": share_p,
-                        "kvar": share_q,
-                        "status": status,
-                        "cust_type": cust_type,
-                        "lvt": lvt,
-                        "declared": True,
-                    })
-
-    return out
+                    c_load.append(load_code); c_bus.append(bus_code); c_phase.append(_PH_CODE[p])
+                    c_status.append(status)
+                    c_lvt.append(dev_codes[0]); c_conn.append(dev_codes[1]); c_cust.append(dev_codes[2])
+                    c_kw.append(share_p); c_kvar.append(share_q)
+
+    def _np(col: array, dtype) -> np.ndarray:
+        return np.frombuffer(col, dtype=dtype) if len(col) else np.zeros(0, dtype=dtype)
+
+    return {
+        "arrays": {
+            "load": _np(c_load, np.intc), "bus": _np(c_bus, np.intc), "phase": _np(c_phase, np.int8),
+            "status": _np(c_status, np.int8), "lvt": _np(c_lvt, np.intc),
+            "conn": _np(c_conn, np.intc), "cust": _np(c_cust, np.intc),
+            "kw": _np(c_kw, np.float64), "kvar": _np(c_kvar, np.float64),
+        },
+        "strings": {
+            "load": ids.values, "bus": buses.values, "lvt": lvts.values,
+            "conn": conns.values, "cust": custs.values,
+        },
+    }
 
 
 # -----------------------
 # Group rows: 1Ï† / 2Ï† / 3Ï†
 # -----------------------
-def _group_by_device(observations: List[Dict[str, Any]]):
-    acc: Dict[str, Dict[str, Dict[str, float]]] = {}
-    declared: Dict[str, Set[str]] = {}
-    meta: Dict[str, Dict[str, Any]] = {}
-
-    for o in observations:
-        lid = o["id"]
-        ph = o["phase"]
-        acc.setdefault(lid, {})
-        acc[lid].setdefault(ph, {"kw": 0.0, "kvar": 0.0})
-        acc[lid][ph]["kw"] += o["kw"]
-        acc[lid][ph]["kvar"] += o["kvar"]
-        declared.setdefault(lid, set()).add(ph)
-        # keep the first-seen metadata; if multiple lvt appear, last one wins (rare)
-        m = meta.get(lid, {})
-        meta[lid] = {
-            "bus": o["bus"],
-            "conn": o["conn"],
-            "status": o["status"],
-            "cust_type": o["cust_type"],
-            "lvt": o.get("lvt", m.get("lvt")),
-        }
-
-    single, two, three = [], [], []
-    for lid, phase_map in acc.items():
-        nz_phases = [p for p in PHASES
-                     if abs(phase_map.get(p, {}).get("kw", 0.0)) > EPS
-                     or abs(phase_map.get(p, {}).get("kvar", 0.0)) > EPS]
-
-        phases_used = nz_phases if nz_phases else [p for p in PHASES if p in declared.get(lid, set())]
-        if not phases_used:
-            continue
-
-        m = meta[lid]
-        base = {
-            "ID": lid,
-            "Status": m["status"],
-            "Bus": m["bus"],
-            "Conn": m["conn"],
-            "CustType": m["cust_type"],
-            "LVT": m.get("lvt", ""),
-        }
-
-        if len(phases_used) == 1:
-            p = phases_used[0]
-            row = dict(base)
-            row.update({"Phase": p,
-                        "P1": phase_map.get(p, {}).get("kw", 0.0),
-                        "Q1": phase_map.get(p, {}).get("kvar", 0.0)})
-            single.append(row)
-
-        elif len(phases_used) == 2:
-            p1, p2 = phases_used[0], phases_used[1]
-            row = dict(base)
-            row.update({
-                "PhasePair": (p1, p2),
-                "P1": phase_map.get(p1, {}).get("kw", 0.0),
-                "Q1": phase_map.get(p1, {}).get("kvar", 0.0),
-                "P2": phase_map.get(p2, {}).get("kw", 0.0),
-                "Q2": phase_map.get(p2, {}).get("kvar", 0.0),
-            })
-            two.append(row)
-
-        else:  # 3 phases
-            row = dict(base)
-            row.update({
-                "P_A": phase_map.get("A", {}).get("kw", 0.0), "Q_A": phase_map.get("A", {}).get("kvar", 0.0),
-                "P_B": phase_map.get("B", {}).get("kw", 0.0), "Q_B": phase_map.get("B", {}).get("kvar", 0.0),
-                "P_C": phase_map.get("C", {}).get("kw", 0.0), "Q_C": phase_map.get("C", {}).get("kvar", 0.0),
-            })
-            three.append(row)
+def _group_by_device(observations: Dict[str, Any]):
+    """
+    Sum kW/kvar per (load, phase) and classify each load by the phases it uses:
+    the phases with a non-zero value, else every declared phase. Metadata (bus,
+    connection, status, types) comes from the load's last observation.
+    """
+    a, names = observations["arrays"], observations["strings"]
+    n = len(names["load"])
+    single: List[Dict[str, Any]] = []
+    two: List[Dict[str, Any]] = []
+    three: List[Dict[str, Any]] = []
+    if n == 0:
+        return single, two, three
+
+    key = a["load"].astype(np.intp) * 3 + a["phase"]
+    P = np.bincount(key, weights=a["kw"], minlength=3 * n).reshape(n, 3)
+    Q = np.bincount(key, weights=a["kvar"], minlength=3 * n).reshape(n, 3)
+    declared = np.bincount(key, minlength=3 * n).reshape(n, 3) > 0
+
+    last = np.full(n, -1, dtype=np.intp)
+    np.maximum.at(last, a["load"], np.arange(len(key)))
+
+    nz = (np.abs(P) > EPS) | (np.abs(Q) > EPS)
+    used = np.where(nz.any(axis=1)[:, None], nz, declared)
+    nused = used.sum(axis=1)
+
+    bus = [names["bus"][c] for c in a["bus"][last]]
+    conn = [names["conn"][c] for c in a["conn"][last]]
+    cust = [names["cust"][c] for c in a["cust"][last]]
+    lvt = [names["lvt"][c] for c in a["lvt"][last]]
+    status = a["status"][last].tolist()
+
+    def _base(i: int) -> Dict[str, Any]:
+        return {"ID": names["load"][i], "Status": status[i], "Bus": bus[i],
+                "Conn": conn[i], "CustType": cust[i], "LVT": lvt[i]}
+
+    # 1-phase: the used phase
+    idx = np.flatnonzero(nused == 1)
+    ph = used[idx].argmax(axis=1)
+    for i, p, kw, kvar in zip(idx.tolist(), ph.tolist(), P[idx, ph].tolist(), Q[idx, ph].tolist()):
+        row = _base(i)
+        row.update({"Phase": PHASES[p], "P1": kw, "Q1": kvar})
+        single.append(row)
+
+    # 2-phase: the used pair in ABC order
+    idx = np.flatnonzero(nused == 2)
+    p1 = used[idx].argmax(axis=1)
+    p2 = 2 - used[idx, ::-1].argmax(axis=1)
+    for i, a1, a2, pq in zip(idx.tolist(), p1.tolist(), p2.tolist(),
+                             np.stack([P[idx, p1], Q[idx, p1], P[idx, p2], Q[idx, p2]], axis=1).tolist()):
+        row = _base(i)
+        row.update({"PhasePair": (PHASES[a1], PHASES[a2]),
+                    "P1": pq[0], "Q1": pq[1], "P2": pq[2], "Q2": pq[3]})
+        two.append(row)
+
+    # 3-phase
+    idx = np.flatnonzero(nused == 3)
+    for i, pq in zip(idx.tolist(), np.stack([P[idx], Q[idx]], axis=2).reshape(len(idx), 6).tolist()):
+        row = _base(i)
+        row.update({"P_A": pq[0], "Q_A": pq[1], "P_B": pq[2], "Q_B": pq[3], "P_C": pq[4], "Q_C": pq[5]})
+        three.append(row)
 
     return single, two, three
 
@@ -405,231 +312,107 @@ def _zip_flags(cust_type: str, load_value_type: str | None = None) -> tuple[int,
     return 0, 0, 1       # default to constant power
 
 
+def load_rows(input_path: Path):
+    """
+    (single, two, three, members): the rows of the Load sheet for the current
+    island scope and export options. `members` is the aggregate -> member map,
+    or None when load aggregation is off.
+    """
+    # Parse + group (Spot + Distributed)
+    obs = _parse_spot_and_distributed_loads(input_path)
+    single_rows, two_rows, three_rows = _group_by_device(obs)
+
+    # Always drop loads whose bus is not allowed (prevents empty inputs and orphan refs)
+    single_rows = [row for row in single_rows if is_bus_allowed(row["Bus"])]
+    two_rows = [row for row in two_rows if is_bus_allowed(row["Bus"])]
+    three_rows = [row for row in three_rows if is_bus_allowed(row["Bus"])]
+
+    # Optional aggregation per bus / service transformer (same blocks, fewer rows)
+    members = None
+    if aggregation_mode() != "none":
+        single_rows, two_rows, three_rows, members = aggregate_load_rows(
+            single_rows, two_rows, three_rows, input_path, _zip_flags)
+    return single_rows, two_rows, three_rows, members
+
+
 # =======================
 # Sheet writer
 # =======================
 def write_load_sheet(xw, input_path: Path) -> None:
-    wb = xw.book
-    ws = wb.add_worksheet("Load")
-    xw.sheets["Load"] = ws
-
-    # Formats
-    bold = wb.add_format({"bold": True})
-    link_fmt = wb.add_format({"font_color": "blue", "underline": 1})
-    notes_hdr = wb.add_format({"bold": True, "font_color": "yellow", "bg_color": "#595959", "align": "left"})
-    notes_txt = wb.add_format({"font_color": "yellow", "bg_color": "#595959"})
-    th = wb.add_format({"bold": True, "bottom": 1})
-    num2 = wb.add_format({"num_format": "0.00"})
-    num0 = wb.add_format({"num_format": "0"})
-
     # Column widths A..R
     widths = [28, 10, 10, 12, 14, 9, 9, 9, 18, 14, 14, 14, 10, 10, 10, 10, 10, 10]
-    for c, w in enumerate(widths):
-        ws.set_column(c, c, w)
+    ws, fmts = start_template_sheet(xw, "Load", widths)
+    num2 = xw.book.add_format({"num_format": "0.00"})
+    num0 = xw.book.add_format({"num_format": "0"})
 
-    # Header
-    ws.write(0, 0, "Type", bold)
+    single_rows, two_rows, three_rows, members = load_rows(input_path)
 
-    # Parse + group (Spot + Distributed)
-    obs = _parse_spot_and_distributed_loads(input_path)
-    single_rows, two_rows, three_rows = _group_by_device(obs)
+    # Per-bus LL kV from the shared base-voltage engine (same values as the Bus sheet).
+    # Buses it does not know get the most common LL of the model.
+    bv = base_voltages(input_path)
+    bus_ll_kv: Dict[str, float] = bv["ll_kv"]
+    default_ll = bv["default_ll_kv"]
 
-    # Voltage map (built on sanitized node names)
-    # Prefer Bus-sheet base voltages (LN â†’ LL) when available; fall back to inference.
-    bus_kvll = _build_voltage_map(input_path)
-
-    def _bus_ll_kv_from_bus_sheet(txt_path: Path) -> Dict[str, float]:
-        """Read Bus sheet rows to get per-bus LL voltage in kV.
-        Uses Extractor's own Bus builder for consistent results.
-        """
-        try:
-            # Lazy import to avoid cycles at module import time
-            from Modules.Bus import extract_bus_data  # type: ignore
-            import math as _math
-            out: Dict[str, float] = {}
-            for row in extract_bus_data(txt_path):
-                bus_raw = str(row.get("Bus", "")).strip()
-                if not bus_raw or bus_raw.startswith("//"):
-                    continue
-                # Strip phase suffix _a/_b/_c to get base name
-                base = _PHASE_SUFFIX_RE.sub("", bus_raw)
-                ln_volts = row.get("Base Voltage (V)")
-                if isinstance(ln_volts, (int, float)) and ln_volts > 0:
-                    ll_kv = (float(ln_volts) * _math.sqrt(3.0)) / 1000.0
-                    out[base] = ll_kv
-            return out
-        except Exception:
-            return {}
-
-    bus_ll_from_bus_sheet = _bus_ll_kv_from_bus_sheet(input_path)
-    # Choose a reasonable default: most common LL value on the Bus sheet if present
-    default_ll = None
-    if bus_ll_from_bus_sheet:
-        try:
-            from collections import Counter as _Counter
-            vals = [round(v, 3) for v in bus_ll_from_bus_sheet.values() if v and v > 0]
-            default_ll = _Counter(vals).most_common(1)[0][0] if vals else None
-        except Exception:
-            default_ll = None
-
-    # Anchors (computed dynamically to avoid empty data rows when pruning)
-    r = 10
-    b1_t, b1_h, b1_e = r, r + 1, r + 2; r = b1_e + 2
-    b2_t, b2_h, b2_e = r, r + 1, r + 2; r = b2_e + 2
-    b3_t, b3_h, b3_e = r, r + 1, r + 2; r = b3_e + 2
-    b4_t, b4_h, b4_first = r, r + 1, r + 2
-    # b4_e is set AFTER writing single_rows
-    # r advances after we know b4_e
-    # b5/b6 anchors also computed after their data is written
-
-    # Notes
-    ws.merge_range(7, 0, 7, 7, "Important notes:", notes_hdr)
-    ws.merge_range(8, 0, 8, 7, "Default order of blocks and columns after row 11 must not change", notes_txt)
-    ws.merge_range(9, 0, 9, 7, "One empty row between End of each block and the next block is mandatory; otherwise, empty rows are NOT allowed", notes_txt)
-
-    # -------- Block 1: PosSeq Z (empty) --------
-    ws.merge_range(b1_t, 0, b1_t, 1, "Positive-Sequence Constant Impedance Load", bold)
-    ws.write_url(b1_t, 2, "internal:'Load'!A1", link_fmt, "Go to Type List")
-    ws.write_row(b1_h, 0, ["ID", "Status", "Bus", "P (MW)", "Q (MVAr)"], th)
-    ws.merge_range(b1_e, 0, b1_e, 2, "End of Positive-Sequence Constant Impedance Load")
-
-    # -------- Block 2: PosSeq P (empty) --------
-    ws.merge_range(b2_t, 0, b2_t, 1, "Positive-Sequence Constant Power Load", bold)
-    ws.write_url(b2_t, 2, "internal:'Load'!A1", link_fmt, "Go to Type List")
-    ws.write_row(b2_h, 0, ["ID", "Status", "Bus", "P (MW)", "Q (MVAr)"], th)
-    ws.merge_range(b2_e, 0, b2_e, 2, "End of Positive-Sequence Constant Power Load")
-
-    # -------- Block 3: PosSeq I (empty) --------
-    ws.merge_range(b3_t, 0, b3_t, 1, "Positive-Sequence Constant Current Load", bold)
-    ws.write_url(b3_t, 2, "internal:'Load'!A1", link_fmt, "Go to Type List")
-    ws.write_row(b3_h, 0, ["ID", "Status", "Bus", "P (MW)", "Q (MVAr)"], th)
-    ws.merge_range(b3_e, 0, b3_e, 2, "End of Positive-Sequence Constant Current Load")
-
-    # -------- Block 4: Single-Phase ZIP --------
-    ws.merge_range(b4_t, 0, b4_t, 1, "Single-Phase ZIP Load", bold)
-    ws.write_url(b4_t, 2, "internal:'Load'!A1", link_fmt, "Go to Type List")
-    ws.write_row(
-        b4_h, 0,
-        ["ID", "Status", "V (kV)", "Bandwidth (pu)", "Conn. type", "K_z", "K_i", "K_p",
-         "Use initial voltage?", "Bus1", "P1 (kW)", "Q1 (kVAr)"],
-        th,
-    )
-    rcur = b4_first
-    for row in single_rows:
-        kz, ki, kp = _zip_flags(row["CustType"], row.get("LVT"))
+    def _zip_head(row) -> list:
+        """ID .. 'Use initial voltage?' columns shared by the three ZIP blocks."""
         bus = row["Bus"]
-        if bus_ll_from_bus_sheet:
-            vkv = bus_ll_from_bus_sheet.get(bus, default_ll if default_ll is not None else bus_kvll.get(bus, bus_kvll["_default_"]))
-        else:
-            vkv = bus_kvll.get(bus, bus_kvll["_default_"])
-        conn = (row["Conn"] or "").lower()
-
-        # Always drop loads whose bus is not allowed (prevents empty inputs and orphan refs)
-        if not is_bus_allowed(bus):
-            continue
-        id_out = row["ID"] if not should_comment_bus(bus) else f"//{row['ID']}"
-
-        ws.write(rcur, 0, id_out)
-        ws.write_number(rcur, 1, row["Status"], num0)
-        ws.write_number(rcur, 2, vkv, num2)
-        ws.write_number(rcur, 3, 0.2, num2)
-        ws.write(rcur, 4, "wye" if conn.startswith("y") else "delta" if conn.startswith("d") else "")
-        ws.write_number(rcur, 5, kz, num0)
-        ws.write_number(rcur, 6, ki, num0)
-        ws.write_number(rcur, 7, kp, num0)
-        ws.write_number(rcur, 8, 0, num0)
-        ws.write(rcur, 9, f"{bus}{PHASE_SUFFIX.get(row['Phase'], '')}")
-        ws.write_number(rcur, 10, row["P1"], num0)
-        ws.write_number(rcur, 11, row["Q1"], num0)
-        rcur += 1
-    b4_e = rcur  # place 'End of' immediately after last written row (or header if none)
-    ws.merge_range(b4_e, 0, b4_e, 1, "End of Single-Phase ZIP Load")
-    r = b4_e + 2
-
-    # -------- Block 5: Two-Phase ZIP --------
-    # -------- Block 5: Two-Phase ZIP --------
-    b5_t, b5_h, b5_first = r, r + 1, r + 2
-    ws.merge_range(b5_t, 0, b5_t, 1, "Two-Phase ZIP Load", bold)
-    ws.write_url(b5_t, 2, "internal:'Load'!A1", link_fmt, "Go to Type List")
-    ws.write_row(
-        b5_h, 0,
-        ["ID", "Status", "V (kV)", "Bandwidth (pu)", "Conn. type", "K_z", "K_i", "K_p",
-         "Use initial voltage?", "Bus1", "Bus2", "P1(kW)", "Q1(kVAr)", "P2 (kW)", "Q2 (kVAr)"],
-        th,
-    )
-    rcur = b5_first
-    for row in two_rows:
         kz, ki, kp = _zip_flags(row["CustType"], row.get("LVT"))
-        bus = row["Bus"]
-        if bus_ll_from_bus_sheet:
-            vkv = bus_ll_from_bus_sheet.get(bus, default_ll if default_ll is not None else bus_kvll.get(bus, bus_kvll["_default_"]))
-        else:
-            vkv = bus_kvll.get(bus, bus_kvll["_default_"])
-        p1, p2 = row["PhasePair"]
         conn = (row["Conn"] or "").lower()
-
-        if not is_bus_allowed(bus):
-            continue
-        id_out = row["ID"] if not should_comment_bus(bus) else f"//{row['ID']}"
-
-        ws.write(rcur, 0, id_out); ws.write_number(rcur, 1, row["Status"], num0)
-        ws.write_number(rcur, 2, vkv, num2)
-        ws.write_number(rcur, 3, 0.2, num2)
-        ws.write(rcur, 4, "wye" if conn.startswith("y") else "delta" if conn.startswith("d") else "")
-        ws.write_number(rcur, 5, kz, num0); ws.write_number(rcur, 6, ki, num0); ws.write_number(rcur, 7, kp, num0)
-        ws.write_number(rcur, 8, 0, num0)
-        ws.write(rcur, 9,  f"{bus}{PHASE_SUFFIX[p1]}"); ws.write(rcur,10, f"{bus}{PHASE_SUFFIX[p2]}")
-        ws.write_number(rcur,11, row["P1"], num0); ws.write_number(rcur,12, row["Q1"], num0)
-        ws.write_number(rcur,13, row["P2"], num0); ws.write_number(rcur,14, row["Q2"], num0)
-        rcur += 1
-    b5_e = rcur
-    ws.merge_range(b5_e, 0, b5_e, 1, "End of Two-Phase ZIP Load")
-    r = b5_e + 2
-
-    # -------- Block 6: Three-Phase ZIP --------
-    # -------- Block 6: Three-Phase ZIP --------
-    b6_t, b6_h, b6_first = r, r + 1, r + 2
-    ws.merge_range(b6_t, 0, b6_t, 1, "Three-Phase ZIP Load", bold)
-    ws.write_url(b6_t, 2, "internal:'Load'!A1", link_fmt, "Go to Type List")
-    ws.write_row(
-        b6_h, 0,
-        ["ID", "Status", "V (kV)", "Bandwidth (pu)", "Conn. type", "K_z", "K_i", "K_p",
-         "Use initial voltage?", "Bus1", "Bus2", "Bus3",
-         "P1(kW)", "Q1(kVAr)", "P2 (kW)", "Q2 (kVAr)", "P3 (kW)", "Q3 (kVAr)"],
-        th,
-    )
-    rcur = b6_first
-    for row in three_rows:
-        kz, ki, kp = _zip_flags(row["CustType"], row.get("LVT"))
-        bus = row["Bus"]
-        if bus_ll_from_bus_sheet:
-            vkv = bus_ll_from_bus_sheet.get(bus, default_ll if default_ll is not None else bus_kvll.get(bus, bus_kvll["_default_"]))
-        else:
-            vkv = bus_kvll.get(bus, bus_kvll["_default_"])
-        conn = (row["Conn"] or "").lower()
-
-        if not is_bus_allowed(bus):
-            continue
-        id_out = row["ID"] if not should_comment_bus(bus) else f"//{row['ID']}"
-
-        ws.write(rcur, 0, id_out); ws.write_number(rcur, 1, row["Status"], num0)
-        ws.write_number(rcur, 2, vkv, num2)
-        ws.write_number(rcur, 3, 0.2, num2)
-        ws.write(rcur, 4, "wye" if conn.startswith("y") else "delta" if conn.startswith("d") else "")
-        ws.write_number(rcur, 5, kz, num0); ws.write_number(rcur, 6, ki, num0); ws.write_number(rcur, 7, kp, num0)
-        ws.write_number(rcur, 8, 0, num0)
-        ws.write(rcur, 9,  f"{bus}_a"); ws.write(rcur,10, f"{bus}_b"); ws.write(rcur,11, f"{bus}_c")
-        ws.write_number(rcur,12, row["P_A"], num0); ws.write_number(rcur,13, row["Q_A"], num0)
-        ws.write_number(rcur,14, row["P_B"], num0); ws.write_number(rcur,15, row["Q_B"], num0)
-        ws.write_number(rcur,16, row["P_C"], num0); ws.write_number(rcur,17, row["Q_C"], num0)
-        rcur += 1
-    b6_e = rcur
-    ws.merge_range(b6_e, 0, b6_e, 1, "End of Three-Phase ZIP Load")
+        return [
+            row["ID"] if not should_comment_bus(bus) else f"//{row['ID']}",
+            row["Status"],
+            bus_ll_kv.get(bus, default_ll),
+            0.2,
+            "wye" if conn.startswith("y") else "delta" if conn.startswith("d") else "",
+            kz, ki, kp, 0,
+        ]
+
+    single_out = [
+        _zip_head(row) + [f"{row['Bus']}{PHASE_SUFFIX.get(row['Phase'], '')}", row["P1"], row["Q1"]]
+        for row in single_rows
+    ]
+    two_out = [
+        _zip_head(row)
+        + [f"{row['Bus']}{PHASE_SUFFIX[row['PhasePair'][0]]}", f"{row['Bus']}{PHASE_SUFFIX[row['PhasePair'][1]]}",
+           row["P1"], row["Q1"], row["P2"], row["Q2"]]
+        for row in two_rows
+    ]
+    three_out = [
+        _zip_head(row)
+        + [f"{row['Bus']}_a", f"{row['Bus']}_b", f"{row['Bus']}_c",
+           row["P_A"], row["Q_A"], row["P_B"], row["Q_B"], row["P_C"], row["Q_C"]]
+        for row in three_rows
+    ]
+
+    # ID, Status, V, Bandwidth, Conn, K_z, K_i, K_p, Use initial voltage?
+    head_fmts = [None, num0, num2, num2, None, num0, num0, num0, num0]
+    zip_hdr = ["ID", "Status", "V (kV)", "Bandwidth (pu)", "Conn. type", "K_z", "K_i", "K_p",
+               "Use initial voltage?"]
+    pos_hdr = ["ID", "Status", "Bus", "P (MW)", "Q (MVAr)"]
+
+    r = FIRST_BLOCK_ROW
+    # Blocks 1-3: positive-sequence loads (always empty)
+    b1 = write_block(ws, fmts, "Load", r, "Positive-Sequence Constant Impedance Load", pos_hdr, end_to=2)
+    b2 = write_block(ws, fmts, "Load", b1["next"], "Positive-Sequence Constant Power Load", pos_hdr, end_to=2)
+    b3 = write_block(ws, fmts, "Load", b2["next"], "Positive-Sequence Constant Current Load", pos_hdr, end_to=2)
+    b4 = write_block(ws, fmts, "Load", b3["next"], "Single-Phase ZIP Load",
+                     zip_hdr + ["Bus1", "P1 (kW)", "Q1 (kVAr)"],
+                     single_out, column_runs(head_fmts + [None] + [num0] * 2))
+    b5 = write_block(ws, fmts, "Load", b4["next"], "Two-Phase ZIP Load",
+                     zip_hdr + ["Bus1", "Bus2", "P1(kW)", "Q1(kVAr)", "P2 (kW)", "Q2 (kVAr)"],
+                     two_out, column_runs(head_fmts + [None] * 2 + [num0] * 4))
+    b6 = write_block(ws, fmts, "Load", b5["next"], "Three-Phase ZIP Load",
+                     zip_hdr + ["Bus1", "Bus2", "Bus3",
+                                "P1(kW)", "Q1(kVAr)", "P2 (kW)", "Q2 (kVAr)", "P3 (kW)", "Q3 (kVAr)"],
+                     three_out, column_runs(head_fmts + [None] * 3 + [num0] * 6))
 
     # Top links (write after blocks so ranges reflect actual end rows)
-    ws.write_url(1, 0, f"internal:'Load'!A{b1_h+1}:E{b1_e+1}", link_fmt, "PositiveSeqZload")
-    ws.write_url(1, 1, f"internal:'Load'!A{b6_h+1}:R{max(b6_h+1, b6_e+1)}", link_fmt, "ThreePhaseZIPLoad")
-    ws.write_url(2, 0, f"internal:'Load'!A{b2_h+1}:E{b2_e+1}", link_fmt, "PositiveSeqPload")
-    ws.write_url(3, 0, f"internal:'Load'!A{b3_h+1}:E{b3_e+1}", link_fmt, "PositiveSeqIload")
-    ws.write_url(4, 0, f"internal:'Load'!A{b4_h+1}:L{max(b4_h+1, b4_e+1)}", link_fmt, "SinglePhaseZIPLoad")
-    ws.write_url(5, 0, f"internal:'Load'!A{b5_h+1}:O{max(b5_h+1, b5_e+1)}", link_fmt, "TwoPhaseZIPLoad")
+    write_type_link(ws, fmts, "Load", 1, 0, "PositiveSeqZload", b1, "E")
+    write_type_link(ws, fmts, "Load", 1, 1, "ThreePhaseZIPLoad", b6, "R")
+    write_type_link(ws, fmts, "Load", 2, 0, "PositiveSeqPload", b2, "E")
+    write_type_link(ws, fmts, "Load", 3, 0, "PositiveSeqIload", b3, "E")
+    write_type_link(ws, fmts, "Load", 4, 0, "SinglePhaseZIPLoad", b4, "L")
+    write_type_link(ws, fmts, "Load", 5, 0, "TwoPhaseZIPLoad", b5, "O")
+
+    if members is not None:
+        write_aggregation_sheet(xw, members)
@@ -0,0 +1,168 @@
+# Modules/LoadAggregation.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+import xml.etree.ElementTree as ET
+
+from Modules.Blocks import column_runs, write_table
+from Modules.General import file_fingerprint, get_export_options, read_xml, safe_name
+
+# Optional load aggregation (export option "load_aggregation").
+#
+#   "none"         one Load row per SpotLoad / DistributedLoad (default)
+#   "bus"          one row per bus, phasing, ZIP class, connection and status
+#   "transformer"  same, but loads of a service area are moved to the secondary
+#                  bus of the transformer that feeds it
+#
+# P/Q are summed per phase, so the aggregate draws the same power as its members
+# at the bus voltage. The block layout of the Load sheet is unchanged; the
+# "Load Aggregation" sheet maps each aggregate row back to its member load IDs.
+#
+# A service area is a connected group of buses (through anything but a
+# transformer) that holds exactly one transformer secondary and no source or
+# transformer primary. Buses elsewhere keep their own loads.
+
+_CACHE_SIZE = 2
+_CACHE: "OrderedDict[tuple, Dict[str, str]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def aggregation_mode() -> str:
+    return get_export_options().get("load_aggregation", "none")
+
+
+def _service_areas(root: ET.Element) -> Dict[str, str]:
+    """bus -> transformer secondary bus for every bus inside a service area."""
+    parent: Dict[str, str] = {}
+
+    def _find(n: str) -> str:
+        parent.setdefault(n, n)
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    secondaries: Set[str] = set()
+    primaries: Set[str] = set()
+    for sec in root.iter("Section"):
+        f = safe_name(sec.findtext("FromNodeID"))
+        t = safe_name(sec.findtext("ToNodeID"))
+        if not (f and t):
+            continue
+        xf = sec.find("Devices/Transformer")
+        if xf is None:
+            parent[_find(f)] = _find(t)
+            continue
+        # secondary = node opposite NormalFeedingNodeID (as on the Pins sheet)
+        normal = safe_name(xf.findtext("NormalFeedingNodeID"))
+        second, first = (f, t) if normal == t else (t, f)
+        secondaries.add(second); primaries.add(first)
+        _find(f); _find(t)
+
+    sources = {safe_name(s.findtext("SourceNodeID")) for s in root.iter("Source")}
+
+    areas: Dict[str, List[str]] = {}
+    blocked: Set[str] = set()
+    for n in list(parent):
+        r = _find(n)
+        if n in secondaries:
+            areas.setdefault(r, []).append(n)
+        if n in primaries or n in sources:
+            blocked.add(r)
+
+    service = {r: secs[0] for r, secs in areas.items() if len(secs) == 1 and r not in blocked}
+    return {n: service[_find(n)] for n in parent if _find(n) in service}
+
+
+def service_buses(input_path: str | Path) -> Dict[str, str]:
+    """Cached bus -> service transformer secondary map of the model file (shared; do not modify)."""
+    key = file_fingerprint(Path(input_path))
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None:
+            _CACHE.move_to_end(key)
+            return hit
+
+    svc = _service_areas(read_xml(Path(input_path)))
+    print(f"[LoadAggregation] {len(set(svc.values()))} service transformer area(s), {len(svc)} buses")
+
+    with _CACHE_LOCK:
+        _CACHE[key] = svc
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return svc
+
+
+def target_bus_map(input_path: str | Path) -> Dict[str, str]:
+    """Bus moves applied by the current mode (empty unless "transformer")."""
+    return service_buses(input_path) if aggregation_mode() == "transformer" else {}
+
+
+def aggregate_load_rows(single: List[dict], two: List[dict], three: List[dict],
+                        input_path: str | Path, zip_flags) -> Tuple[List[dict], List[dict], List[dict], List[dict]]:
+    """
+    Sum Load._group_by_device rows into aggregate rows of the same shape.
+    Returns (single, two, three, members); members lists
+    {"id", "bus", "phases", "member", "member_bus"} per original load.
+    """
+    moves = target_bus_map(input_path)
+    groups: "OrderedDict[tuple, dict]" = OrderedDict()
+
+    def _add(kind: str, phasing: Any, row: dict, values: Tuple[str, ...]) -> None:
+        bus = moves.get(row["Bus"], row["Bus"])
+        conn = (row["Conn"] or "").lower()[:1]
+        key = (kind, bus, phasing, zip_flags(row["CustType"], row.get("LVT")), conn, row["Status"])
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {"row": dict(row, Bus=bus), "members": []}
+            for v in values:
+                g["row"][v] = 0.0
+        for v in values:
+            g["row"][v] += row[v]
+        g["members"].append((row["ID"], row["Bus"]))
+
+    for row in single:
+        _add("1", row["Phase"], row, ("P1", "Q1"))
+    for row in two:
+        _add("2", row["PhasePair"], row, ("P1", "Q1", "P2", "Q2"))
+    for row in three:
+        _add("3", "ABC", row, ("P_A", "Q_A", "P_B", "Q_B", "P_C", "Q_C"))
+
+    out = {"1": [], "2": [], "3": []}
+    members: List[dict] = []
+    used: Set[str] = set()
+    for (kind, bus, phasing, _zip, _conn, _status), g in groups.items():
+        phases = "".join(phasing)
+        base = safe_name(f"LD_{bus}_{phases.lower()}")
+        rid, k = base, 1
+        while rid in used:
+            k += 1
+            rid = f"{base}_{k}"
+        used.add(rid)
+        g["row"]["ID"] = rid
+        out[kind].append(g["row"])
+        members += [{"id": rid, "bus": bus, "phases": phases, "member": m, "member_bus": mb}
+                    for m, mb in g["members"]]
+
+    n_in = len(single) + len(two) + len(three)
+    print(f"[LoadAggregation] {aggregation_mode()}: {n_in} loads -> {len(groups)} rows")
+    return out["1"], out["2"], out["3"], members
+
+
+# ---------------- mapping sheet ----------------
+def write_aggregation_sheet(xw, members: List[dict]) -> None:
+    """One row per original load: aggregate Load row -> member load it contains."""
+    wb = xw.book
+    ws = wb.add_worksheet("Load Aggregation")
+    xw.sheets["Load Aggregation"] = ws
+
+    th = wb.add_format({"bold": True, "bottom": 1})
+    for c, w in enumerate([28, 18, 8, 28, 18]):
+        ws.set_column(c, c, w)
+
+    rows = [(m["id"], m["bus"], m["phases"], m["member"], m["member_bus"]) for m in members]
+    write_table(ws, ["Load ID", "Bus", "Phases", "Member load ID", "Member bus"], th, rows,
+                column_runs([None] * 5))
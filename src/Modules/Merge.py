@@ -0,0 +1,277 @@
+# Modules/Merge.py
+from __future__ import annotations
+import hashlib
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import xml.etree.ElementTree as ET
+
+from Modules.General import input_stem, parse_xml, pin_xml
+from Modules.Jobs import checkpoint
+
+# Several CYME exports (one per feeder / substation) merged into one model.
+#
+# The first export is the base; the Networks of the others are appended to it,
+# so sections and sources of every file end up in one tree and the island
+# analysis connects feeders through shared node IDs (cross-feeder ties). The
+# merged tree is pinned (General.pin_xml) under a virtual path next to the first
+# input, "<stem>+<stem>....merged.xml", and exported like any file.
+#
+# Records that appear in more than one export are kept once, matched by ID and
+# compared by a content hash (LastChange / ModifiedByUser ignored):
+#   equipment    <...DB> records under EquipmentDBs, by (tag, EquipmentID)
+#   sections     by SectionID (any network)
+#   nodes        by NodeID
+#   networks     by Topo/NetworkID: a repeated network only contributes its new
+#                sections and nodes
+#   lists        TopoConfigurations, ConsumerClasses, DeviceStages,
+#                LoadModelInformations by their ID fields
+# An identical copy is dropped silently (counted); a different one is a
+# conflict: the first export's record is kept and the conflict is reported.
+
+_VOLATILE = {"LastChange", "ModifiedByUser"}
+_KEYED_LISTS = {
+    "TopoConfigurations": ("NetworkType", "NetworkTypeID"),
+    "ConsumerClasses": ("ID",),
+    "DeviceStages": ("ID",),
+    "LoadModelInformations": ("ID",),
+}
+_MAX_LOGGED_CONFLICTS = 20
+
+
+def content_hash(el: ET.Element) -> bytes:
+    """Digest of an element's tags, attributes and stripped text (volatile fields skipped)."""
+    h = hashlib.sha1()
+    for e in el.iter():
+        h.update(e.tag.encode())
+        h.update(repr(sorted(e.attrib.items())).encode() if e.attrib else b"")
+        if e.tag not in _VOLATILE:
+            h.update((e.text or "").strip().encode())
+        h.update(b"\0")
+    return h.digest()
+
+
+def merged_path(paths: List[str | Path]) -> Path:
+    """Virtual path of the merge of `paths` (same inputs -> same path)."""
+    first = Path(paths[0]).expanduser().resolve()
+    stems = [input_stem(p) for p in paths]
+    name = "+".join(stems)
+    if len(name) > 80:
+        name = f"{stems[0]}+{len(stems) - 1}_more"
+    return first.with_name(f"{name}.merged.xml")
+
+
+def _text(el: ET.Element, tag: str) -> str:
+    return (el.findtext(tag) or "").strip()
+
+
+def _holder(parent: ET.Element, tag: str) -> ET.Element:
+    found = parent.find(tag)
+    return found if found is not None else ET.SubElement(parent, tag)
+
+
+class _Merger:
+    """Indexes of the merged tree; add() folds one more export into it."""
+
+    def __init__(self, base: ET.Element, name: str) -> None:
+        self.base = base
+        self.networks_el = _holder(base, "Networks")
+        self.conflicts: List[Dict[str, str]] = []
+        self.duplicates = {"networks": 0, "sections": 0, "nodes": 0, "equipment": 0, "lists": 0}
+        self.shared_nodes: Set[str] = set()
+
+        self.networks: Dict[str, Tuple[ET.Element, bytes, str]] = {}
+        self.sections: Dict[str, Tuple[bytes, str]] = {}
+        self.nodes: Set[str] = set()
+        self.section_nodes: Set[str] = set()
+        for net in self.networks_el.findall("Network"):
+            self._index_network(net, name)
+
+        self.dbs = base.find(".//EquipmentDBs")
+        self.records: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        for rec in self.dbs if self.dbs is not None else ():
+            self.records.setdefault((rec.tag, _text(rec, "EquipmentID")), (content_hash(rec), name))
+
+        self.lists: Dict[str, Dict[Tuple[str, ...], Tuple[bytes, str]]] = {}
+        for tag, fields in _KEYED_LISTS.items():
+            found = base.find(tag)
+            for item in found if found is not None else ():
+                key = tuple(_text(item, f) for f in fields)
+                self.lists.setdefault(tag, {}).setdefault(key, (content_hash(item), name))
+
+        gp = next(base.iter("GlobalParameters"), None)
+        self.gp = (content_hash(gp), name) if gp is not None else None
+
+    def _index_network(self, net: ET.Element, name: str) -> None:
+        nid = _text(net, "Topos/Topo/NetworkID")
+        self.networks.setdefault(nid, (net, _topo_hash(net), name))
+        for sec in net.iter("Section"):
+            self.sections.setdefault(_text(sec, "SectionID"), (content_hash(sec), name))
+        for node in net.iter("Node"):
+            self.nodes.add(_text(node, "NodeID"))
+        self.section_nodes |= _section_nodes(net)
+
+    def _conflict(self, kind: str, ident: str, kept: str, dropped: str) -> None:
+        self.conflicts.append({"kind": kind, "id": ident, "kept": kept, "dropped": dropped})
+
+    # ---- one more export ----
+    def add(self, root: ET.Element, name: str) -> None:
+        incoming = [n for holder in root.findall("Networks") for n in holder.findall("Network")]
+        self.shared_nodes |= self.section_nodes & set().union(*(_section_nodes(n) for n in incoming))
+        for net in incoming:
+            self._add_network(net, name)
+        self._add_equipment(root, name)
+        self._add_lists(root, name)
+        gp = next(root.iter("GlobalParameters"), None)
+        if gp is not None and self.gp is not None and content_hash(gp) != self.gp[0]:
+            self._conflict("GlobalParameters", "", self.gp[1], name)
+
+    def _add_network(self, net: ET.Element, name: str) -> None:
+        self._drop_known(net, name)
+        nid = _text(net, "Topos/Topo/NetworkID")
+        known = self.networks.get(nid)
+        if known is None:
+            self.networks_el.append(net)
+            self._index_network(net, name)
+            return
+
+        # Same network in two exports: keep its first topo, take over new sections / nodes
+        target, topo_hash, first = known
+        self.duplicates["networks"] += 1
+        if _topo_hash(net) != topo_hash:
+            self._conflict("Network", nid, first, name)
+        for tag, item in (("Sections", "Section"), ("Nodes", "Node")):
+            dest = _holder(target, tag)
+            for holder in net.findall(tag):
+                for el in holder.findall(item):
+                    dest.append(el)
+        self._index_network(target, name)
+
+    def _drop_known(self, net: ET.Element, name: str) -> None:
+        """Remove sections / nodes of `net` that the merged model already has."""
+        for holder in list(net.iter("Sections")):
+            for sec in holder.findall("Section"):
+                sid = _text(sec, "SectionID")
+                known = self.sections.get(sid)
+                if known is None:
+                    continue
+                holder.remove(sec)
+                if content_hash(sec) == known[0]:
+                    self.duplicates["sections"] += 1
+                else:
+                    self._conflict("Section", sid, known[1], name)
+        for holder in list(net.iter("Nodes")):
+            for node in holder.findall("Node"):
+                if _text(node, "NodeID") in self.nodes:
+                    holder.remove(node)
+                    self.duplicates["nodes"] += 1
+
+    def _add_equipment(self, root: ET.Element, name: str) -> None:
+        dbs = root.find(".//EquipmentDBs")
+        if dbs is None:
+            return
+        if self.dbs is None:
+            self.dbs = dbs
+            _holder(_holder(self.base, "Equipments"), "Equipments").append(dbs)
+            for rec in dbs:
+                self.records.setdefault((rec.tag, _text(rec, "EquipmentID")), (content_hash(rec), name))
+            return
+        for rec in list(dbs):
+            key = (rec.tag, _text(rec, "EquipmentID"))
+            digest = content_hash(rec)
+            known = self.records.get(key)
+            if known is None:
+                self.dbs.append(rec)
+                self.records[key] = (digest, name)
+            elif digest == known[0]:
+                self.duplicates["equipment"] += 1
+            else:
+                self._conflict(rec.tag, key[1], known[1], name)
+
+    def _add_lists(self, root: ET.Element, name: str) -> None:
+        for tag, fields in _KEYED_LISTS.items():
+            found = root.find(tag)
+            if found is None:
+                continue
+            dest = _holder(self.base, tag)
+            seen = self.lists.setdefault(tag, {})
+            for item in list(found):
+                key = tuple(_text(item, f) for f in fields)
+                digest = content_hash(item)
+                known = seen.get(key)
+                if known is None:
+                    dest.append(item)
+                    seen[key] = (digest, name)
+                elif digest == known[0]:
+                    self.duplicates["lists"] += 1
+                else:
+                    self._conflict(item.tag, "/".join(k for k in key if k), known[1], name)
+
+
+def _topo_hash(net: ET.Element) -> bytes:
+    topos = net.find("Topos")
+    return content_hash(topos if topos is not None else net)
+
+
+def _section_nodes(net: ET.Element) -> Set[str]:
+    out: Set[str] = set()
+    for sec in net.iter("Section"):
+        out.update(n for n in (_text(sec, "FromNodeID"), _text(sec, "ToNodeID")) if n)
+    return out
+
+
+def merge_exports(
+    paths: List[str | Path],
+    *,
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """
+    Parse the exports, merge them into one model and pin it (General.pin_xml).
+    Returns {"path" (virtual model path to export), "inputs", "networks",
+    "sections", "duplicates" (counts per kind), "shared_nodes" (node IDs used by
+    sections of more than one export), "conflicts" [{"kind", "id", "kept",
+    "dropped"}], "elapsed"}.
+    """
+    t0 = time.perf_counter()
+    files = [Path(p).expanduser().resolve() for p in paths]
+    if len(files) < 2:
+        raise ValueError("merge needs at least two exports")
+    if len(set(files)) != len(files):
+        raise ValueError("the same export is listed more than once")
+    for f in files:
+        if not f.exists():
+            raise FileNotFoundError(f"Input not found: {f}")
+
+    merger: Optional[_Merger] = None
+    for f in files:
+        checkpoint()
+        t = time.perf_counter()
+        root = parse_xml(f)
+        log(f"[Merge] Parsed {f.name} ({time.perf_counter() - t:.2f}s)")
+        if merger is None:
+            merger = _Merger(root, f.name)
+        else:
+            merger.add(root, f.name)
+
+    path = pin_xml(merged_path(files), merger.base, sources=[str(f) for f in files],
+                   size=sum(f.stat().st_size for f in files))
+    report = {
+        "path": str(path),
+        "inputs": [str(f) for f in files],
+        "networks": len(merger.networks_el.findall("Network")),
+        "sections": sum(1 for _ in merger.base.iter("Section")),
+        "duplicates": merger.duplicates,
+        "shared_nodes": len(merger.shared_nodes),
+        "conflicts": merger.conflicts,
+        "elapsed": round(time.perf_counter() - t0, 3),
+    }
+    dup = merger.duplicates
+    log(f"[Merge] {len(files)} exports -> {report['networks']} network(s), {report['sections']} sections; "
+        f"dropped duplicates: {dup['networks']} network(s), {dup['sections']} section(s), {dup['nodes']} node(s), "
+        f"{dup['equipment']} equipment record(s); {report['shared_nodes']} node(s) shared between exports")
+    for c in merger.conflicts[:_MAX_LOGGED_CONFLICTS]:
+        ident = f" {c['id']!r}" if c["id"] else ""
+        log(f"[Merge] Conflict: {c['kind']}{ident} differs in {c['dropped']}; kept {c['kept']}")
+    if len(merger.conflicts) > _MAX_LOGGED_CONFLICTS:
+        log(f"[Merge] ... {len(merger.conflicts) - _MAX_LOGGED_CONFLICTS} more conflict(s)")
+    return report
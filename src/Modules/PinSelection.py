@@ -0,0 +1,272 @@
+# Modules/PinSelection.py
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from Modules.General import get_export_options
+
+# Voltage-pin bus selection (export option "pin_rules").
+#
+# A list of rules; the Pins sheet reports voltages for the union of their buses:
+#   {"rule": "hops", "k": 1, "from": ["loads", "shunts", "secondaries"]}
+#        buses within k hops of a measurement bus ("from" may also list "sources")
+#   {"rule": "trunk", "every": 5}
+#        every n-th bus along each trunk: the path from a source to the bus
+#        farthest from it (a component without a source uses its longest path)
+#   {"rule": "ends"}
+#        feeder ends: buses with a single neighbour
+#   {"rule": "buses", "buses": ["B1", ...]}
+#        explicit list (sanitized names; unknown buses are ignored)
+# "edges": "lines" | "sections" picks the graph a rule walks. Defaults: hops on
+# line sections (the historical one-hop rule is DEFAULT_RULES), trunk and ends
+# on every section.
+#
+# The graph is a CSR adjacency (indptr / indices arrays) built once per model and
+# edge kind (Pins.pin_model builds both). Distances come from a multi-source BFS that advances a whole
+# frontier per numpy step, so 100k-bus models select in milliseconds.
+
+DEFAULT_RULES: List[Dict[str, Any]] = [{"rule": "hops", "k": 1}]
+MEASUREMENTS = ("loads", "shunts", "secondaries", "sources")
+EDGE_KINDS = ("lines", "sections")
+
+_RULE_KEYS = {
+    "hops": {"k", "from", "edges"},
+    "trunk": {"every", "edges"},
+    "ends": {"edges"},
+    "buses": {"buses"},
+}
+_DEFAULT_EDGES = {"hops": "lines", "trunk": "sections", "ends": "sections", "buses": "sections"}
+
+
+# ---------------- rules ----------------
+def parse_rules(spec: Any) -> List[Dict[str, Any]]:
+    """
+    Normalized rule list from None (defaults), a list / single rule, JSON text
+    or the path of a JSON file. Raises ValueError on unknown rules or fields.
+    """
+    if spec is None:
+        spec = DEFAULT_RULES
+    if isinstance(spec, (str, Path)):
+        text = str(spec).strip()
+        if not text.startswith(("[", "{")):
+            with open(Path(text), "r", encoding="utf-8") as fh:
+                text = fh.read()
+        try:
+            spec = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"pin_rules: invalid JSON ({e})") from None
+    if isinstance(spec, dict):
+        spec = spec.get("rules", [spec]) if "rule" not in spec else [spec]
+    if not isinstance(spec, list) or not spec:
+        raise ValueError("pin_rules: expected a non-empty list of rules")
+
+    out: List[Dict[str, Any]] = []
+    for k, raw in enumerate(spec, start=1):
+        if not isinstance(raw, dict) or raw.get("rule") not in _RULE_KEYS:
+            raise ValueError(f"pin_rules: rule {k} needs \"rule\" in {tuple(_RULE_KEYS)}")
+        kind = raw["rule"]
+        extra = set(raw) - _RULE_KEYS[kind] - {"rule"}
+        if extra:
+            raise ValueError(f"pin_rules: rule {k} ({kind}) has unknown field(s) {sorted(extra)}")
+        rule: Dict[str, Any] = {"rule": kind}
+        if kind != "buses":
+            rule["edges"] = raw.get("edges", _DEFAULT_EDGES[kind])
+            if rule["edges"] not in EDGE_KINDS:
+                raise ValueError(f"pin_rules: rule {k} edges must be one of {EDGE_KINDS}")
+        if kind == "hops":
+            rule["k"] = _non_negative(raw.get("k", 1), k, "k")
+            rule["from"] = list(raw.get("from", MEASUREMENTS[:3]))
+            bad = [m for m in rule["from"] if m not in MEASUREMENTS]
+            if bad:
+                raise ValueError(f"pin_rules: rule {k} from: {bad} not in {MEASUREMENTS}")
+        elif kind == "trunk":
+            rule["every"] = _non_negative(raw.get("every", 1), k, "every") or 1
+        elif kind == "buses":
+            if not isinstance(raw.get("buses"), list):
+                raise ValueError(f"pin_rules: rule {k} needs a \"buses\" list")
+            rule["buses"] = [str(b) for b in raw["buses"]]
+        out.append(rule)
+    return out
+
+
+def _non_negative(value: Any, k: int, name: str) -> int:
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        n = -1
+    if n < 0:
+        raise ValueError(f"pin_rules: rule {k} {name} must be a non-negative integer, got {value!r}")
+    return n
+
+
+def current_rules() -> List[Dict[str, Any]]:
+    """Rules of the current export (set_export_options has already normalized them)."""
+    rules = get_export_options().get("pin_rules")
+    return rules if rules is not None else parse_rules(None)
+
+
+def rules_key(rules: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Hashable form of a rule list (for caches that depend on the selection)."""
+    return json.dumps(current_rules() if rules is None else rules, sort_keys=True)
+
+
+# ---------------- CSR graph ----------------
+def build_csr(n: int, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Undirected CSR adjacency of n nodes from edge endpoint arrays (no self loops or duplicates)."""
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    keep = a != b
+    lo = np.minimum(a[keep], b[keep])
+    hi = np.maximum(a[keep], b[keep])
+    pairs = np.unique(lo * n + hi)
+    lo, hi = pairs // n, pairs % n
+    src = np.concatenate([lo, hi])
+    dst = np.concatenate([hi, lo])
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32)
+
+
+def bfs(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    seeds: Sequence[int] | np.ndarray,
+    *,
+    max_hops: Optional[int] = None,
+    dist: Optional[np.ndarray] = None,
+    parent: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Multi-source BFS hop distances (-1 = not reached). Pass `dist` / `parent`
+    arrays to continue filling them (already reached nodes are left alone).
+    """
+    n = len(indptr) - 1
+    if dist is None:
+        dist = np.full(n, -1, dtype=np.int32)
+    frontier = np.unique(np.asarray(seeds, dtype=np.int64))
+    frontier = frontier[dist[frontier] < 0]
+    dist[frontier] = 0
+    d = 0
+    while frontier.size and (max_hops is None or d < max_hops):
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+        # Positions of every frontier node's neighbour block, concatenated
+        offs = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        nbr = indices[offs]
+        fresh = dist[nbr] < 0
+        nbr, first = np.unique(nbr[fresh], return_index=True)
+        d += 1
+        dist[nbr] = d
+        if parent is not None:
+            parent[nbr] = np.repeat(frontier, counts)[fresh][first]
+        frontier = nbr.astype(np.int64)
+    return dist
+
+
+def pin_graphs(model: dict) -> Dict[str, dict]:
+    """build_pin_graph for every edge kind (stored by Pins.pin_model as model["graphs"])."""
+    return {edges: build_pin_graph(model, edges) for edges in EDGE_KINDS}
+
+
+def pin_graph(model: dict, edges: str) -> dict:
+    """The model's prebuilt graph for `edges` (pin_model), else a fresh one; the model is not modified."""
+    g = model.get("graphs", {}).get(edges)
+    return g if g is not None else build_pin_graph(model, edges)
+
+
+def build_pin_graph(model: dict, edges: str) -> dict:
+    """{"names", "index", "indptr", "indices"} over every bus of the Pins model."""
+    names = sorted(model["bus_ph"])
+    index = {b: i for i, b in enumerate(names)}
+    pairs = model["lines"] if edges == "lines" else model["edges"]
+    a = np.fromiter((index[p[0]] for p in pairs), dtype=np.int64, count=len(pairs))
+    b = np.fromiter((index[p[1]] for p in pairs), dtype=np.int64, count=len(pairs))
+    indptr, indices = build_csr(len(names), a, b)
+    return {"names": names, "index": index, "indptr": indptr, "indices": indices}
+
+
+# ---------------- selection ----------------
+def _ids(g: dict, buses) -> np.ndarray:
+    index = g["index"]
+    return np.fromiter((index[b] for b in buses if b in index), dtype=np.int64)
+
+
+def _measurement_buses(model: dict, kinds: List[str]) -> Set[str]:
+    out: Set[str] = set()
+    for kind in kinds:
+        out |= {"loads": set(model["loads"]), "shunts": model["shunts"],
+                "secondaries": model["xsec"], "sources": set(model["sources"])}[kind]
+    return out
+
+
+def _trunk_nodes(model: dict, g: dict, every: int) -> np.ndarray:
+    indptr, indices = g["indptr"], g["indices"]
+    n = len(g["names"])
+    dist = np.full(n, -1, dtype=np.int32)
+    parent = np.full(n, -1, dtype=np.int32)
+    roots = list(np.unique(_ids(g, model["sources"])))
+    bfs(indptr, indices, roots, dist=dist, parent=parent)
+    # Components without a source: root at one end of a longest path (double sweep)
+    while True:
+        left = np.flatnonzero(dist < 0)
+        if not left.size:
+            break
+        probe = bfs(indptr, indices, [left[0]])
+        far = int(np.argmax(probe))
+        roots.append(far)
+        bfs(indptr, indices, [far], dist=dist, parent=parent)
+    if not roots:
+        return np.empty(0, dtype=np.int64)
+
+    # Root of every node, level by level, then each root's farthest node
+    root_of = np.full(n, -1, dtype=np.int64)
+    root_of[roots] = roots
+    order = np.argsort(dist, kind="stable")
+    levels = np.searchsorted(dist[order], np.arange(1, int(dist.max()) + 2))
+    for lo, hi in zip(levels[:-1], levels[1:]):
+        nodes = order[lo:hi]
+        root_of[nodes] = root_of[parent[nodes]]
+    by_root = np.lexsort((-dist, root_of))
+    _, first = np.unique(root_of[by_root], return_index=True)
+
+    picked: List[int] = []
+    for node in by_root[first]:
+        node = int(node)
+        while node >= 0:
+            if dist[node] % every == 0:
+                picked.append(node)
+            node = int(parent[node])
+    return np.asarray(picked, dtype=np.int64)
+
+
+def select_buses(model: dict, rules: Optional[List[Dict[str, Any]]] = None) -> Set[str]:
+    """Voltage-pin buses of the Pins model for `rules` (default: the export option)."""
+    rules = current_rules() if rules is None else rules
+    out: Set[str] = set()
+    for rule in rules:
+        kind = rule["rule"]
+        if kind == "buses":
+            out.update(b for b in rule["buses"] if b in model["bus_ph"])
+            continue
+        g = pin_graph(model, rule["edges"])
+        if kind == "hops":
+            seeds = _ids(g, _measurement_buses(model, rule["from"]))
+            if not seeds.size:
+                continue
+            dist = bfs(g["indptr"], g["indices"], seeds, max_hops=rule["k"])
+            picked = np.flatnonzero(dist >= 0)
+        elif kind == "trunk":
+            picked = _trunk_nodes(model, g, rule["every"])
+        else:  # ends
+            deg = np.diff(g["indptr"])
+            picked = np.setdiff1d(np.flatnonzero(deg == 1), _ids(g, model["sources"]))
+        names = g["names"]
+        out.update(names[i] for i in picked)
+    return out
@@ -1,158 +1,164 @@
 # Modules/Pins.py
 from __future__ import annotations
+import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
-import xml.etree.ElementTree as ET
 from typing import Dict, List, Set, Tuple
 
-from Modules.General import safe_name
+from Modules.General import file_fingerprint, get_export_options, safe_name
 from Modules.IslandFilter import should_comment_bus, should_comment_branch
+from Modules.PinSelection import pin_graphs, select_buses
+from Modules.Reduction import chain_reduction, reduction_enabled
+from Modules.LoadAggregation import target_bus_map
+from Modules.SectionRecords import section_model
 
 PHASES = ("A", "B", "C")
 SUFFIX = {"A": "_a", "B": "_b", "C": "_c"}
 
 
-# ---------- Parsing helpers (all derived from the file) ----------
+# ---------- Parsing (one pass over the section records, cached per file) ----------
 
-def _bus_phases(root: ET.Element) -> Dict[str, Set[str]]:
-    """Collect phases present at each bus by scanning all Sections (sanitized)."""
+LINE_TAGS = ("OverheadLineUnbalanced", "OverheadByPhase", "OverheadLine", "Underground", "UndergroundCable")
+MAX_COLS = 16384                 # Excel column limit
+ROW_PINS = MAX_COLS - 2          # pins per row after the direction/group labels
+
+_CACHE_SIZE = 2
+_CACHE: "OrderedDict[tuple, dict]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _phase_count(phase: str) -> int:
+    ph = (phase or "ABC").upper()
+    return sum(1 for p in PHASES if p in ph) or 3
+
+
+def _scan_sections(model: dict) -> dict:
+    """
+    Everything the Pins sheet needs from a section model (SectionRecords), all sanitized:
+      bus_ph   bus -> phases present (from every Section)
+      loads    bus -> number of SpotLoad phases with values (PQ pins)
+      shunts   buses with a ShuntCapacitor
+      xsec     transformer secondary buses (node opposite NormalFeedingNodeID,
+               falling back to ToNodeID)
+      lines    (from, to, nphases) of overhead / underground sections
+      xf_pairs (from, to, nphases) of transformer sections (tap pins)
+      edges    (from, to) of every section (PinSelection graphs)
+      sources  Source node IDs
+    """
     bus_ph: Dict[str, Set[str]] = {}
-    for sec in root.findall(".//Section"):
-        ph = (sec.findtext("Phase") or "ABC").upper()
+    loads: Dict[str, int] = {}
+    shunts: Set[str] = set()
+    xsec: Set[str] = set()
+    lines: List[Tuple[str, str, int]] = []
+    xf_pairs: List[Tuple[str, str, int]] = []
+    edges: List[Tuple[str, str]] = []
+
+    for rec in model["records"]:
+        ph = (rec.phase or "ABC").upper()
         if not any(p in PHASES for p in ph):
             ph = "ABC"
-        for tag in ("FromNodeID", "ToNodeID"):
-            bus_raw = (sec.findtext(tag) or "").strip()
-            if not bus_raw:
-                continue
-            bus = safe_name(bus_raw)
-            bus_ph.setdefault(bus, set()).update([p for p in PHASES if p in ph])
-    return bus_ph
-
-
-def _loads_by_bus(root: ET.Element) -> Dict[str, int]:
-    """Return bus -> number_of_phases_with_values (for PQ pins), using sanitized bus names."""
-    out: Dict[str, int] = {}
-    for sec in root.findall(".//Section"):
-        spot = sec.find(".//Devices/SpotLoad")
-        if spot is None:
-            continue
-        bus = safe_name((sec.findtext("FromNodeID") or "").strip())
-        if not bus:
-            continue
-        phases = set()
-        for val in spot.findall(".//CustomerLoadValue"):
-            p = (val.findtext("Phase") or "").strip().upper()
-            if p in PHASES:
-                phases.add(p)
-        out[bus] = max(out.get(bus, 0), len(phases) or 1)
-    return out
-
-
-def _shunt_buses(root: ET.Element) -> Set[str]:
-    """Set of buses that host shunt capacitors (sanitized)."""
-    out: Set[str] = set()
-    for sec in root.findall(".//Section"):
-        if sec.find(".//Devices/ShuntCapacitor") is not None:
-            bus = safe_name((sec.findtext("FromNodeID") or "").strip())
+        fb = safe_name(rec.from_node.strip())
+        tb = safe_name(rec.to_node.strip())
+        for bus in (fb, tb):
             if bus:
-                out.add(bus)
-    return out
-
+                bus_ph.setdefault(bus, set()).update([p for p in PHASES if p in ph])
+        if fb and tb:
+            edges.append((fb, tb))
 
-def _xfmr_secondary_buses(root: ET.Element) -> Set[str]:
-    """
-    Identify transformer sections and mark the *secondary* bus (sanitized).
-    We infer the secondary as the node opposite NormalFeedingNodeID
-    (falling back to ToNodeID).
-    """
-    secondaries: Set[str] = set()
-    for sec in root.findall(".//Section"):
-        xf = sec.find(".//Devices/Transformer")
-        if xf is None:
+        if not rec.devices:
             continue
-        from_bus = safe_name((sec.findtext("FromNodeID") or "").strip())
-        to_bus   = safe_name((sec.findtext("ToNodeID") or "").strip())
-        normal   = safe_name((xf.findtext("NormalFeedingNodeID") or "").strip())
-        if normal and normal == from_bus and to_bus:
-            second = to_bus
-        elif normal and normal == to_bus and from_bus:
-            second = from_bus
-        else:
-            second = to_bus or from_bus
-        if second:
-            secondaries.add(second)
-    return secondaries
-
-
-def _line_sections(root: ET.Element) -> List[Tuple[str, str, int]]:
+        first: Dict[str, str] = {}
+        for tag, _num, detail in rec.devices:
+            first.setdefault(tag, detail)
+        if "SpotLoad" in first and fb:
+            loads[fb] = max(loads.get(fb, 0), len(first["SpotLoad"]) or 1)
+        if fb and "ShuntCapacitor" in first:
+            shunts.add(fb)
+        if "Transformer" in first:
+            normal = safe_name(first["Transformer"])
+            if normal and normal == fb and tb:
+                second = tb
+            elif normal and normal == tb and fb:
+                second = fb
+            else:
+                second = tb or fb
+            if second:
+                xsec.add(second)
+            if fb and tb:
+                xf_pairs.append((fb, tb, _phase_count(rec.phase)))
+        if fb and tb and any(tag in first for tag in LINE_TAGS):
+            lines.append((fb, tb, _phase_count(rec.phase)))
+
+    sources = [safe_name(s.findtext("SourceNodeID")) for s in model["root"].iter("Source")]
+    return {"bus_ph": bus_ph, "loads": loads, "shunts": shunts, "xsec": xsec,
+            "lines": lines, "xf_pairs": xf_pairs, "edges": edges, "sources": [s for s in sources if s]}
+
+
+def pin_model(input_path: Path) -> dict:
     """
-    Return list of (from_bus, to_bus, nphases) for line-like devices (sanitized).
-    Includes overhead and underground variants.
+    Cached _scan_sections of the model file's section model, with its
+    PinSelection graphs in "graphs" (shared; do not modify).
     """
-    out: List[Tuple[str, str, int]] = []
-    for sec in root.findall(".//Section"):
-        if not (sec.find(".//Devices/OverheadLineUnbalanced") is not None or
-                sec.find(".//Devices/OverheadByPhase") is not None or
-                sec.find(".//Devices/OverheadLine") is not None or
-                sec.find(".//Devices/Underground") is not None or
-                sec.find(".//Devices/UndergroundCable") is not None):
-            continue
-        fb = safe_name((sec.findtext("FromNodeID") or "").strip())
-        tb = safe_name((sec.findtext("ToNodeID") or "").strip())
-        ph = (sec.findtext("Phase") or "ABC").upper()
-        nph = sum(1 for p in PHASES if p in ph) or 3
-        if fb and tb:
-            out.append((fb, tb, nph))
-    return out
+    key = file_fingerprint(Path(input_path))
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None:
+            _CACHE.move_to_end(key)
+            return hit
 
+    model = _scan_sections(section_model(Path(input_path)))
+    model["graphs"] = pin_graphs(model)
 
-def _transformer_pairs(root: ET.Element) -> List[Tuple[str, str, int]]:
-    """Return list of (from_bus, to_bus, nphases) for transformers (for tap pins), sanitized."""
-    out: List[Tuple[str, str, int]] = []
-    for sec in root.findall(".//Section"):
-        xf = sec.find(".//Devices/Transformer")
-        if xf is None:
-            continue
-        fb = safe_name((sec.findtext("FromNodeID") or "").strip())
-        tb = safe_name((sec.findtext("ToNodeID") or "").strip())
-        ph = (sec.findtext("Phase") or "ABC").upper()
-        nph = sum(1 for p in PHASES if p in ph) or 3
-        if fb and tb:
-            out.append((fb, tb, nph))
-    return out
+    with _CACHE_LOCK:
+        _CACHE[key] = model
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return model
 
 
 # ---------- Selection logic (no hardcoding) ----------
 
-def _voltage_bus_set(root: ET.Element) -> Set[str]:
+def _voltage_bus_set(model: dict) -> Set[str]:
     """
-    Build the set of buses for V_abs/V_ang pins (sanitized):
+    Buses for V_abs/V_ang pins (sanitized), chosen by the export option
+    "pin_rules" (Modules.PinSelection). The default rule keeps:
       - buses with SpotLoad(s)
       - buses with ShuntCapacitor(s)
       - transformer secondary buses
       - plus one-hop neighbors of any of the above (via a line)
     """
-    loads = set(_loads_by_bus(root).keys())
-    shunts = _shunt_buses(root)
-    xsec = _xfmr_secondary_buses(root)
-
-    base = loads | shunts | xsec
-
-    # expand by one hop along line sections
-    lines = _line_sections(root)
-    neighbors: Dict[str, Set[str]] = {}
-    for a, b, _ in lines:
-        neighbors.setdefault(a, set()).add(b)
-        neighbors.setdefault(b, set()).add(a)
+    return select_buses(model)
 
-    expanded = set(base)
-    for b in list(base):
-        expanded.update(neighbors.get(b, set()))
 
-    return expanded
+# ---------- Sheet writer ----------
 
+def _pin_groups(v_buses, bus_ph, lines, load_phase_counts, xf_pairs) -> List[Tuple[str, str, List[str]]]:
+    """(direction, group, pins) in sheet order."""
+    def _order(b: str) -> List[str]:
+        return sorted(bus_ph.get(b, set(PHASES)), key=lambda x: "ABC".index(x))
+
+    vabs = [f"{b}{SUFFIX[p]}/Vmag" for b in sorted(v_buses) for p in _order(b)]
+    vang = [f"{b}{SUFFIX[p]}/Vang" for b in sorted(v_buses) for p in _order(b)]
+    # From side currents / angles
+    iabs = [f"LN_{fb}_{tb}/ImagFrom{idx}" for fb, tb, nph in sorted(lines) for idx in range(1, nph + 1)]
+    iang = [f"LN_{fb}_{tb}/IangFrom{idx}" for fb, tb, nph in sorted(lines) for idx in range(1, nph + 1)]
+    # Loads at the selected buses (same list outgoing and incoming)
+    pq = [f"LD_{b}/{x}{idx}" for b in sorted(v_buses)
+          for idx in range(1, load_phase_counts.get(b, 0) + 1) for x in ("P", "Q")]
+    # All transformers with active endpoints
+    taps = [f"TR1_{fb}_{tb}/tap_{idx}" for fb, tb, nph in sorted(xf_pairs) for idx in range(1, nph + 1)]
+    return [
+        ("//outgoing", "V_abs", vabs),
+        ("//outgoing", "V_ang", vang),
+        ("//outgoing", "I_abs", iabs),
+        ("//outgoing", "I_ang", iang),
+        ("//outgoing", "PQ_ld", pq),
+        ("//incoming", "Trans_tap", taps),
+        ("//incoming", "PQ_ld", list(pq)),
+    ]
 
-# ---------- Sheet writer ----------
 
 def write_pins_sheet(xw, input_path: Path) -> None:
     """
@@ -165,20 +171,44 @@ def write_pins_sheet(xw, input_path: Path) -> None:
       incoming  Trans_tap TR1_from_to/tap_# ...
       incoming  PQ_ld   LD_<bus>/P# LD_<bus>/Q# ...
 
+    Layout (export option "pins_layout"):
+      - "rows" (default): one row per group as above. A group with more pins
+        than fit in Excel's 16,384 columns continues on the next row(s) under
+        the same labels, and <workbook>.pins.json lists every group in full.
+      - "vertical": one row per pin (direction, group, pin).
+
     Protections:
       - All bus/ID strings are sanitized via safe_name (so '-' -> '__', etc.).
       - **Island policy** drives inclusion:
           * If an active island is chosen â†’ include only that island.
           * If none chosen â†’ include only islands with a voltage source.
     """
-    root = ET.fromstring(input_path.read_text(encoding="utf-8", errors="ignore"))
-
-    # Discovery (all sanitized by helpers above)
-    bus_ph = _bus_phases(root)                  # bus -> phases present
-    v_buses = _voltage_bus_set(root)            # selected buses for voltage pins
-    lines = _line_sections(root)                # all line sections (for currents)
-    load_phase_counts = _loads_by_bus(root)     # bus -> number of load phases
-    xf_pairs = _transformer_pairs(root)         # (from,to,nph)
+    model = pin_model(input_path)
+
+    # Discovery (all sanitized by the scan)
+    bus_ph = model["bus_ph"]                    # bus -> phases present
+    v_buses = _voltage_bus_set(model)           # selected buses for voltage pins
+    lines = model["lines"]                      # all line sections (for currents)
+    load_phase_counts = model["loads"]          # bus -> number of load phases
+    xf_pairs = model["xf_pairs"]                # (from,to,nph)
+
+    # Optional line-chain reduction: pins follow the merged Line rows; internal
+    # chain buses are never pin buses (Reduction keeps those), so they just drop out
+    if reduction_enabled():
+        red = chain_reduction(input_path)
+        absorbed = {(sec["from"], sec["to"]) for c in red["chains"] for sec in c["sections"]}
+        lines = [ln for ln in lines if (ln[0], ln[1]) not in absorbed]
+        lines += [(c["from"], c["to"], sum(1 for p in PHASES if p in c["phase"]) or 3) for c in red["chains"]]
+        bus_ph = {b: phs for b, phs in bus_ph.items() if b not in red["removed_buses"]}
+
+    # Load aggregation per service transformer moves loads to the secondary bus
+    moves = target_bus_map(input_path)
+    if moves:
+        moved: Dict[str, int] = {}
+        for b, n in load_phase_counts.items():
+            t = moves.get(b, b)
+            moved[t] = max(moved.get(t, 0), n)
+        load_phase_counts = moved
 
     # ---------- Filter by island policy ----------
     # Buses
@@ -190,80 +220,47 @@ def write_pins_sheet(xw, input_path: Path) -> None:
     lines = [(fb, tb, nph) for (fb, tb, nph) in lines if not should_comment_branch(fb, tb)]
     xf_pairs = [(fb, tb, nph) for (fb, tb, nph) in xf_pairs if not should_comment_branch(fb, tb)]
 
+    groups = _pin_groups(v_buses, bus_ph, lines, load_phase_counts, xf_pairs)
+
     # Writer setup
     wb = xw.book
     ws = wb.add_worksheet("Pins")
     xw.sheets["Pins"] = ws
 
-    hdr = wb.add_format({"bold": True})
     ws.set_column(0, 0, 10)   # direction
     ws.set_column(1, 1, 12)   # group
-    ws.set_column(2, 200, 24)
 
+    if get_export_options().get("pins_layout", "rows") == "vertical":
+        ws.set_column(2, 2, 36)
+        r = 0
+        for direction, group, pins in groups:
+            if not pins:
+                ws.write_row(r, 0, [direction, group])
+                r += 1
+            for pin in pins:
+                ws.write_row(r, 0, [direction, group, pin])
+                r += 1
+        return
+
+    ws.set_column(2, 200, 24)
     r = 0
-    def row(items):  # simple row write
-        nonlocal r
-        ws.write_row(r, 0, items)
-        r += 1
-
-    # ---- outgoing: V_abs ----
-    vabs = ["//outgoing", "V_abs"]
-    for b in sorted(v_buses):
-        for p in sorted(bus_ph.get(b, set(PHASES)), key=lambda x: "ABC".index(x)):
-            vabs.append(f"{b}{SUFFIX[p]}/Vmag")
-    row(vabs)
-
-    # ---- outgoing: V_ang ----
-    vang = ["//outgoing", "V_ang"]
-    for b in sorted(v_buses):
-        for p in sorted(bus_ph.get(b, set(PHASES)), key=lambda x: "ABC".index(x)):
-            vang.append(f"{b}{SUFFIX[p]}/Vang")
-    row(vang)
-
-    # ---- outgoing: I_abs (From side currents) ----
-    iabs = ["//outgoing", "I_abs"]
-    for fb, tb, nph in sorted(lines):
-        tag = f"LN_{fb}_{tb}"
-        for idx in range(1, nph + 1):
-            iabs.append(f"{tag}/ImagFrom{idx}")
-    row(iabs)
-
-    # ---- outgoing: I_ang (From side angles) ----
-    iang = ["//outgoing", "I_ang"]
-    for fb, tb, nph in sorted(lines):
-        tag = f"LN_{fb}_{tb}"
-        for idx in range(1, nph + 1):
-            iang.append(f"{tag}/IangFrom{idx}")
-    row(iang)
-
-    # ---- outgoing: PQ_ld (loads at the selected buses) ----
-    pq_out = ["//outgoing", "PQ_ld"]
-    for b in sorted(v_buses):
-        n = load_phase_counts.get(b, 0)
-        if n <= 0:
-            continue
-        base = f"LD_{b}"
-        for idx in range(1, n + 1):
-            pq_out.append(f"{base}/P{idx}")
-            pq_out.append(f"{base}/Q{idx}")
-    row(pq_out)
-
-    # ---- incoming: Trans_tap (all transformers with active endpoints) ----
-    taps = ["//incoming", "Trans_tap"]
-    for fb, tb, nph in sorted(xf_pairs):
-        base = f"TR1_{fb}_{tb}"
-        for idx in range(1, nph + 1):
-            taps.append(f"{base}/tap_{idx}")
-    row(taps)
-
-    # ---- incoming: PQ_ld (match the same loads we exposed) ----
-    pq_in = ["//incoming", "PQ_ld"]
-    for b in sorted(v_buses):
-        n = load_phase_counts.get(b, 0)
-        if n <= 0:
-            continue
-        base = f"LD_{b}"
-        for idx in range(1, n + 1):
-            pq_in.append(f"{base}/P{idx}")
-            pq_in.append(f"{base}/Q{idx}")
-    row(pq_in)
+    split = []
+    for direction, group, pins in groups:
+        first = r
+        for k in range(0, max(len(pins), 1), ROW_PINS):
+            ws.write_row(r, 0, [direction, group] + pins[k:k + ROW_PINS])
+            r += 1
+        if r - first > 1:
+            split.append(f"{group} ({len(pins)} pins, rows {first + 1}-{r})")
+
+    if getattr(xw, "path", None) is None:
+        return
+    manifest = Path(xw.path).with_suffix(".pins.json")
+    if not split:
+        manifest.unlink(missing_ok=True)  # stale sidecar of an earlier, larger export
+    else:
+        with open(manifest, "w", encoding="utf-8") as fh:
+            json.dump({"workbook": Path(xw.path).name, "max_columns": MAX_COLS,
+                       "groups": [{"direction": d, "group": g, "count": len(p), "pins": p}
+                                  for d, g, p in groups]}, fh)
+        print(f"[Pins] Over {ROW_PINS} pins, continued on extra rows: {', '.join(split)}; full list in {manifest.name}")
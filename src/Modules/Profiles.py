@@ -0,0 +1,172 @@
+# Modules/Profiles.py
+from __future__ import annotations
+import csv
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Modules.IslandFilter import should_comment_bus
+from Modules.Jobs import checkpoint
+
+# Time-series load profiles (quasi-static studies).
+#
+# Input: a CSV of normalized profiles, one column per CustomerType, one row per
+# time step (8760 hourly, 35040 quarter-hourly, ...). An optional first column
+# that is not a CustomerType (time / timestamp / hour ...) is kept as labels.
+# A column named "default" applies to customer types without their own column;
+# loads of any other type stay at their base value (multiplier 1).
+#
+# Output: the P/Q series of every Load-sheet row (same rows, islands and
+# aggregation as the workbook), column "<load ID>/P<k>" / "<load ID>/Q<k>" in kW /
+# kvar, written in chunks of time steps so memory stays bounded:
+#   npy     : <out>/series_00000.npy, ... (steps x columns) + manifest.json
+#   parquet : <out>/series.parquet, one row group per chunk (needs pyarrow)
+# Each chunk is one broadcast: profiles[t0:t1, type of column] * base[column].
+
+PROFILE_FORMATS = ("auto", "npy", "parquet")
+DEFAULT_CHUNK_MB = 256
+_TIME_HEADERS = {"", "time", "timestamp", "datetime", "date", "hour", "step", "t"}
+
+
+def read_profile_csv(csv_path: str | Path) -> Tuple[List[str], np.ndarray, Optional[List[str]]]:
+    """(customer types, steps x types multipliers, time labels or None)."""
+    with open(Path(csv_path), "r", encoding="utf-8-sig", newline="") as fh:
+        reader = csv.reader(fh)
+        header = [h.strip() for h in next(reader)]
+        rows = [r for r in reader if r and any(c.strip() for c in r)]
+
+    has_time = header[0].lower() in _TIME_HEADERS
+    types = header[1:] if has_time else header
+    if not types:
+        raise ValueError(f"{csv_path}: no profile columns")
+    if not rows:
+        raise ValueError(f"{csv_path}: no time steps")
+    first = 1 if has_time else 0
+    try:
+        values = np.array([[float(c) for c in r[first:first + len(types)]] for r in rows], dtype=float)
+    except ValueError as e:
+        raise ValueError(f"{csv_path}: non-numeric profile value ({e})") from None
+    if values.shape != (len(rows), len(types)):
+        raise ValueError(f"{csv_path}: every row needs {len(types)} profile values")
+    labels = [r[0].strip() for r in rows] if has_time else None
+    return types, values, labels
+
+
+def _load_columns(input_path: Path) -> Tuple[List[str], np.ndarray, List[str]]:
+    """Column names, base kW/kvar per column and CustomerType per column (Load-sheet rows)."""
+    from Modules.Load import load_rows  # lazy: keeps the profile module import-light
+
+    single, two, three, _members = load_rows(input_path)
+    names: List[str] = []
+    base: List[float] = []
+    ctype: List[str] = []
+
+    def _add(row: dict, pq: List[Tuple[str, str]]) -> None:
+        if should_comment_bus(row["Bus"]):
+            return
+        for k, (p, q) in enumerate(pq, start=1):
+            names.extend((f"{row['ID']}/P{k}", f"{row['ID']}/Q{k}"))
+            base.extend((row[p], row[q]))
+            ctype.extend((row["CustType"], row["CustType"]))
+
+    for row in single:
+        _add(row, [("P1", "Q1")])
+    for row in two:
+        _add(row, [("P1", "Q1"), ("P2", "Q2")])
+    for row in three:
+        _add(row, [("P_A", "Q_A"), ("P_B", "Q_B"), ("P_C", "Q_C")])
+    return names, np.asarray(base, dtype=float), ctype
+
+
+def profile_format(fmt: str) -> str:
+    """Output format actually used for `fmt` (auto -> parquet when pyarrow is installed)."""
+    if fmt not in PROFILE_FORMATS:
+        raise ValueError(f"profile format must be one of {PROFILE_FORMATS}, got {fmt!r}")
+    if fmt == "npy":
+        return fmt
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        if fmt == "parquet":
+            raise RuntimeError("Parquet profile output needs pyarrow (pip install pyarrow)") from None
+        return "npy"
+    return "parquet"
+
+
+def export_profiles(
+    input_path: str | Path,
+    csv_path: str | Path,
+    out_dir: str | Path,
+    *,
+    fmt: str = "auto",
+    chunk_mb: int = DEFAULT_CHUNK_MB,
+    dtype: str = "float32",
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """
+    Write P/Q series for the current export scope. Call with the island context
+    and export options of the workbook set (ExtractionService.export does).
+    Returns the manifest (also written to <out_dir>/manifest.json).
+    """
+    in_path, out = Path(input_path), Path(out_dir)
+    fmt = profile_format(fmt)
+    types, prof, labels = read_profile_csv(csv_path)
+    names, base, ctype = _load_columns(in_path)
+
+    # Column -> profile index; unknown types use "default" or the constant column
+    by_type = {t.strip().lower(): j for j, t in enumerate(types)}
+    ones = len(types)
+    fallback = by_type.get("default", ones)
+    col_prof = np.asarray([by_type.get((c or "").strip().lower(), fallback) for c in ctype], dtype=np.intp)
+    unmatched = sorted({c for c, j in zip(ctype, col_prof) if j == ones})
+    if unmatched:
+        log(f"[Profiles] No profile for customer type(s) {unmatched}: kept at base value")
+    prof = np.hstack([prof, np.ones((len(prof), 1))]).astype(dtype, copy=False)
+    base = base.astype(dtype)
+
+    steps, ncol = prof.shape[0], len(names)
+    itemsize = np.dtype(dtype).itemsize
+    chunk = max(1, min(steps, (chunk_mb << 20) // max(1, ncol * itemsize)))
+    log(f"[Profiles] {ncol // 2} load phases x {steps} steps -> {out} ({fmt}, {chunk} steps per chunk)")
+
+    out.mkdir(parents=True, exist_ok=True)
+    files: List[str] = []
+    writer = None
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([pa.field(n, pa.from_numpy_dtype(np.dtype(dtype))) for n in names])
+        writer = pq.ParquetWriter(out / "series.parquet", schema)
+        files.append("series.parquet")
+    try:
+        for k, t0 in enumerate(range(0, steps, chunk)):
+            checkpoint()
+            block = prof[t0:t0 + chunk][:, col_prof]    # (steps in chunk, columns)
+            block *= base
+            if writer is not None:
+                cols = [pa.array(np.ascontiguousarray(c)) for c in block.T]
+                writer.write_table(pa.Table.from_arrays(cols, schema=schema))
+            else:
+                name = f"series_{k:05d}.npy"
+                np.save(out / name, block)
+                files.append(name)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    manifest = {
+        "model": str(in_path),
+        "profiles": str(Path(csv_path)),
+        "format": fmt,
+        "dtype": dtype,
+        "steps": steps,
+        "chunk_steps": chunk,
+        "columns": names,
+        "files": files,
+        "time": labels,
+    }
+    with open(out / "manifest.json", "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+    return manifest
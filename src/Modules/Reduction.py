@@ -0,0 +1,223 @@
+# Modules/Reduction.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+import xml.etree.ElementTree as ET
+
+from Modules.General import file_fingerprint, get_export_options, read_xml, safe_name
+from Modules.IslandChecker import _section_has_closed_connection
+from Modules.SectionRecords import tree_model
+
+# Optional series line-chain reduction (export option "reduce_chains").
+#
+# A node is internal to a chain when exactly two sections touch it, both carry
+# a single closed line/cable device and nothing else (an open or disconnected
+# line never joins a chain), and both use the same line code,
+# device type and phasing. Consecutive internal nodes collapse into one Line row
+# from chain end to chain end with the summed length - the per-length matrices
+# are identical, so this is the exact series equivalent of the exported rows.
+#
+# Chains never cross a switch, transformer, load, shunt or branching node, and
+# sources plus every bus the Pins sheet observes are kept, so islands and pins
+# are unaffected. Internal buses are dropped from Bus and Pins; the mapping back
+# to the original sections is written to the "Line Reduction" sheet.
+#
+# The result depends on the model file and the Pins selection rules (export
+# option "pin_rules") and is cached per (fingerprint, rules).
+
+LINE_TAGS = frozenset({
+    "OverheadLineUnbalanced", "OverheadByPhase", "OverheadLine",
+    "Underground", "UndergroundCable", "UndergroundCableUnbalanced", "UndergroundByPhase", "Cable",
+})
+
+_CACHE_SIZE = 2
+_CACHE: "OrderedDict[tuple, dict]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def reduction_enabled() -> bool:
+    return bool(get_export_options().get("reduce_chains", False))
+
+
+def _protected_nodes(root: ET.Element) -> Set[str]:
+    """Sources and every bus the Pins sheet reports voltages for."""
+    from Modules.Pins import _scan_sections, _voltage_bus_set  # lazy: Pins imports this module
+
+    keep: Set[str] = set(_voltage_bus_set(_scan_sections(tree_model(root))))
+    for src in root.iter("Source"):
+        nid = safe_name(src.findtext("SourceNodeID"))
+        if nid:
+            keep.add(nid)
+    return keep
+
+
+def _find_chains(root: ET.Element) -> dict:
+    from Modules.Line import _iter_lines  # lazy: Line imports this module
+
+    # Incidence over ALL sections (any device) and the pure line sections
+    incidence: Dict[str, List[str]] = {}
+    pure: Set[str] = set()
+    seen_sids: Set[str] = set()
+    dup_sids: Set[str] = set()
+    for holder in root.iter("Sections"):
+        for sec in holder.findall("Section"):
+            sid = (sec.findtext("SectionID") or "").strip()
+            f = safe_name(sec.findtext("FromNodeID"))
+            t = safe_name(sec.findtext("ToNodeID"))
+            if sid in seen_sids:
+                dup_sids.add(sid)
+            seen_sids.add(sid)
+            for n in (f, t):
+                if n:
+                    incidence.setdefault(n, []).append(sid)
+            devs = sec.find("Devices")
+            tags = [d.tag for d in devs] if devs is not None else []
+            if (sid and f and t and f != t and len(tags) == 1 and tags[0] in LINE_TAGS
+                    and _section_has_closed_connection(sec)):
+                pure.add(sid)
+    pure -= dup_sids
+
+    items: Dict[str, dict] = {}
+    for item in _iter_lines(root):
+        if item["section_id"] in pure:
+            items[item["section_id"]] = item
+    all_row_ids = {item["id"] for item in _iter_lines(root)}
+
+    def _key(item: dict) -> Tuple[str, str, str]:
+        return (item["type"], item["line_id"], item["phase"])
+
+    def _other(item: dict, n: str) -> str:
+        return item["to"] if item["from"] == n else item["from"]
+
+    protected = _protected_nodes(root)
+
+    def _internal(n: str) -> bool:
+        sids = incidence.get(n, [])
+        if n in protected or len(sids) != 2 or sids[0] == sids[1]:
+            return False
+        a, b = items.get(sids[0]), items.get(sids[1])
+        if a is None or b is None or _key(a) != _key(b):
+            return False
+        return _other(a, n) != _other(b, n)
+
+    internal = {n for n in incidence if _internal(n)}
+
+    chains: List[dict] = []
+    visited: Set[str] = set()
+    for start in sorted(internal):
+        if start in visited:
+            continue
+        # walk both ways from `start` to the chain ends
+        halves = []
+        for sid in incidence[start]:
+            nodes: List[str] = []
+            secs: List[str] = [sid]
+            prev, cur = start, _other(items[sid], start)
+            while cur in internal and cur != start:
+                nodes.append(cur)
+                nxt = next(s for s in incidence[cur] if s != secs[-1])
+                secs.append(nxt)
+                prev, cur = cur, _other(items[nxt], cur)
+            halves.append((nodes, secs, cur))
+        (nodes_a, secs_a, end_a), (nodes_b, secs_b, end_b) = halves
+        chain_nodes = list(reversed(nodes_a)) + [start] + nodes_b
+        visited.update(chain_nodes)
+        if end_a == end_b or end_a in chain_nodes:
+            continue  # ring through internal nodes only: leave it alone
+        sids = list(reversed(secs_a)) + secs_b
+        first = items[sids[0]]
+        row_id = safe_name(f"LN_{end_a}_{end_b}")
+        if row_id in all_row_ids:
+            row_id = f"{row_id}_R"
+        all_row_ids.add(row_id)
+        chains.append({
+            "type": first["type"],
+            "id": row_id,
+            "section_id": "",
+            "from": end_a, "to": end_b,
+            "phase": first["phase"],
+            "length_m": sum((items[s]["length_m"] or 0.0) for s in sids),
+            "line_id": first["line_id"],
+            "sections": [items[s] for s in sids],
+            "internal": chain_nodes,
+        })
+
+    return {
+        "chains": chains,
+        "absorbed": {s for c in chains for s in (i["section_id"] for i in c["sections"])},
+        "removed_buses": {n for c in chains for n in c["internal"]},
+    }
+
+
+def chain_reduction(input_path: str | Path) -> dict:
+    """
+    {"chains": [merged line items, with "sections" and "internal" buses],
+     "absorbed": {SectionID}, "removed_buses": {bus}} for the model file.
+    The returned dict is shared; callers must not modify it.
+    """
+    from Modules.PinSelection import rules_key  # protected buses follow the pin selection
+
+    key = (file_fingerprint(Path(input_path)), rules_key())
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is not None:
+            _CACHE.move_to_end(key)
+            return hit
+
+    red = _find_chains(read_xml(Path(input_path)))
+    print(f"[Reduction] {len(red['chains'])} line chain(s): "
+          f"{len(red['absorbed'])} sections -> {len(red['chains'])} rows, "
+          f"{len(red['removed_buses'])} internal buses removed")
+
+    with _CACHE_LOCK:
+        _CACHE[key] = red
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return red
+
+
+def removed_buses(input_path: str | Path) -> Set[str]:
+    """Internal chain buses to leave out of Bus/Pins (empty when reduction is off)."""
+    return chain_reduction(input_path)["removed_buses"] if reduction_enabled() else set()
+
+
+def reduce_line_items(items: Iterable[dict], red: dict) -> Iterator[dict]:
+    """Line items (Line._iter_lines) with absorbed sections replaced by chain rows."""
+    absorbed = red["absorbed"]
+    for item in items:
+        if item["section_id"] and item["section_id"] in absorbed:
+            continue
+        yield item
+    yield from red["chains"]
+
+
+# ---------------- mapping sheet ----------------
+def write_reduction_sheet(xw, red: dict) -> None:
+    """One row per original section: merged Line row -> section it replaced."""
+    from Modules.Line import MI_PER_M
+
+    wb = xw.book
+    ws = wb.add_worksheet("Line Reduction")
+    xw.sheets["Line Reduction"] = ws
+
+    th = wb.add_format({"bold": True, "bottom": 1})
+    num6 = wb.add_format({"num_format": "0.000000"})
+    widths = [28, 14, 14, 18, 28, 14, 14, 12, 28]
+    for c, w in enumerate(widths):
+        ws.set_column(c, c, w)
+
+    ws.write_row(0, 0, ["Line ID", "From", "To", "Section ID", "Original ID",
+                        "Section from", "Section to", "Length", "Removed buses"], th)
+    r = 1
+    for chain in red["chains"]:
+        internal = " ".join(chain["internal"])
+        for sec in chain["sections"]:
+            ws.write(r, 0, chain["id"]); ws.write(r, 1, chain["from"]); ws.write(r, 2, chain["to"])
+            ws.write(r, 3, sec["section_id"]); ws.write(r, 4, sec["id"])
+            ws.write(r, 5, sec["from"]); ws.write(r, 6, sec["to"])
+            ws.write_number(r, 7, (sec["length_m"] or 0.0) * MI_PER_M, num6)
+            ws.write(r, 8, internal)
+            r += 1
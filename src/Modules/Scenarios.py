@@ -0,0 +1,159 @@
+# Modules/Scenarios.py
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+
+from Modules.General import input_stem, read_xml, safe_name
+
+# Switching scenarios: the same feeder exported under several device states.
+#
+# A scenario is {"name": "...", "overrides": [override, ...]} with
+#   {"device": "<DeviceNumber>", "state": "open" | "closed"}
+#   {"device": "...", "closed_phase": "AB", "normal_status": "Closed"}   (explicit fields)
+# and optional "tag" (Switch, Breaker, ...) / "section" (SectionID) to narrow the
+# match. Device numbers are compared after safe_name, like the Switch sheet IDs.
+#
+# Overrides are written into the cached parsed tree for the duration of one
+# export and then restored, so every scenario reuses one parse. Only the island
+# analysis (and, through it, Bus/Switch commenting) depends on device states; it
+# is recomputed per scenario without touching the analysis cache. Everything
+# else (base voltages, line tables, reductions) stays cached per file.
+
+SWITCHING_TAGS = ("Switch", "Sectionalizer", "Breaker", "Fuse", "Recloser")
+
+# Undo record: (device element, child tag, previous text, child existed)
+Undo = List[Tuple[ET.Element, str, Optional[str], bool]]
+
+
+def _switching_devices(root: ET.Element) -> Dict[str, List[Tuple[str, str, ET.Element, ET.Element]]]:
+    """safe_name(DeviceNumber) -> [(tag, SectionID, <Section>, device)]."""
+    out: Dict[str, List[Tuple[str, str, ET.Element, ET.Element]]] = {}
+    for holder in root.iter("Sections"):
+        for sec in holder.findall("Section"):
+            devs = sec.find("Devices")
+            if devs is None:
+                continue
+            sid = (sec.findtext("SectionID") or "").strip()
+            for dev in devs:
+                if dev.tag in SWITCHING_TAGS:
+                    num = safe_name(dev.findtext("DeviceNumber"))
+                    if num:
+                        out.setdefault(num, []).append((dev.tag, sid, sec, dev))
+    return out
+
+
+def _set_child(dev: ET.Element, tag: str, text: str, undo: Undo) -> None:
+    child = dev.find(tag)
+    if child is None:
+        child = ET.SubElement(dev, tag)
+        undo.append((dev, tag, None, False))
+    else:
+        undo.append((dev, tag, child.text, True))
+    child.text = text
+
+
+def apply_switching(root: ET.Element, overrides: List[Dict[str, Any]]) -> Undo:
+    """Write device-state overrides into `root`; returns the undo record for restore_switching."""
+    devices = _switching_devices(root)
+    undo: Undo = []
+    try:
+        for ov in overrides:
+            num = safe_name(str(ov.get("device", "")))
+            hits = [(tag, sid, sec, dev) for tag, sid, sec, dev in devices.get(num, [])
+                    if ov.get("tag") in (None, tag) and ov.get("section") in (None, sid)]
+            if not hits:
+                raise ValueError(f"switching override: no {ov.get('tag') or 'switching device'} {ov.get('device')!r}"
+                                 + (f" in section {ov['section']!r}" if ov.get("section") else ""))
+            state = str(ov.get("state", "")).strip().lower()
+            if state not in ("", "open", "closed"):
+                raise ValueError(f"switching override: state must be 'open' or 'closed', got {ov.get('state')!r}")
+            for _tag, _sid, sec, dev in hits:
+                if state == "closed":
+                    _set_child(dev, "ClosedPhase", (sec.findtext("Phase") or "ABC").strip() or "ABC", undo)
+                    _set_child(dev, "NormalStatus", "Closed", undo)
+                elif state == "open":
+                    _set_child(dev, "ClosedPhase", "None", undo)
+                    _set_child(dev, "NormalStatus", "Open", undo)
+                if ov.get("closed_phase") is not None:
+                    _set_child(dev, "ClosedPhase", str(ov["closed_phase"]), undo)
+                if ov.get("normal_status") is not None:
+                    _set_child(dev, "NormalStatus", str(ov["normal_status"]), undo)
+    except Exception:
+        restore_switching(undo)
+        raise
+    return undo
+
+
+def restore_switching(undo: Undo) -> None:
+    """Put the tree back exactly as it was before apply_switching."""
+    for dev, tag, text, existed in reversed(undo):
+        child = dev.find(tag)
+        if child is None:
+            continue
+        if existed:
+            child.text = text
+        else:
+            dev.remove(child)
+    undo.clear()
+
+
+def open_tie_scenarios(input_path: str | Path) -> List[Dict[str, Any]]:
+    """One scenario per normally-open switching device, closing it (the others as in the file)."""
+    from Modules.IslandChecker import _dev_is_closed
+
+    out: List[Dict[str, Any]] = []
+    for num, hits in sorted(_switching_devices(read_xml(Path(input_path))).items()):
+        if any(not _dev_is_closed(dev) for _tag, _sid, _sec, dev in hits):
+            out.append({"name": f"close_{num}", "overrides": [{"device": num, "state": "closed"}]})
+    return out
+
+
+def load_scenarios(path: str | Path) -> List[Dict[str, Any]]:
+    """Scenario list from a JSON file: a list of scenarios or {"scenarios": [...]}."""
+    with open(Path(path), "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("scenarios", [])
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of scenarios")
+    for k, sc in enumerate(data, start=1):
+        if not isinstance(sc, dict) or not isinstance(sc.get("overrides", []), list):
+            raise ValueError(f"{path}: scenario {k} needs an 'overrides' list")
+        sc.setdefault("name", f"scenario_{k}")
+    return data
+
+
+# ---------------- batch export ----------------
+def scenario_output(out_dir: str | Path, input_path: str | Path, name: str) -> Path:
+    return Path(out_dir) / f"{input_stem(input_path)}__{safe_name(name) or 'scenario'}.xlsx"
+
+
+def export_scenarios(
+    input_path: str | Path,
+    scenarios: List[Dict[str, Any]],
+    out_dir: str | Path,
+    *,
+    workers: Optional[int] = None,
+    log: Callable[[str], None] = print,
+    **export_kw: Any,
+) -> List[dict]:
+    """
+    One workbook per scenario in `out_dir` (<model>__<name>.xlsx). `export_kw`
+    are ExtractionService.export arguments (island, only_sourceful, prune_mode,
+    options, sheets). With workers > 1 the scenarios run in a process pool whose
+    workers each parse the model once; workers=1 runs them in this process.
+    Returns the export results in scenario order, each with its "scenario" name.
+    """
+    in_path = str(Path(input_path).resolve())
+    outs = [str(scenario_output(out_dir, in_path, sc["name"])) for sc in scenarios]
+    if len(set(outs)) != len(outs):
+        raise ValueError("scenario names must be unique (after safe_name)")
+
+    from Modules.Worker import export_batch  # lazy: Worker imports this module lazily too
+    jobs = [(sc["name"], out, dict(export_kw, switching=sc.get("overrides", [])))
+            for sc, out in zip(scenarios, outs)]
+    log(f"[Scenarios] {len(scenarios)} scenario(s)")
+    results = export_batch(in_path, jobs, workers=workers, log=log)
+    return [dict(res, scenario=sc["name"]) for sc, res in zip(scenarios, results)]
@@ -0,0 +1,310 @@
+# Modules/SectionRecords.py
+from __future__ import annotations
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import xml.etree.ElementTree as ET
+
+from Modules.General import compression, file_fingerprint, is_xml_cached, pinned_sources, read_xml, xml_encoding
+from Modules.Jobs import checkpoint
+
+# Compact per-section records for the section-driven analyses (island graph,
+# Pins scan), with an optional multi-process ingestion path.
+#
+# A section model is {"records": [SectionRecord, ...], "root": tree, "full_tree":
+# whether "root" holds the section contents}. Serially
+# the records are read from the parsed tree (read_xml). With parse workers > 1
+# and a plain (uncompressed, ASCII-compatible) file that is not parsed yet:
+#   1. a byte scan of the memory-mapped file finds every <Sections> block and
+#      cuts the blocks into chunks of whole <Section> elements (runs from several
+#      small blocks share a chunk: whole sections concatenate into valid XML);
+#   2. a process pool parses the chunks (wrapped in a <Sections> element with the
+#      root's namespace declarations) and returns records, not Elements;
+#   3. meanwhile this process parses the rest: either the full tree (exports
+#      need it for the sheet writers anyway) or a skeleton without the section
+#      contents (analysis only), which still holds the Topo sources, nodes and
+#      equipment DBs the records are combined with.
+# Shipping Elements back would cost more than parsing them (pickling or
+# rebuilding a tree runs at Python speed, expat at C speed), so only the
+# records cross the process boundary: they pickle to a few percent of the XML.
+
+SECTIONS_OPEN, SECTIONS_CLOSE, SECTION_OPEN = b"<Sections>", b"</Sections>", b"<Section>"
+MIN_CHUNK_BYTES = 1 << 20
+_FEED_BYTES = 1 << 20
+_HEAD_BYTES = 4096
+_ROOT_TAG_RE = re.compile(rb"<([A-Za-z_][^\s/>]*)([^>]*)>")
+_XMLNS_RE = re.compile(rb"""\sxmlns(?::[A-Za-z0-9_.-]+)?\s*=\s*(?:"[^"]*"|'[^']*')""")
+
+
+class SectionRecord(NamedTuple):
+    section_id: str
+    from_node: str                        # raw IDs (not sanitized)
+    to_node: str
+    phase: str
+    closed: bool                          # closed conducting path (IslandChecker rule)
+    devices: Tuple[Tuple[str, str, str], ...]
+    # (tag, DeviceNumber, detail); detail = SpotLoad: phases of its
+    # CustomerLoadValues ("ABC" subset), Transformer: NormalFeedingNodeID
+
+
+def _record(sec: ET.Element, closed: Callable[[ET.Element], bool]) -> SectionRecord:
+    devs = sec.find("Devices")
+    devices = []
+    for dev in devs if devs is not None else ():
+        detail = ""
+        if dev.tag == "SpotLoad":
+            phases = {(v.findtext("Phase") or "").strip().upper() for v in dev.iter("CustomerLoadValue")}
+            detail = "".join(p for p in "ABC" if p in phases)
+        elif dev.tag == "Transformer":
+            detail = (dev.findtext("NormalFeedingNodeID") or "").strip()
+        devices.append((dev.tag, (dev.findtext("DeviceNumber") or "").strip(), detail))
+    return SectionRecord(
+        sec.findtext("SectionID") or "",
+        sec.findtext("FromNodeID") or "",
+        sec.findtext("ToNodeID") or "",
+        sec.findtext("Phase") or "",
+        closed(sec),
+        tuple(devices),
+    )
+
+
+def records_from_holders(holders: Iterable[ET.Element]) -> List[SectionRecord]:
+    """Records of the <Section> children of `holders` (<Sections> elements), in order."""
+    from Modules.IslandChecker import _section_has_closed_connection  # lazy: IslandChecker imports this module
+
+    out: List[SectionRecord] = []
+    for holder in holders:
+        checkpoint()
+        out.extend(_record(sec, _section_has_closed_connection) for sec in holder.findall("Section"))
+    return out
+
+
+def tree_model(root: ET.Element) -> Dict[str, Any]:
+    """Section model of an already parsed tree."""
+    return {"records": records_from_holders(root.iter("Sections")), "root": root, "full_tree": True}
+
+
+# ---------------- parse workers ----------------
+_SETTINGS: Dict[str, Any] = {"workers": 1, "mp_context": None}
+
+
+def set_parse_workers(workers: Optional[int], mp_context: Optional[str] = None) -> None:
+    """Processes for section ingestion: 1 = serial (default), 0 / None = one per CPU."""
+    _SETTINGS["workers"] = max(1, workers if workers else (os.cpu_count() or 1))
+    _SETTINGS["mp_context"] = mp_context
+
+
+def parse_workers() -> int:
+    return int(_SETTINGS["workers"])
+
+
+# ---------------- byte scan ----------------
+def section_blocks(buf: Any) -> List[Tuple[int, int]]:
+    """Content span (after <Sections>, before </Sections>) of every <Sections> block."""
+    blocks: List[Tuple[int, int]] = []
+    pos = 0
+    while True:
+        a = buf.find(SECTIONS_OPEN, pos)
+        if a < 0:
+            return blocks
+        a += len(SECTIONS_OPEN)
+        b = buf.find(SECTIONS_CLOSE, a)
+        if b < 0:
+            raise ET.ParseError(f"unterminated <Sections> at byte {a}")
+        blocks.append((a, b))
+        pos = b + len(SECTIONS_CLOSE)
+
+
+def section_chunks(buf: Any, blocks: List[Tuple[int, int]], chunk_bytes: int) -> List[List[Tuple[int, int]]]:
+    """
+    Chunks of about `chunk_bytes`, in file order. A chunk is a list of spans,
+    each a run of whole <Section> elements inside one block.
+    """
+    runs: List[Tuple[int, int]] = []
+    for a, b in blocks:
+        start = buf.find(SECTION_OPEN, a, b)
+        if start < 0:
+            continue
+        while b - start > chunk_bytes:
+            cut = buf.find(SECTION_OPEN, start + chunk_bytes, b)
+            if cut < 0:
+                break
+            runs.append((start, cut))
+            start = cut
+        runs.append((start, b))
+
+    chunks: List[List[Tuple[int, int]]] = []
+    size = chunk_bytes
+    for a, b in runs:
+        if size >= chunk_bytes:
+            chunks.append([])
+            size = 0
+        chunks[-1].append((a, b))
+        size += b - a
+    return chunks
+
+
+def _chunk_prefix(head: bytes) -> bytes:
+    """XML declaration plus a <Sections> start tag carrying the root's namespace declarations."""
+    enc = xml_encoding(head)
+    body = re.sub(rb"<\?.*?\?>|<!--.*?-->", b"", head, flags=re.DOTALL)
+    m = _ROOT_TAG_RE.search(body)
+    decls = b"".join(_XMLNS_RE.findall(m.group(2))) if m else b""
+    return b'<?xml version="1.0" encoding="' + enc.encode("ascii") + b'"?><Sections' + decls + b">"
+
+
+def _parse_chunk(path: str, spans: List[Tuple[int, int]], prefix: bytes) -> List[SectionRecord]:
+    """Pool worker: records of the sections in the byte spans of the file."""
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        parser = ET.XMLParser()
+        parser.feed(prefix)
+        for start, end in spans:
+            parser.feed(buf[start:end])
+        parser.feed(SECTIONS_CLOSE)
+        holder = parser.close()
+    return records_from_holders([holder])
+
+
+def _parse_skeleton(buf: Any, blocks: List[Tuple[int, int]]) -> ET.Element:
+    """The model without the contents of its <Sections> blocks (Topos, nodes, equipment ...)."""
+    parser = ET.XMLParser()
+    pos = 0
+    for a, b in blocks + [(len(buf), len(buf))]:
+        for k in range(pos, a, _FEED_BYTES):
+            checkpoint()
+            parser.feed(buf[k:min(k + _FEED_BYTES, a)])
+        pos = b
+    return parser.close()
+
+
+def parallel_ok(path: str | Path) -> bool:
+    """Whether the byte scan applies: a plain file on disk in an ASCII-compatible encoding."""
+    if pinned_sources(path) is not None or compression(path) is not None:
+        return False
+    with open(Path(path), "rb") as fh:
+        enc = xml_encoding(fh.read(_HEAD_BYTES)).lower().replace("_", "-")
+    return not enc.startswith(("utf-16", "utf-32"))
+
+
+def parse_sections_parallel(
+    path: str | Path,
+    workers: int,
+    *,
+    full_tree: bool = True,
+    mp_context: Optional[str] = None,
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """
+    Section model of a plain file, the <Section> chunks parsed by `workers`
+    processes while this one parses the full tree (`full_tree`, cached by
+    read_xml) or the skeleton. Raises ET.ParseError when a chunk does not parse
+    on its own (callers fall back to the serial path).
+    """
+    p = Path(path).resolve()
+    with open(p, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        blocks = section_blocks(buf)
+        total = sum(b - a for a, b in blocks)
+        chunk_bytes = max(MIN_CHUNK_BYTES, total // (workers * 4))
+        chunks = section_chunks(buf, blocks, chunk_bytes)
+        if not chunks:
+            return tree_model(read_xml(p))
+        prefix = _chunk_prefix(buf[:_HEAD_BYTES])
+        log(f"[Sections] {len(chunks)} chunk(s) of <Section> data ({total / 1e6:.1f} MB) on {workers} process(es)")
+
+        ctx = multiprocessing.get_context(mp_context)
+        with ProcessPoolExecutor(max_workers=min(workers, max(1, len(chunks))), mp_context=ctx) as pool:
+            futures = [pool.submit(_parse_chunk, str(p), spans, prefix) for spans in chunks]
+            try:
+                root = read_xml(p) if full_tree else _parse_skeleton(buf, blocks)
+                records: List[SectionRecord] = []
+                for fut in futures:
+                    records.extend(fut.result())
+                    checkpoint()
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+    return {"records": records, "root": root, "full_tree": full_tree}
+
+
+# ---------------- cached model ----------------
+_CACHE_SIZE = 2
+_CACHE: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_FROZEN = [0]  # > 0 while a tree carries temporary edits (switching overrides)
+
+
+@contextmanager
+def frozen_cache() -> Iterator[None]:
+    """
+    Serve cached section models but store none: records read from a tree with
+    temporary edits (e.g. switching overrides) must not outlive them. Build the
+    model before the edits so the writers still get cache hits.
+    """
+    with _CACHE_LOCK:
+        _FROZEN[0] += 1
+    try:
+        yield
+    finally:
+        with _CACHE_LOCK:
+            _FROZEN[0] -= 1
+
+
+def section_model(
+    path: str | Path,
+    *,
+    full_tree: bool = True,
+    use_cache: bool = True,
+    log: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """
+    {"records", "root", "full_tree"} of the model file, cached until the file changes (shared;
+    do not modify). Uses the parse workers (set_parse_workers) when the tree is
+    not parsed yet; `full_tree=False` lets that path skip the section contents
+    in "root" (model["full_tree"] False; a later full_tree call parses the full
+    tree and reuses the records). use_cache=False reads the current (possibly
+    modified) tree. Nothing is stored inside frozen_cache().
+    """
+    key = file_fingerprint(Path(path))
+    hit = None
+    if use_cache:
+        with _CACHE_LOCK:
+            hit = _CACHE.get(key)
+            if hit is not None:
+                _CACHE.move_to_end(key)
+        if hit is not None:
+            if hit["full_tree"] or not full_tree:
+                return hit
+            # cached by an analysis with the skeleton only: keep the records, parse the full tree
+            model = {"records": hit["records"], "root": read_xml(Path(path)), "full_tree": True}
+            with _CACHE_LOCK:
+                if not _FROZEN[0] and _CACHE.get(key) is hit:
+                    _CACHE[key] = model
+            return model
+
+    model = None
+    workers = parse_workers()
+    if use_cache and workers > 1 and not is_xml_cached(path) and parallel_ok(path):
+        try:
+            model = parse_sections_parallel(path, workers, full_tree=full_tree,
+                                            mp_context=_SETTINGS["mp_context"], log=log)
+        except ET.ParseError as e:
+            log(f"[Sections] Parallel parse not possible ({e}); parsing serially")
+    if model is None:
+        model = tree_model(read_xml(Path(path)))
+
+    if use_cache:
+        with _CACHE_LOCK:
+            if _FROZEN[0]:
+                return model
+            _CACHE[key] = model
+            _CACHE.move_to_end(key)
+            while len(_CACHE) > _CACHE_SIZE:
+                _CACHE.popitem(last=False)
+    return model
@@ -4,8 +4,9 @@ from pathlib import Path
 import re
 import xml.etree.ElementTree as ET
 from typing import List, Tuple
-from Modules.General import safe_name
+from Modules.General import safe_name, read_xml
 from Modules.IslandFilter import should_comment_branch, drop_mode_enabled
+from Modules.Blocks import column_runs, write_table
 
 PHASES = ("A", "B", "C")
 SUFFIX = {"A": "_a", "B": "_b", "C": "_c"}
@@ -105,7 +106,7 @@ def _rows_from_file(txt_path: Path) -> List[Tuple[str, str, str, int]]:
         then prefix '//' to the **From Bus** cell in that row.
       - The ID is never prefixed.
     """
-    root = ET.fromstring(txt_path.read_text(encoding="utf-8", errors="ignore"))
+    root = read_xml(txt_path)
     rows: List[Tuple[str, str, str, int]] = []
 
     # Active bus bases from Bus sheet (exclude commented rows). Use lazy import to avoid cycles.
@@ -220,11 +221,6 @@ def write_switch_sheet(xw, input_path: Path) -> None:
     ws.set_column(2, 2, 28)  # ID
     ws.set_column(3, 3, 8)   # Status
 
-    ws.write_row(0, 0, ["From Bus", "To Bus", "ID", "Status"], header)
-
     rows = _rows_from_file(input_path)
-    for r, (fb, tb, rid, status) in enumerate(rows, start=1):
-        ws.write(r, 0, fb)
-        ws.write(r, 1, tb)
-        ws.write(r, 2, rid)
-        ws.write_number(r, 3, status, int0)
+    write_table(ws, ["From Bus", "To Bus", "ID", "Status"], header, rows,
+                column_runs([None, None, None, int0]))
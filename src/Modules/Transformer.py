@@ -4,7 +4,9 @@ from pathlib import Path
 import re
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Tuple, Any, Optional
-from Modules.General import safe_name
+from Modules.General import safe_name, read_xml
+from Modules.EquipmentDB import equipment_index
+from Modules.Blocks import FIRST_BLOCK_ROW, column_runs, start_template_sheet, write_block, write_type_link
 from Modules.IslandFilter import should_comment_branch, should_drop_branch, drop_mode_enabled
 
 # ------------------------
@@ -111,30 +113,6 @@ def _bounds_from_ntaps(ntaps: Optional[float]) -> tuple[Optional[int], Optional[
     return -half, half
 
 
-# ------------------------
-# Read RegulatorDB (for modeling regulators as 1:1 transformers)
-# ------------------------
-def _read_regulator_db(root: ET.Element) -> Dict[str, Dict[str, Any]]:
-    out: Dict[str, Dict[str, Any]] = {}
-    for rdb in root.findall(".//RegulatorDB"):
-        eid = _t(rdb.findtext("EquipmentID"))
-        if not eid:
-            continue
-        rated_kvln = _f(rdb.findtext("RatedKVLN"))
-        rated_kva  = _f(rdb.findtext("RatedKVA")) or _f(rdb.findtext("FirstRatedKVA"))
-        maxreg = _f(rdb.findtext("MaximumBoost"))
-        minreg = _f(rdb.findtext("MaximumBuck"))
-        ntaps  = _f(rdb.findtext("NumberOfTaps"))
-        out[eid] = {
-            "kvln": rated_kvln,
-            "kva": rated_kva,
-            "ntaps": ntaps,
-            "minreg": minreg,
-            "maxreg": maxreg,
-        }
-    return out
-
-
 # ------------------------
 # Active bus discovery (from Bus sheet)
 # ------------------------
@@ -158,41 +136,6 @@ def _active_bus_bases_from_bus_sheet(input_path: Path) -> set[str]:
     return bases
 
 
-# ------------------------
-# Read TransformerDB
-# ------------------------
-def _read_transformer_db(root: ET.Element) -> Dict[str, Dict[str, Any]]:
-    """
-    TransformerDB block: key by EquipmentID.
-    We pick only what we actually need; anything not present stays None.
-    """
-    out: Dict[str, Dict[str, Any]] = {}
-    for tdb in root.findall(".//TransformerDB"):
-        eid = _t(tdb.findtext("EquipmentID"))
-        if not eid:
-            continue
-
-        kvp = _f(tdb.findtext("PrimaryVoltage")) or _f(tdb.findtext("PrimaryKV"))
-        kvs = _f(tdb.findtext("SecondaryVoltage")) or _f(tdb.findtext("SecondaryKV"))
-        kva = _f(tdb.findtext("NominalRatingKVA")) or _f(tdb.findtext("NominalRating"))
-        zpct = _f(tdb.findtext("PositiveSequenceImpedancePercent"))
-        xr   = _f(tdb.findtext("XRRatio"))
-        conn = _t(tdb.findtext("TransformerConnection") or tdb.findtext("Connection"))
-
-        # Pull LTC info from DB
-        ltc = tdb.find("./LoadTapChanger")
-        ntaps  = _f(ltc.findtext("NumberOfTaps")) if ltc is not None else None
-        minreg = _f(ltc.findtext("MinimumRegulationRange")) if ltc is not None else None
-        maxreg = _f(ltc.findtext("MaximumRegulationRange")) if ltc is not None else None
-
-        out[eid] = {
-            "kvp": kvp, "kvs": kvs, "kva": kva,
-            "z_pct": zpct, "xr": xr, "conn": conn,
-            "ntaps": ntaps, "minreg": minreg, "maxreg": maxreg,
-        }
-    return out
-
-
 # ------------------------
 # Parse sections â†’ rows
 # ------------------------
@@ -237,7 +180,7 @@ def _parse_multiphase_2w_rows(input_path: Path) -> List[List[Any]]:
     NEW: If either endpoint bus is NOT active on the Bus sheet, we prefix the
          transformer ID with '//' so the row is commented out (avoids dangling devices).
     """
-    root = ET.fromstring(input_path.read_text(encoding="utf-8", errors="ignore"))
+    root = read_xml(input_path)
     # Build island -> source primary per-unit (LN) map from EquivalentSource operating voltage
     from Modules.General import get_island_context
     ctx = get_island_context() or {}
@@ -271,8 +214,9 @@ def _parse_multiphase_2w_rows(input_path: Path) -> List[List[Any]]:
             vbase_ln = float(kvll) / math.sqrt(3.0)
             island_vpri_pu[isl] = float(v1) / vbase_ln
 
-    tdb = _read_transformer_db(root)
-    rdb = _read_regulator_db(root)
+    equipment = equipment_index(root)
+    tdb = equipment["transformer"]
+    rdb = equipment["regulator"]
 
     # Active bus bases from Bus sheet
     active_bases = _active_bus_bases_from_bus_sheet(input_path)
@@ -497,124 +441,48 @@ def write_transformer_sheet(xw, input_path: Path) -> None:
     Absolutely no hard-coded engineering values are inserted:
     if a datum is missing in the file/DB, the cell is left blank.
     """
-    wb = xw.book
-    ws = wb.add_worksheet("Transformer")
-    xw.sheets["Transformer"] = ws
-
-    # Formats
-    bold = wb.add_format({"bold": True})
-    link_fmt = wb.add_format({"font_color": "blue", "underline": 1})
-    notes_hdr = wb.add_format({"bold": True, "font_color": "yellow", "bg_color": "#595959", "align": "left"})
-    notes_txt = wb.add_format({"font_color": "yellow", "bg_color": "#595959"})
-    th   = wb.add_format({"bold": True, "bottom": 1})
-    f0   = wb.add_format({"num_format": "0"})
-    f2   = wb.add_format({"num_format": "0.00"})
-    f5   = wb.add_format({"num_format": "0.00000"})
-    f8   = wb.add_format({"num_format": "0.00000000"})
-
     # Column widths
     widths = [22, 8, 16, 12, 12, 12, 8, 12, 12, 12, 12, 12, 8, 12, 12,
               10, 10, 10, 12, 12, 14, 14, 10, 12, 12]
-    for c, w in enumerate(widths):
-        ws.set_column(c, c, w)
+    ws, fmts = start_template_sheet(xw, "Transformer", widths)
+    f0   = xw.book.add_format({"num_format": "0"})
+    f2   = xw.book.add_format({"num_format": "0.00"})
+    f5   = xw.book.add_format({"num_format": "0.00000"})
+    f8   = xw.book.add_format({"num_format": "0.00000000"})
 
     # Data
     rows_mp2w = _parse_multiphase_2w_rows(input_path)
 
-    # Anchors
-    r = 10
-    b1_t, b1_h, b1_e = r, r+1, r+2; r = b1_e + 2                # PosSeq 2W (empty)
-    b2_t, b2_h, b2_e = r, r+1, r+2; r = b2_e + 2                # PosSeq 3W (empty)
-    b3_t, b3_h, b3_first = r, r+1, r+2; b3_e = b3_first + len(rows_mp2w); r = b3_e + 2
-    b4_t, b4_h, b4_e = r, r+1, r+2                               # MP 2W with Mutual (empty)
-
-    # Top links + notes
-    ws.write(0, 0, "Type", bold)
-    ws.write_url(1, 0, f"internal:'Transformer'!A{b1_h+1}:K{b1_e+1}", link_fmt, "PositiveSeq2wXF")
-    ws.write_url(2, 0, f"internal:'Transformer'!A{b2_h+1}:S{b2_e+1}", link_fmt, "PositiveSeq3wXF")
-    ws.write_url(3, 0, f"internal:'Transformer'!A{b3_h+1}:Y{b3_e+1}", link_fmt, "Multiphase2wXF")
-    ws.write_url(4, 0, f"internal:'Transformer'!A{b4_h+1}:AA{b4_e+1}", link_fmt, "Multiphase2wXFMutual")
-
-    ws.merge_range(7, 0, 7, 7, "Important notes:", notes_hdr)
-    ws.merge_range(8, 0, 8, 7, "Default order of blocks and columns after row 11 must not change", notes_txt)
-    ws.merge_range(9, 0, 9, 7, "One empty row between End of each block and the next block is mandatory; otherwise, empty rows are NOT allowed", notes_txt)
-
-    go_top = "internal:'Transformer'!A1"
-
-    # ---- Block 1: Positive-Sequence 2W (empty) ----
-    ws.merge_range(b1_t, 0, b1_t, 2, "Positive-Sequence 2W-Transformer", bold)
-    ws.write_url(b1_t, 3, go_top, link_fmt, "Go to Type List")
-    ws.write_row(b1_h, 0, ["ID","Status","From bus","To bus","R (pu)","Xl (pu)","Gmag (pu)","Bmag (pu)","Ratio W1 (pu)","Ratio W2 (pu)","Phase Shift (deg)"], th)
-    ws.merge_range(b1_e, 0, b1_e, 2, "End of Positive-Sequence 2W-Transformer")
-
-    # ---- Block 2: Positive-Sequence 3W (empty) ----
-    ws.merge_range(b2_t, 0, b2_t, 2, "Positive-Sequence 3W-Transformer", bold)
-    ws.write_url(b2_t, 3, go_top, link_fmt, "Go to Type List")
-    ws.write_row(b2_h, 0, ["ID","Status","Bus1","Bus2","Bus3","R_12 (pu)","Xl_12 (pu)","R_23 (pu)","Xl_23 (pu)","R_31 (pu)","Xl_31 (pu)","Gmag (pu)","Bmag (pu)","Ratio W1 (pu)","Ratio W2 (pu)","Ratio W3 (pu)","Phase Shift W1 (deg)","Phase Shift W2 (deg)","Phase Shift W3 (deg)"], th)
-    ws.merge_range(b2_e, 0, b2_e, 2, "End of Positive-Sequence 3W-Transformer")
-
-    # ---- Block 3: Multiphase 2W (parsed) ----
-    ws.merge_range(b3_t, 0, b3_t, 2, "Multiphase 2W-Transformer", bold)
-    ws.write_url(b3_t, 3, go_top, link_fmt, "Go to Type List")
-    ws.write_row(
-        b3_h, 0,
-        ["ID","Status","Number of phases",
-         "Bus1","Bus2","Bus3","V (kV)","S_base (kVA)","Conn. type",
-         "Bus1","Bus2","Bus3","V (kV)","S_base (kVA)","Conn. type",
-         "Tap 1","Tap 2","Tap 3","Lowest Tap","Highest Tap","Min Range (%)","Max Range (%)",
-         "X (pu)","RW1 (pu)","RW2 (pu)"],
-        th
-    )
-
-    rr = b3_first
-    for row in rows_mp2w:
-        # helper to write optional numbers / text
-        def wnum(c, v, fmt):
-            if v is None or v == "":
-                ws.write(rr, c, "")
-            else:
-                ws.write_number(rr, c, v, fmt)
-
-        ws.write(rr, 0, row[0])                 # ID (may be prefixed with //)
-        wnum(1, row[1],  f0)                    # Status
-        wnum(2, row[2],  f0)                    # Number of phases
-
-        ws.write(rr, 3, row[3]); ws.write(rr, 4, row[4]); ws.write(rr, 5, row[5])
-        wnum(6,  row[6],  f2)                   # Vp
-        wnum(7,  row[7],  f2)                   # Sbase p
-        ws.write(rr, 8, row[8])                 # Conn p
-
-        ws.write(rr, 9, row[9]); ws.write(rr,10, row[10]); ws.write(rr,11, row[11])
-        wnum(12, row[12], f2)                   # Vs
-        wnum(13, row[13], f2)                   # Sbase s
-        ws.write(rr,14, row[14])                # Conn s
-
-        wnum(15, row[15], f2)                   # Tap1
-        wnum(16, row[16], f2)                   # Tap2
-        wnum(17, row[17], f2)                   # Tap3
-        wnum(18, row[18], f2)                   # Lowest tap
-        wnum(19, row[19], f2)                   # Highest tap
-        wnum(20, row[20], f2)                   # Min range (%)
-        wnum(21, row[21], f2)                   # Max range (%)
-
-        wnum(22, row[22], f5)                   # X (pu)
-        wnum(23, row[23], f8)                   # RW1 (pu)
-        wnum(24, row[24], f8)                   # RW2 (pu)
-
-        rr += 1
-
-    ws.merge_range(b3_e, 0, b3_e, 3, "End of Multiphase 2W-Transformer")
-
-    # ---- Block 4: Multiphase 2W with Mutual (template only) ----
-    ws.merge_range(b4_t, 0, b4_t, 2, "Multiphase 2W-Transformer with Mutual Impedance", bold)
-    ws.write_url(b4_t, 3, go_top, link_fmt, "Go to Type List")
-    ws.write_row(
-        b4_h, 0,
-            ["ID","Status","Number of phases",
-            "Bus1","Bus2","Bus3","V (kV)","S_base (kVA)","Conn. type",
-            "Bus1","Bus2","Bus3","V (kV)","S_base (kVA)","Conn. type",
-            "Tap 1","Tap 2","Tap 3","Lowest Tap","Highest Tap","Min Range (%)","Max Range (%)",
-            "Z0 leakage (pu)","Z1 leakage (pu)","X0/R0","X1/R1","No Load Loss (kW)"],
-        th
-    )
-    ws.merge_range(b4_e, 0, b4_e, 3, "End of Multiphase 2W-Transformer with Mutual Impedance")
+    # Block 3 columns: every number is optional (missing datum -> blank cell)
+    mp2w_fmts = ([None, f0, f0]                       # ID (may be prefixed with //), Status, Number of phases
+                 + [None] * 3 + [f2, f2, None]        # primary buses, V, S_base, Conn
+                 + [None] * 3 + [f2, f2, None]        # secondary buses, V, S_base, Conn
+                 + [f2] * 7                           # taps, lowest/highest tap, min/max range
+                 + [f5, f8, f8])                      # X, RW1, RW2
+    mp2w_runs = column_runs(mp2w_fmts, optional=[c for c, f in enumerate(mp2w_fmts) if f is not None])
+
+    mp_hdr = ["ID","Status","Number of phases",
+              "Bus1","Bus2","Bus3","V (kV)","S_base (kVA)","Conn. type",
+              "Bus1","Bus2","Bus3","V (kV)","S_base (kVA)","Conn. type",
+              "Tap 1","Tap 2","Tap 3","Lowest Tap","Highest Tap","Min Range (%)","Max Range (%)"]
+
+    r = FIRST_BLOCK_ROW
+    b1 = write_block(ws, fmts, "Transformer", r, "Positive-Sequence 2W-Transformer",
+                     ["ID","Status","From bus","To bus","R (pu)","Xl (pu)","Gmag (pu)","Bmag (pu)","Ratio W1 (pu)","Ratio W2 (pu)","Phase Shift (deg)"],
+                     title_to=2, end_to=2)
+    b2 = write_block(ws, fmts, "Transformer", b1["next"], "Positive-Sequence 3W-Transformer",
+                     ["ID","Status","Bus1","Bus2","Bus3","R_12 (pu)","Xl_12 (pu)","R_23 (pu)","Xl_23 (pu)","R_31 (pu)","Xl_31 (pu)","Gmag (pu)","Bmag (pu)","Ratio W1 (pu)","Ratio W2 (pu)","Ratio W3 (pu)","Phase Shift W1 (deg)","Phase Shift W2 (deg)","Phase Shift W3 (deg)"],
+                     title_to=2, end_to=2)
+    b3 = write_block(ws, fmts, "Transformer", b2["next"], "Multiphase 2W-Transformer",
+                     mp_hdr + ["X (pu)","RW1 (pu)","RW2 (pu)"],
+                     rows_mp2w, mp2w_runs, title_to=2, end_to=3)
+    # Block 4: Multiphase 2W with Mutual (template only)
+    b4 = write_block(ws, fmts, "Transformer", b3["next"], "Multiphase 2W-Transformer with Mutual Impedance",
+                     mp_hdr + ["Z0 leakage (pu)","Z1 leakage (pu)","X0/R0","X1/R1","No Load Loss (kW)"],
+                     title_to=2, end_to=3)
+
+    # Top links
+    write_type_link(ws, fmts, "Transformer", 1, 0, "PositiveSeq2wXF", b1, "K")
+    write_type_link(ws, fmts, "Transformer", 2, 0, "PositiveSeq3wXF", b2, "S")
+    write_type_link(ws, fmts, "Transformer", 3, 0, "Multiphase2wXF", b3, "Y")
+    write_type_link(ws, fmts, "Transformer", 4, 0, "Multiphase2wXFMutual", b4, "AA")
@@ -5,7 +5,7 @@ import xml.etree.ElementTree as ET
 from typing import List, Dict, Any, Optional
 import re
 from Modules.IslandFilter import should_comment_branch, drop_mode_enabled
-from Modules.General import safe_name
+from Modules.General import safe_name, read_xml
 
 # --- helpers to see which buses are actually active on the Bus sheet ---
 _PHASE_SUFFIX_RE = re.compile(r"_(a|b|c)$")
@@ -108,7 +108,7 @@ def _pick_sc_capacities(eq: ET.Element | None, src: ET.Element) -> Optional[Dict
     return {"SC1ph": v, "SC3ph": v}
 
 
-def _gather_sources(root: ET.Element) -> List[ET.Element]:
+def _preferred_sources(scope: ET.Element) -> List[ET.Element]:
     """
     Prefer sources under Topo blocks whose NetworkType == 'Substation'.
     Ignore Topo blocks that are Feeders (and those with EquivalentMode == 1).
@@ -116,7 +116,7 @@ def _gather_sources(root: ET.Element) -> List[ET.Element]:
     """
     picked: List[ET.Element] = []
 
-    topo_nodes = root.findall(".//Topo")
+    topo_nodes = scope.findall(".//Topo")
     for topo in topo_nodes:
         ntype = (topo.findtext("NetworkType") or "").strip().lower()
         eq_mode = (topo.findtext("EquivalentMode") or "").strip()
@@ -132,7 +132,23 @@ def _gather_sources(root: ET.Element) -> List[ET.Element]:
     if picked:
         return picked
 
-    return root.findall(".//Sources/Source")
+    return scope.findall(".//Sources/Source")
+
+
+def _gather_sources(root: ET.Element) -> List[ET.Element]:
+    """
+    Sources of every <Network>, the Substation preference applied per network:
+    a merged model (Modules.Merge) keeps each export's sources even when only
+    some exports have a Substation topo. Files without <Network> elements are
+    scanned as a whole.
+    """
+    networks = list(root.iter("Network"))
+    if not networks:
+        return _preferred_sources(root)
+    picked: List[ET.Element] = []
+    for net in networks:
+        picked.extend(_preferred_sources(net))
+    return picked
 
 
 def _parse_voltage_sources(path: Path) -> tuple[list[dict], list[dict]]:
@@ -146,8 +162,7 @@ def _parse_voltage_sources(path: Path) -> tuple[list[dict], list[dict]]:
     - If the source bus base is NOT active on the Bus sheet, we prefix the ID with '//'
       so the row is commented out (keeps file consistent and avoids dangling sources).
     """
-    txt = path.read_text(encoding="utf-8", errors="ignore")
-    root = ET.fromstring(txt)
+    root = read_xml(path)
 
     active_bus_bases = _active_bus_bases_from_bus_sheet(path)
 
@@ -0,0 +1,38 @@
+# Modules/Workbook.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict
+
+# Minimal stand-in for pandas.ExcelWriter(engine="xlsxwriter").
+# The sheet writers only use `xw.book` (an xlsxwriter Workbook) and the
+# `xw.sheets` dict, so pandas (and numpy behind it) is not needed to export.
+
+
+class WorkbookWriter:
+    """
+    with WorkbookWriter(out_path) as xw:
+        write_bus_sheet(xw, in_path)
+
+    Like pandas.ExcelWriter, the target file is opened on construction, so a
+    workbook locked by Excel raises PermissionError up front (not at close).
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        import xlsxwriter  # lazy: keeps module import cheap
+
+        self.path = Path(path)
+        self._handle = open(self.path, "wb")
+        self.book = xlsxwriter.Workbook(self._handle)
+        self.sheets: Dict[str, Any] = {}
+
+    def close(self) -> None:
+        try:
+            self.book.close()
+        finally:
+            self._handle.close()
+
+    def __enter__(self) -> "WorkbookWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
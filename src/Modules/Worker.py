@@ -0,0 +1,547 @@
+# Modules/Worker.py
+from __future__ import annotations
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple
+
+from Modules.General import (
+    input_stem, pinned_sources, set_island_context, set_export_options, read_xml, read_xml_cache_info,
+)
+from Modules.IslandChecker import (
+    analyze_and_set_island_context,
+    select_island_context,
+    sourceful_islands_context,
+)
+from Modules.Jobs import JobCancelled, checkpoint
+
+# Warm extraction worker.
+#
+# ExtractionService holds the warm state (parsed trees via the read_xml LRU and
+# island analyses via the IslandChecker LRU) and runs analyze / export / map
+# jobs. The GUI calls it in-process; `python main.py --serve` exposes the same
+# methods as line-delimited JSON-RPC over stdin/stdout or a localhost TCP port
+# so repeated CLI runs on the same feeders skip startup, parse and analysis.
+#
+#   request : {"id": 1, "method": "export", "params": {"path": "...", "out": "..."}}
+#   response: {"id": 1, "result": {...}}   or   {"id": 1, "error": "..."}
+#
+# The TCP worker writes files as its user, so a connection must first present
+# the worker's token: {"token": "..."} -> {"result": "ok"}. The token is random
+# per worker start and stored in token_path(port), readable by the owner only
+# (other local users cannot connect). stdio needs no token.
+
+DEFAULT_PORT = 8765
+
+
+def sheet_writers() -> List[Tuple[str, Callable[[Any, Path], None]]]:
+    """(sheet name, writer) in workbook order. Imported lazily to keep startup light."""
+    from Modules.General import write_general_sheet
+    from Modules.Pins import write_pins_sheet
+    from Modules.Bus import write_bus_sheet
+    from Modules.Voltage_Source import write_voltage_source_sheet
+    from Modules.Load import write_load_sheet
+    from Modules.Line import write_line_sheet
+    from Modules.Transformer import write_transformer_sheet
+    from Modules.Switch import write_switch_sheet
+    from Modules.Shunt import write_shunt_sheet
+    return [
+        ("General",        write_general_sheet),
+        ("Pins",           write_pins_sheet),
+        ("Bus",            write_bus_sheet),
+        ("Voltage Source", write_voltage_source_sheet),
+        ("Load",           write_load_sheet),
+        ("Line",           write_line_sheet),
+        ("Transformer",    write_transformer_sheet),
+        ("Switch",         write_switch_sheet),
+        ("Shunt",          write_shunt_sheet),
+    ]
+
+
+def _noop_log(msg: str) -> None:
+    pass
+
+
+class ExtractionService:
+    """
+    Jobs share the process-wide island context, so they run one at a time.
+    `log(msg)` / `progress(percent)` callbacks are optional (GUI passes them).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+
+    # ---- analyze ----
+    def analyze(
+        self,
+        path: str | Path,
+        *,
+        island: Optional[int] = None,
+        only_sourceful: bool = False,
+        progress: Optional[Callable[[int, str], None]] = None,
+    ) -> dict:
+        """
+        Island analysis of the model. The island context left for the UI is the
+        full analysis, narrowed like an export's scope when `island` is given
+        (select_island_context) or with only_sourceful (sourceful_islands_context).
+        The summary always covers every island.
+        """
+        with self._lock:
+            ctx = analyze_and_set_island_context(Path(path), per_island_limit=50, progress=progress, full_tree=False)
+            if island is not None:
+                set_island_context(select_island_context(ctx, int(island)))
+            elif only_sourceful:
+                set_island_context(sourceful_islands_context(ctx))
+        islands = ctx.get("islands", {})
+        slack = ctx.get("slack_per_island", {})
+        return {
+            "count": len(islands),
+            "nodes_total": len(ctx.get("bus_to_island", {})),
+            "islands": [
+                {"index": i, "size": len(islands[i]), "has_source": i in ctx.get("sourceful_islands", set()),
+                 "slack": slack.get(i, "")}
+                for i in sorted(islands)
+            ],
+        }
+
+    # ---- export ----
+    def export(
+        self,
+        path: str | Path,
+        out: str | Path,
+        *,
+        sheets: Optional[List[str]] = None,
+        island: Optional[int] = None,
+        only_sourceful: bool = True,
+        prune_mode: str = "comment",
+        options: Optional[dict] = None,
+        profiles: Optional[dict] = None,
+        switching: Optional[List[dict]] = None,
+        log: Callable[[str], None] = _noop_log,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> dict:
+        """
+        Write the workbook. `sheets` is a list of sheet names (None = all);
+        `island` limits the export to one island; otherwise only islands with
+        sources are kept (GUI), or every island when only_sourceful=False (CLI).
+        `options` are the writers' export options (General.set_export_options),
+        e.g. {"line_model": "sequential"}; omitted keys take their defaults.
+        `profiles` = {"csv": ..., "out": ..., "format": "auto"|"npy"|"parquet"}
+        also writes the load time series for the same scope (Modules.Profiles).
+        `switching` is a list of device-state overrides (Modules.Scenarios)
+        applied to the parsed model for this export only.
+        If `out` is locked (open in Excel) a timestamped sibling is written instead.
+        Returns {"output": path written, "elapsed": seconds, "sheets": [...]}.
+        """
+        from Modules.Workbook import WorkbookWriter
+
+        t0 = time.perf_counter()
+        in_path = Path(path)
+        out_path = Path(out)
+        wanted = None if sheets is None else set(sheets)
+        steps = [(name, fn) for name, fn in sheet_writers() if wanted is None or name in wanted]
+        total = len(steps) + 1
+
+        def _progress(done: float) -> None:
+            if progress is not None:
+                progress(int(done / total * 100))
+
+        if profiles:
+            from Modules.Profiles import profile_format
+            profile_format(profiles.get("format", "auto"))  # fail before writing anything
+
+        with self._lock, ExitStack() as stack:
+            # Switching overrides live in the cached tree only for this export.
+            # Section records (closed states) are cached from the unmodified tree
+            # first, and nothing read from the modified one is cached.
+            undo = None
+            if switching:
+                from Modules.Scenarios import apply_switching
+                from Modules.SectionRecords import frozen_cache, section_model
+                section_model(in_path, log=log)
+                stack.enter_context(frozen_cache())
+                log(f"Applying {len(switching)} switching override(s)")
+                undo = apply_switching(read_xml(in_path), switching)
+            try:
+                set_export_options(options)
+                log("Analyzing islands")
+                ctx = analyze_and_set_island_context(
+                    in_path, per_island_limit=50,
+                    use_cache=not switching, store=not switching,
+                    progress=lambda pct, msg: (log(f" - {msg}"), _progress(pct / 100.0)),
+                )
+                # Decide export scope now (UI click does NOT prune; we prune only at run time)
+                if island is not None:
+                    log(f" - Export scope: only island {island}")
+                    ctx = select_island_context(ctx, int(island))
+                elif only_sourceful:
+                    log(" - No island selected. Keeping islands with voltage sources; excluding islands without sources")
+                    ctx = sourceful_islands_context(ctx)
+                ctx["prune_mode"] = "remove" if str(prune_mode).strip().lower().startswith("remove") else "comment"
+                set_island_context(ctx)
+                _progress(1)
+
+                log(f"Writing workbook - {out_path}")
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                opened_path = out_path
+                try:
+                    writer = WorkbookWriter(out_path)
+                except PermissionError:
+                    from datetime import datetime
+                    alt = out_path.with_name(f"{out_path.stem}__{datetime.now().strftime('%Y%m%d_%H%M%S')}{out_path.suffix}")
+                    opened_path = alt
+                    log(f" ! Output file is in use. Writing to new file: {alt}")
+                    writer = WorkbookWriter(alt)
+                try:
+                    with writer as xw:
+                        for k, (name, fn) in enumerate(steps, start=2):
+                            checkpoint()
+                            log(f"  - {name}")
+                            fn(xw, in_path)
+                            _progress(k)
+                except JobCancelled:
+                    # Writer was closed by the context manager; drop the partial workbook
+                    try:
+                        opened_path.unlink(missing_ok=True)
+                    except Exception:
+                        pass
+                    raise
+
+                manifest = None
+                if profiles:
+                    from Modules.Profiles import export_profiles
+                    log(f"Writing load profiles - {profiles['out']}")
+                    manifest = export_profiles(in_path, profiles["csv"], profiles["out"],
+                                               fmt=profiles.get("format", "auto"), log=log)
+            finally:
+                if undo is not None:
+                    from Modules.Scenarios import restore_switching
+                    restore_switching(undo)
+
+        log(f"Export complete: {opened_path}")
+        result = {
+            "output": str(opened_path),
+            "elapsed": round(time.perf_counter() - t0, 3),
+            "sheets": [name for name, _ in steps],
+        }
+        if manifest is not None:
+            result["profiles"] = {k: manifest[k] for k in ("format", "steps", "files")}
+            result["profiles"]["columns"] = len(manifest["columns"])
+        return result
+
+    def export_island(self, path: str | Path, out: str | Path, island: int, **kw: Any) -> dict:
+        return self.export(path, out, island=island, **kw)
+
+    def export_partitions(
+        self,
+        path: str | Path,
+        out_dir: str | Path,
+        *,
+        workers: Optional[int] = None,
+        mp_context: Optional[str] = None,
+        log: Callable[[str], None] = _noop_log,
+        **kw: Any,
+    ) -> List[dict]:
+        """
+        One workbook per sourceful island (<model>__island<k>.xlsx in `out_dir`),
+        exported by export_batch from one parse and one island analysis. `kw` are
+        export arguments (sheets, prune_mode, options, ...). Returns the results in
+        island order, each with its "island" index and "slack" bus.
+        """
+        in_path = Path(path).resolve()
+        with self._lock:
+            ctx = analyze_and_set_island_context(in_path, per_island_limit=50)
+        keep = sourceful_islands_context(ctx)
+        parts = sorted(i for i, buses in keep["islands"].items() if buses and not buses & keep["bad_buses"])
+        if not parts:
+            raise ValueError(f"{in_path.name}: no island with a voltage source to export")
+
+        slack = ctx.get("slack_per_island", {})
+        out_root = Path(out_dir)
+        jobs = [(f"island {i}", str(out_root / f"{input_stem(in_path)}__island{i}.xlsx"), dict(kw, island=i))
+                for i in parts]
+        results = export_batch(in_path, jobs, workers=workers, mp_context=mp_context, log=log, service=self)
+        return [dict(res, island=i, slack=slack.get(i, "")) for i, res in zip(parts, results)]
+
+    # ---- merge ----
+    def merge(self, paths: List[str], *, log: Callable[[str], None] = _noop_log) -> dict:
+        """
+        Merge several exports into one model (Modules.Merge) kept in this process;
+        export / analyze its returned "path" like a file. Returns the merge report.
+        """
+        from Modules.Merge import merge_exports
+
+        with self._lock:
+            return merge_exports(paths, log=log)
+
+    # ---- map ----
+    def map_data(self, path: str | Path, island: int) -> dict:
+        from Modules.IslandMap import compute_island_map_data
+
+        with self._lock:
+            ctx = analyze_and_set_island_context(Path(path), per_island_limit=50)
+        return compute_island_map_data(int(island), dict(ctx.get("bus_to_island", {})), Path(path))
+
+    # ---- pins ----
+    def pin_buses(self, path: str | Path, rules: Any = None) -> dict:
+        """Voltage-pin buses of the whole model for `rules` (PinSelection), without writing a workbook."""
+        from Modules.Pins import pin_model
+        from Modules.PinSelection import parse_rules, select_buses
+
+        t0 = time.perf_counter()
+        with self._lock:
+            buses = select_buses(pin_model(Path(path)), parse_rules(rules))
+        return {"count": len(buses), "buses": sorted(buses), "elapsed": round(time.perf_counter() - t0, 3)}
+
+    def stats(self) -> dict:
+        from Modules import IslandChecker
+        return {"parsed_models": read_xml_cache_info(), "analyses": len(IslandChecker._ANALYSIS_CACHE)}
+
+
+# ---------------- batch export (process pool) ----------------
+# Several workbooks of one model (switching scenarios, island partitions). Each
+# pool process keeps one ExtractionService; with the "fork" start method the
+# workers inherit the parent's parsed tree and island analysis, so the model is
+# parsed once per run, otherwise once per worker. Every worker derives its own
+# island context (export(island=...) / switching) from the shared analysis.
+_POOL_SERVICE: Optional[ExtractionService] = None  # per worker process
+
+
+def _pool_init(path: str, sources: Optional[List[str]] = None) -> None:
+    """
+    Worker process start: one warm service and one parse of the model. A merged
+    model (`sources` given) is rebuilt from its inputs unless it was inherited.
+    """
+    global _POOL_SERVICE
+    from Modules.SectionRecords import set_parse_workers
+    set_parse_workers(1)  # pool processes are daemonic: no nested pools
+    _POOL_SERVICE = ExtractionService()
+    if sources and pinned_sources(path) is None:
+        from Modules.Merge import merge_exports
+        merge_exports(sources, log=_noop_log)
+    read_xml(Path(path))
+
+
+def _pool_export(path: str, out: str, kw: Dict[str, Any]) -> dict:
+    if _POOL_SERVICE is None:
+        _pool_init(path)
+    return _POOL_SERVICE.export(path, out, **kw)
+
+
+def export_batch(
+    path: str | Path,
+    jobs: List[Tuple[str, str, Dict[str, Any]]],
+    *,
+    workers: Optional[int] = None,
+    mp_context: Optional[str] = None,
+    log: Callable[[str], None] = print,
+    service: Optional[ExtractionService] = None,
+) -> List[dict]:
+    """
+    Run (label, output, export kwargs) jobs on one model. workers > 1 runs them
+    in a process pool (default: one per CPU, at most one per job); workers=1 runs
+    them here, on `service` when given. `mp_context` names the multiprocessing
+    start method (None = platform default; the GUI uses "spawn"). Returns the
+    export results in job order.
+    """
+    in_path = str(Path(path).resolve())
+    outs = [out for _label, out, _kw in jobs]
+    if len(set(outs)) != len(outs):
+        raise ValueError("batch outputs must be unique")
+    for out in outs:
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+
+    n = workers if workers is not None else min(len(jobs), os.cpu_count() or 1)
+    n = max(1, min(n, len(jobs) or 1))
+    log(f"[Batch] {len(jobs)} workbook(s) of {Path(in_path).name} with {n} process(es)")
+
+    results: List[dict] = []
+    if n == 1:
+        svc = service or ExtractionService()
+        for label, out, kw in jobs:
+            checkpoint()
+            res = svc.export(in_path, out, **kw)
+            log(f" - {label}: {res['output']}")
+            results.append(res)
+        return results
+
+    ctx = multiprocessing.get_context(mp_context)
+    if ctx.get_start_method() == "fork":
+        read_xml(Path(in_path))  # parse once here; forked workers inherit it
+    with ProcessPoolExecutor(max_workers=n, mp_context=ctx, initializer=_pool_init,
+                             initargs=(in_path, pinned_sources(in_path))) as pool:
+        futures = [pool.submit(_pool_export, in_path, out, kw) for _label, out, kw in jobs]
+        try:
+            for (label, _out, _kw), fut in zip(jobs, futures):
+                res = fut.result()
+                log(f" - {label}: {res['output']}")
+                results.append(res)
+                checkpoint()
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return results
+
+
+# ---------------- JSON-RPC server ----------------
+_METHODS = ("analyze", "export", "export_island", "export_partitions", "merge", "map_data", "pin_buses", "stats")
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, (set, frozenset)):
+        return sorted(o)
+    if isinstance(o, Path):
+        return str(o)
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+
+def handle_request(service: ExtractionService, line: str) -> Optional[str]:
+    """One request line -> one response line (None for blank input)."""
+    line = line.strip()
+    if not line:
+        return None
+    req_id = None
+    try:
+        req = json.loads(line)
+        req_id = req.get("id")
+        method = str(req.get("method", ""))
+        params = dict(req.get("params") or {})
+        if method == "ping":
+            result: Any = "pong"
+        elif method in _METHODS:
+            result = getattr(service, method)(**params)
+        else:
+            raise ValueError(f"unknown method: {method!r}")
+        return json.dumps({"id": req_id, "result": result}, default=_json_default)
+    except Exception as e:
+        return json.dumps({"id": req_id, "error": f"{type(e).__name__}: {e}"})
+
+
+def serve_stdio(service: Optional[ExtractionService] = None) -> None:
+    """Serve requests from stdin. Console output from the writers goes to stderr."""
+    import contextlib
+
+    service = service or ExtractionService()
+    out: IO[str] = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for line in sys.stdin:
+            resp = handle_request(service, line)
+            if resp is not None:
+                out.write(resp + "\n")
+                out.flush()
+
+
+def token_path(port: int = DEFAULT_PORT) -> Path:
+    """File holding the token of the TCP worker on `port` (owner-only)."""
+    return Path.home() / ".cyme_extract" / f"worker-{int(port)}.token"
+
+
+def _write_token(port: int) -> str:
+    import secrets
+
+    token = secrets.token_hex(32)
+    path = token_path(port)
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as fh:
+        fh.write(token)
+    return token
+
+
+def _check_token(line: str, token: str) -> bool:
+    import hmac
+
+    try:
+        given = json.loads(line).get("token")
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(given, str) and hmac.compare_digest(given.encode("utf-8"), token.encode("ascii"))
+
+
+def serve_tcp(port: int = DEFAULT_PORT, service: Optional[ExtractionService] = None) -> None:
+    """
+    Serve on 127.0.0.1:<port> (local clients only), one request per line. Each
+    connection starts with the token from token_path(port); others are refused.
+    """
+    import socketserver
+
+    service = service or ExtractionService()
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def _send(self, resp: str) -> None:
+            self.wfile.write((resp + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+        def handle(self) -> None:
+            first = self.rfile.readline().decode("utf-8", errors="ignore")
+            if not _check_token(first, token):
+                self._send(json.dumps({"id": None, "error": "PermissionError: invalid worker token"}))
+                return
+            self._send(json.dumps({"id": None, "result": "ok"}))
+            for raw in self.rfile:
+                resp = handle_request(service, raw.decode("utf-8", errors="ignore"))
+                if resp is not None:
+                    self._send(resp)
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer(("127.0.0.1", int(port)), _Handler) as srv:
+        token = _write_token(port)
+        print(f"[Worker] Listening on 127.0.0.1:{port} (token in {token_path(port)})", file=sys.stderr)
+        try:
+            srv.serve_forever()
+        finally:
+            token_path(port).unlink(missing_ok=True)
+
+
+class WorkerClient:
+    """
+    Thin client for serve_tcp. Raises OSError when no worker is listening (or
+    its token file is missing) and PermissionError when the token is refused.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, timeout: float | None = None) -> None:
+        import socket
+
+        token = token_path(port).read_text(encoding="ascii").strip()
+        self._sock = socket.create_connection(("127.0.0.1", int(port)), timeout=timeout)
+        self._file = self._sock.makefile("rwb")
+        self._next_id = 0
+        try:
+            self._file.write((json.dumps({"token": token}) + "\n").encode("utf-8"))
+            self._file.flush()
+            resp = json.loads(self._file.readline().decode("utf-8") or "{}")
+        except BaseException:
+            self.close()
+            raise
+        if resp.get("result") != "ok":
+            self.close()
+            raise PermissionError(resp.get("error") or f"worker on port {port} refused the token")
+
+    def call(self, method: str, **params: Any) -> Any:
+        self._next_id += 1
+        req = json.dumps({"id": self._next_id, "method": method, "params": params}, default=_json_default)
+        self._file.write((req + "\n").encode("utf-8"))
+        self._file.flush()
+        resp = json.loads(self._file.readline().decode("utf-8"))
+        if "error" in resp:
+            raise RuntimeError(resp["error"])
+        return resp.get("result")
+
+    def close(self) -> None:
+        try:
+            self._file.close()
+        finally:
+            self._sock.close()
+
+    def __enter__(self) -> "WorkerClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -1,5 +1,7 @@
 ﻿# src/app_tk.py  - Premium UI + Island workflow (click row to activate)
 from __future__ import annotations
+import time
+_T_START = time.perf_counter()  # cold-start reference (see STARTUP_BUDGET_S)
 import os, sys, json, threading, queue, traceback, platform, subprocess
 from pathlib import Path
 import tkinter as tk
@@ -7,7 +9,6 @@ from tkinter import filedialog, messagebox, ttk
 from typing import Any, Callable, TYPE_CHECKING, cast
 
 import customtkinter as ctk
-import pandas as pd
 
 # ----- Project setup ----------------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent
@@ -26,20 +27,15 @@ def resource_path(*parts: str) -> Path:
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
-# Pipeline pieces
-from Modules.IslandChecker import analyze_and_set_island_context
-from Modules.General import write_general_sheet, get_island_context
-from Modules.Pins import write_pins_sheet
-from Modules.Bus import write_bus_sheet
-from Modules.Voltage_Source import write_voltage_source_sheet
-from Modules.Load import write_load_sheet
-from Modules.Line import write_line_sheet
-from Modules.Transformer import write_transformer_sheet
-from Modules.Switch import write_switch_sheet
-from Modules.Shunt import write_shunt_sheet
+# Pipeline pieces (sheet writers and xlsxwriter are imported on first export)
+from Modules.General import describe_file, get_island_context, read_xml
+from Modules.Jobs import JobScheduler, JobCancelled
+from Modules.Worker import ExtractionService
 
 APP_NAME = "CYME ? XLSX Extractor"
 CONF_PATH = Path.home() / ".cyme_extractor_gui.json"
+# Cold start (process start -> first idle window) budget; exceeding it is logged
+STARTUP_BUDGET_S = 2.0
 
 DEFAULT_SHEETS = {
     "General": True,
@@ -55,93 +51,6 @@ DEFAULT_SHEETS = {
 
 # ----- Utilities --------------------------------------------------------------
 
-def _filter_context_to_island(self, active_island: int):
-    """Keep only the selected island in context (used right before writing)."""
-    ctx = get_island_context() or {}
-    bus_to_island: dict[str, int] = dict(ctx.get("bus_to_island", {}))
-    slack_per_island: dict[int, str] = dict(ctx.get("slack_per_island", {}))
-    bad_buses_existing: set[str] = set(ctx.get("bad_buses", set()))
-
-    # everything not in the chosen island gets marked bad
-    bad_buses_new = {b for b, isl in bus_to_island.items() if isl != active_island}
-
-    new_ctx = {
-        "bus_to_island": {b: i for b, i in bus_to_island.items() if i == active_island},
-        "slack_per_island": {active_island: slack_per_island.get(active_island, "")},
-        "bad_buses": set(bad_buses_existing) | set(bad_buses_new),
-    }
-
-    import Modules.General as G  # type: ignore
-    if hasattr(G, "set_island_context"):
-        G.set_island_context(new_ctx)  # type: ignore[attr-defined]
-    elif hasattr(G, "_ISLAND_CONTEXT"):
-        setattr(G, "_ISLAND_CONTEXT", new_ctx)  # type: ignore[attr-defined]
-    elif hasattr(G, "ISLAND_CONTEXT"):
-        setattr(G, "ISLAND_CONTEXT", new_ctx)  # type: ignore[attr-defined]
-    else:
-        def _fake_get_island_context():
-            return new_ctx
-        G.get_island_context = _fake_get_island_context  # type: ignore[assignment]
-
-
-def _keep_sourceful_islands_context(self, in_path: Path):
-    """
-    No active selection:
-    - Keep ALL islands in context for UI.
-    - Mark ONLY the islands that do not contain a Substation/VS-page source as bad.
-    """
-    from Modules.General import get_island_context, set_island_context, safe_name
-    import xml.etree.ElementTree as ET
-
-    ctx = get_island_context() or {}
-    islands: dict[int, set[str]] = dict(ctx.get("islands", {}))
-    bus_to_island: dict[str, int] = dict(ctx.get("bus_to_island", {}))
-    slack_per_island: dict[int, str] = dict(ctx.get("slack_per_island", {}))
-
-    # If the IslandChecker didn't include "islands", synthesize from bus_to_island.
-    if not islands and bus_to_island:
-        for b, isl in bus_to_island.items():
-            islands.setdefault(isl, set()).add(b)
-
-    # --- Find real Voltage Source page buses from the input file ---
-    try:
-        root = ET.fromstring(Path(in_path).read_text(encoding="utf-8", errors="ignore"))
-    except Exception:
-        root = ET.Element("Empty")
-
-    vs_nodes: set[str] = set()
-    for topo in root.findall(".//Topo"):
-        ntype = (topo.findtext("NetworkType") or "").strip().lower()
-        eq_mode = (topo.findtext("EquivalentMode") or "").strip()
-        if ntype != "substation" or eq_mode == "1":
-            continue
-        srcs = topo.find("./Sources")
-        if srcs is None:
-            continue
-        for src in srcs.findall("./Source"):
-            nid = safe_name(src.findtext("SourceNodeID") or "")
-            if nid:
-                vs_nodes.add(nid)
-
-    # Islands that intersect VS-page nodes are sourceful (good)
-    sourceful_islands = {i for i, buses in islands.items() if any(b in vs_nodes for b in buses)}
-    bad_islands = set(islands.keys()) - sourceful_islands
-
-    # Keep full mapping for the UI
-    full_bus_to_island = {b: i for i, buses in islands.items() for b in buses}
-    bad_buses = set().union(*(islands[i] for i in bad_islands)) if islands else set()
-
-    # Preserve slacks if they exist; we don't rely on them for "good" anymore
-    new_ctx = {
-        "bus_to_island": full_bus_to_island,
-        "slack_per_island": slack_per_island,
-        "bad_buses": bad_buses,
-        "islands": islands,
-    }
-    set_island_context(new_ctx)
-
-
-
 def load_conf() -> dict:
     try:
         return json.loads(CONF_PATH.read_text())
@@ -217,18 +126,20 @@ def ensure_brand_assets() -> None:
       - icons/cyme_logo.ico
     The design: pastel ring, inner disc, clean bolt, drawn at high res and downsampled.
     """
+    icons_dir = resource_path("icons")
+    out_light = icons_dir / "cyme_logo_light.png"
+    out_dark = icons_dir / "cyme_logo_dark.png"
+    out_ico = icons_dir / "cyme_logo.ico"
+    if out_light.exists() and out_dark.exists() and out_ico.exists():
+        return  # normal case: skip importing the PIL drawing modules at startup
+
     try:
         from PIL import Image, ImageDraw, ImageFilter  # type: ignore
     except Exception:
         return
 
-    icons_dir = resource_path("icons")
     icons_dir.mkdir(parents=True, exist_ok=True)
 
-    out_light = icons_dir / "cyme_logo_light.png"
-    out_dark = icons_dir / "cyme_logo_dark.png"
-    out_ico = icons_dir / "cyme_logo.ico"
-
     def make_variant(mode: str, path: Path) -> Image.Image:
         W = 1024
         img = Image.new("RGBA", (W, W), (0, 0, 0, 0))
@@ -401,6 +312,8 @@ class App(ctk.CTk):
 
         # state
         self.events: "queue.Queue[tuple[str, Any]]" = queue.Queue()
+        self.jobs = JobScheduler()  # one active background job per kind: "map", "island", "export", "summary"
+        self.service = ExtractionService()  # warm state (parsed models, island analyses) shared by jobs
         self.in_path = tk.StringVar(value=conf.get("last_input", ""))
         self.out_path = tk.StringVar(value=conf.get("last_output", str(Path.cwd() / "CYME_Extract.xlsx")))
         self.sheet_vars: dict[str, tk.BooleanVar] = {name: tk.BooleanVar(value=DEFAULT_SHEETS[name]) for name in DEFAULT_SHEETS}
@@ -535,6 +448,14 @@ class App(ctk.CTk):
                       fg_color="#EEF2FF", hover_color="#E0E7FF", text_color=self.COL["ACCENT"],
                       font=(self.UI_FONT, self.UI_SIZE), height=38, corner_radius=10).pack(side="left", padx=(0, 4))
 
+        # file summary (header scan on selection, no full parse)
+        self.file_summary = ctk.CTkLabel(self.run_card_file, text="", anchor="w", justify="left",
+                                         font=(self.UI_FONT, max(10, self.UI_SIZE - 2)), text_color=self.COL["MUTED"])
+        self.file_summary.pack(fill="x", padx=(20, 18), pady=(0, 2))
+        self._summary_after: str | None = None
+        self.in_path.trace_add("write", lambda *_: self._schedule_file_summary())
+        self.after_idle(self._schedule_file_summary)
+
         # output row
         row2 = ctk.CTkFrame(self.run_card_file, fg_color=self.COL["CARD"], corner_radius=0)
         row2.pack(fill="x", padx=18, pady=(6, 18))
@@ -583,6 +504,16 @@ class App(ctk.CTk):
                                      fg_color=self.COL["ACCENT"], hover_color=self.COL["ACCENT_HOVER"],
                                      font=(self.UI_FONT, self.UI_SIZE), height=42, corner_radius=14)
         self.run_btn.pack(side="left", padx=18, pady=14)
+        self.cancel_btn = ctk.CTkButton(self.run_actions, text="Cancel", command=self._cancel_run,
+                                        fg_color=self.COL["ACCENT_SOFT"], hover_color=self.COL["ACCENT_SOFT_HOVER"],
+                                        text_color=self.COL["ACCENT"], state="disabled",
+                                        font=(self.UI_FONT, self.UI_SIZE), height=42, corner_radius=14)
+        self.cancel_btn.pack(side="left", padx=(0, 18), pady=14)
+        self.split_btn = ctk.CTkButton(self.run_actions, text="Process per Island", command=self._start_partition_run,
+                                       fg_color=self.COL["ACCENT_SOFT"], hover_color=self.COL["ACCENT_SOFT_HOVER"],
+                                       text_color=self.COL["ACCENT"],
+                                       font=(self.UI_FONT, self.UI_SIZE), height=42, corner_radius=14)
+        self.split_btn.pack(side="left", padx=(0, 18), pady=14)
         self.quit_btn = ctk.CTkButton(self.run_actions, text="Quit", command=self.destroy,
                                       fg_color=self.COL["DANGER"], hover_color=self.COL["DANGER_HOVER"],
                                       font=(self.UI_FONT, self.UI_SIZE), height=42, corner_radius=14)
@@ -899,6 +830,7 @@ class App(ctk.CTk):
         # Primary and danger
         try:
             self.run_btn.configure(fg_color=self.COL["ACCENT"], hover_color=self.COL["ACCENT_HOVER"])
+            self.cancel_btn.configure(fg_color=self.COL["ACCENT_SOFT"], hover_color=self.COL["ACCENT_SOFT_HOVER"], text_color=self.COL["ACCENT"])
             self.quit_btn.configure(fg_color=self.COL["DANGER"], hover_color=self.COL["DANGER_HOVER"])
         except Exception:
             pass
@@ -978,10 +910,29 @@ class App(ctk.CTk):
     # ----- helpers (file picks, folders) --------------------------------------
     def _browse_in(self):
         path = filedialog.askopenfilename(title="Select CYME export",
-                                          filetypes=[("CYME export", "*.txt *.xml *.sxst"), ("All files", "*.*")])
+                                          filetypes=[("CYME export", "*.txt *.xml *.sxst *.gz *.xz *.zip"), ("All files", "*.*")])
         if path:
             self.in_path.set(path)
 
+    def _schedule_file_summary(self):
+        # Debounced: typing in the entry re-scans once the path stops changing
+        if self._summary_after is not None:
+            self.after_cancel(self._summary_after)
+        self._summary_after = self.after(250, self._start_file_summary)
+
+    def _start_file_summary(self):
+        self._summary_after = None
+        in_path = Path(self.in_path.get() or "").expanduser()
+        if not in_path.is_file():
+            self.file_summary.configure(text="")
+            return
+        self.file_summary.configure(text="Reading file header...")
+        self.jobs.submit(
+            "summary", describe_file, in_path,
+            on_done=lambda text: self._emit("summary", text),
+            on_error=lambda e: self._emit("summary", f"Could not read file header: {e}"),
+        )
+
     def _browse_out(self):
         path = filedialog.asksaveasfilename(title="Save Excel as", defaultextension=".xlsx",
                                             filetypes=[("Excel", "*.xlsx")])
@@ -1014,80 +965,69 @@ class App(ctk.CTk):
 
         self._set_busy(True); self._clear_log(); self._set_progress(0)
 
-        t = threading.Thread(target=self._run_pipeline_worker, args=(in_path, out_path, sheets), daemon=True)
-        t.start()
+        self.jobs.submit("export", self._run_pipeline_worker, in_path, out_path, sheets)
 
-    def _run_pipeline_worker(self, in_path: Path, out_path: Path, sheets: dict[str, bool]):
-        try:
-            steps: list[tuple[str, Callable[[Any, Path], None]]] = []
-            if sheets.get("General", False):        steps.append(("General",        write_general_sheet))
-            if sheets.get("Pins", False):           steps.append(("Pins",           write_pins_sheet))
-            if sheets.get("Bus", False):            steps.append(("Bus",            write_bus_sheet))
-            if sheets.get("Voltage Source", False): steps.append(("Voltage Source", write_voltage_source_sheet))
-            if sheets.get("Load", False):           steps.append(("Load",           write_load_sheet))
-            if sheets.get("Line", False):           steps.append(("Line",           write_line_sheet))
-            if sheets.get("Transformer", False):    steps.append(("Transformer",    write_transformer_sheet))
-            if sheets.get("Switch", False):         steps.append(("Switch",         write_switch_sheet))
-            if sheets.get("Shunt", False):          steps.append(("Shunt",          write_shunt_sheet))
-
-            total = len(steps) + 1
-            cur = 0
-
-            # Analyze first
-            self._emit("log", "Analyzing islands")
-            analyze_and_set_island_context(in_path, per_island_limit=50)
-            # Decide export scope now (UI click does NOT prune; we prune only at run time)
-            if self.active_island_id is not None:
-                self._emit("log", f" - Export scope: only island {self.active_island_id}")
-                _filter_context_to_island(self, self.active_island_id)
-            else:
-                self._emit("log", " - No island selected. Keeping islands with voltage sources; excluding islands without sources")
-                _keep_sourceful_islands_context(self, in_path)
+    def _start_partition_run(self):
+        # One workbook per sourceful island, next to the chosen output: <output>_islands/
+        in_path = Path(self.in_path.get()).expanduser()
+        out_path = Path(self.out_path.get()).expanduser()
+        if not in_path.exists():
+            messagebox.showerror(APP_NAME, "Input file not found.")
+            return
+        out_dir = out_path.with_name(f"{out_path.stem}_islands")
 
-            # If user already chose an active island earlier, re-apply it after analysis
-            if self.active_island_id is not None:
-                try:
-                    self._apply_selected_island_context(self.active_island_id)
-                    self._emit("log", f" - Active island preserved: {self.active_island_id}")
-                except Exception as e:
-                    self._emit("log", f" ! Could not re-apply the active island: {e}")
+        save_conf({"last_input": str(in_path), "last_output": str(out_path)})
+        sheets = {name: var.get() for name, var in self.sheet_vars.items()}
+
+        self._set_busy(True); self._clear_log(); self._set_progress(0)
+
+        self.jobs.submit("export", self._run_partition_worker, in_path, out_dir, sheets)
+
+    def _cancel_run(self):
+        # Cancel is enabled while busy: stop the export or an analyze-only run
+        stopped = [k for k in ("export", "island") if self.jobs.cancel(k)]
+        if stopped:
+            self._append_log("Cancelling " + ", ".join(stopped))
+            try:
+                self.cancel_btn.configure(state="disabled")
+            except Exception:
+                pass
 
+    def _run_pipeline_worker(self, in_path: Path, out_path: Path, sheets: dict[str, bool]):
+        try:
+            mode = (self.prune_mode.get() if hasattr(self, 'prune_mode') else 'Comment') or 'Comment'
+            result = self.service.export(
+                in_path, out_path,
+                sheets=[name for name, on in sheets.items() if on],
+                island=self.active_island_id,
+                prune_mode=mode,
+                log=lambda msg: self._emit("log", msg),
+                progress=lambda pct: self._emit("progress", pct),
+            )
             # Refresh island UI
             self._emit("islands", None)
-            cur += 1
-            self._emit("progress", int(cur / total * 100))
+            self._emit("done", result["output"])
+        except JobCancelled:
+            self._emit("cancelled", "Export cancelled")
+        except Exception as e:
+            self._emit("error", "".join(traceback.format_exception(e)))
 
-            # Write workbook
-            self._emit("log", f"Writing workbook - {out_path}")
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            opened_path = out_path
-            try:
-                writer = pd.ExcelWriter(out_path, engine="xlsxwriter")
-            except PermissionError:
-                from datetime import datetime
-                alt = out_path.with_name(f"{out_path.stem}__{datetime.now().strftime('%Y%m%d_%H%M%S')}{out_path.suffix}")
-                opened_path = alt
-                self._emit("log", f" ! Output file is in use. Writing to new file: {alt}")
-                writer = pd.ExcelWriter(alt, engine="xlsxwriter")
-            with writer as xw:
-                # Apply prune policy to the island context (comment vs remove)
-                try:
-                    from Modules.General import get_island_context, set_island_context  # lazy import
-                    ctx = get_island_context() or {}
-                    mode = (self.prune_mode.get() if hasattr(self, 'prune_mode') else 'Comment') or 'Comment'
-                    ctx["prune_mode"] = "remove" if str(mode).strip().lower().startswith("remove") else "comment"
-                    set_island_context(ctx)
-                except Exception:
-                    pass
-                for name, fn in steps:
-                    # Log each sheet succinctly
-                    self._emit("log", f"  - {name}")
-                    fn(xw, in_path)
-                    cur += 1
-                    self._emit("progress", int(cur / total * 100))
-
-            self._emit("log", f"Export complete: {opened_path}")
-            self._emit("done", str(opened_path))
+    def _run_partition_worker(self, in_path: Path, out_dir: Path, sheets: dict[str, bool]):
+        try:
+            mode = (self.prune_mode.get() if hasattr(self, 'prune_mode') else 'Comment') or 'Comment'
+            # spawn: forking a process that runs Tk and worker threads is unsafe
+            results = self.service.export_partitions(
+                in_path, out_dir,
+                sheets=[name for name, on in sheets.items() if on],
+                prune_mode=mode,
+                mp_context="spawn",
+                log=lambda msg: self._emit("log", msg),
+            )
+            self._emit("progress", 100)
+            self._emit("islands", None)
+            self._emit("done", f"{len(results)} island workbook(s) in {out_dir}")
+        except JobCancelled:
+            self._emit("cancelled", "Export cancelled")
         except Exception as e:
             self._emit("error", "".join(traceback.format_exception(e)))
 
@@ -1098,19 +1038,16 @@ class App(ctk.CTk):
             messagebox.showwarning(APP_NAME, "Select a CYME file on the Run tab first.")
             return
         self._set_busy(True)
-        def _worker():
-            try:
-                analyze_and_set_island_context(in_path, per_island_limit=50)
-                _keep_sourceful_islands_context(self, in_path)
-                # re-apply active island if one already set
-                if self.active_island_id is not None:
-                    self._apply_selected_island_context(self.active_island_id)
-                self._emit("islands", None)
-            except Exception as e:
-                self._emit("error", "".join(traceback.format_exception(e)))
-            finally:
-                self._set_busy(False)
-        threading.Thread(target=_worker, daemon=True).start()
+        # Through the service (its lock): never swaps the island context under a running export.
+        # Sourceful islands are kept, or only the active island if one is already set
+        island = self.active_island_id
+        self.jobs.submit(
+            "island", lambda: self.service.analyze(in_path, island=island, only_sourceful=True,
+                                                   progress=self._island_progress),
+            on_done=lambda _r: self._emit("islands_done", None),
+            on_error=lambda e: self._emit("error", "".join(traceback.format_exception(e))),
+            on_cancel=lambda: self._emit("cancelled", "Island analysis cancelled"),
+        )
 
             # removed stray duplicate error emission
 
@@ -1145,49 +1082,23 @@ class App(ctk.CTk):
         if not in_path.exists():
             messagebox.showwarning(APP_NAME, "Select a CYME file on the Run tab first.")
             return
-        analyze_and_set_island_context(in_path, per_island_limit=50)
         self.active_island_id = None
         self._suppress_island_event = False
         self._handling_island_click: bool = False
         self.active_island_label.configure(text="Active island: (none)")
-        self._refresh_islands_tab()
-        messagebox.showinfo(APP_NAME, "Island selection cleared.")
-
-    # Core: modify island context so only one island is kept (one slack)
-    def _apply_selected_island_context(self, active_island: int):
-        """
-        Keep ONLY the selected island. Do NOT inherit previous bad_buses,
-        so a user-chosen island with no source is still exported.
-        """
-        from Modules.General import get_island_context, set_island_context  # safe import
-
-        ctx = get_island_context() or {}
-        bus_to_island: dict[str, int] = dict(ctx.get("bus_to_island", {}))
-        islands: dict[int, set[str]] = dict(ctx.get("islands", {}))
-        slack_per_island: dict[int, str] = dict(ctx.get("slack_per_island", {}))
+        # Re-analysis runs as an "island" job (reused when the file is unchanged)
+        self._set_busy(True)
+        self.jobs.submit(
+            "island", lambda: self.service.analyze(in_path, progress=self._island_progress),
+            on_done=lambda _r: self._emit("islands_reset", None),
+            on_error=lambda e: self._emit("error", "".join(traceback.format_exception(e))),
+            on_cancel=lambda: self._emit("cancelled", "Island analysis cancelled"),
+        )
 
-        # If Islands dict is not present (older contexts), synthesize it once.
-        if not islands:
-            islands = {}
-            for b, isl in bus_to_island.items():
-                islands.setdefault(isl, set()).add(b)
-
-        keep = islands.get(active_island, set())
-        # Rebuild bus_to_island to ONLY the selected island
-        new_bus_to_island = {b: active_island for b in keep}
-
-        # All buses NOT in the selected island are now "bad"
-        bad_buses = set().union(*(v for k, v in islands.items() if k != active_island)) if islands else set()
-
-        new_ctx = {
-            "bus_to_island": new_bus_to_island,
-            "bad_buses": bad_buses,                      # selected island never appears here
-            "slack_per_island": {                        # preserve slack if it was known for this island
-                active_island: slack_per_island.get(active_island, "")
-            },
-            "islands": {active_island: keep},            # optional but tidy
-        }
-        set_island_context(new_ctx)
+    def _island_progress(self, pct: int, msg: str):
+        # Called from worker threads by ExtractionService.analyze
+        self._emit("log", f" - {msg}")
+        self._emit("progress", pct)
 
     # ----- thread ? UI bridge -------------------------------------------------
     def _emit(self, kind: str, payload: Any):
@@ -1211,6 +1122,15 @@ class App(ctk.CTk):
                     self._set_busy(False); self._append_log(str(payload)); messagebox.showerror(APP_NAME, "An error occurred.\n\nSee log for details.")
                 elif kind == "islands":
                     self._refresh_islands_tab()
+                elif kind == "islands_done":
+                    self._set_busy(False); self._refresh_islands_tab()
+                elif kind == "islands_reset":
+                    self._set_busy(False); self._refresh_islands_tab()
+                    messagebox.showinfo(APP_NAME, "Island selection cleared.")
+                elif kind == "summary":
+                    self.file_summary.configure(text=str(payload))
+                elif kind == "cancelled":
+                    self._set_busy(False); self._set_progress(0); self._append_log(str(payload))
         except queue.Empty:
             pass
         # Poll async island map build results too
@@ -1247,6 +1167,10 @@ class App(ctk.CTk):
             self.in_entry.configure(state=state)
             self.out_entry.configure(state=state)
             self.run_btn.configure(state=state)
+            self.split_btn.configure(state=state)
+            self.btn_analyze.configure(state=state)
+            self.btn_island_reset.configure(state=state)
+            self.cancel_btn.configure(state="normal" if busy else "disabled")
         except Exception:
             pass
 
@@ -1393,19 +1317,20 @@ class App(ctk.CTk):
             except Exception:
                 pass
 
-            # Launch compute on a background thread; main thread will render
-            # once results arrive via _map_queue.
+            # Launch compute as a "map" job; submitting supersedes (cancels) the
+            # previous map job so it stops at its next checkpoint. Main thread
+            # renders once results arrive via _map_queue.
             in_path = Path(self.in_path.get() or "").expanduser()
-            def _worker():
-                try:
-                    data = self._compute_island_map_data(isl, bus_to_island, in_path)
-                except Exception as e:
-                    data = {"error": str(e)}
+            def _put(data):
                 try:
                     self._map_queue.put((job_id, isl, data))
                 except Exception:
                     pass
-            threading.Thread(target=_worker, daemon=True).start()
+            self.jobs.submit(
+                "map", self._compute_island_map_data, isl, bus_to_island, in_path,
+                on_done=_put,
+                on_error=lambda e: _put({"error": str(e)}),
+            )
         except Exception:
             # On any failure, fall back to direct draw and hide loader safely
             try:
@@ -1418,588 +1343,8 @@ class App(ctk.CTk):
     # Move heavy XML parsing and normalization to a background thread
     # and only do the lightweight canvas mapping/drawing on the UI thread.
     def _compute_island_map_data(self, isl: int | None, bus_to_island: dict[str, int], in_path: Path) -> dict:
-        out: dict[str, Any] = {"version": 4, "isl": isl}
-        try:
-            if isl is None or not isinstance(bus_to_island, dict):
-                out["error"] = "no island"
-                return out
-            # Selected island nodes
-            nodes = sorted([b for b, i in bus_to_island.items() if i == isl])
-            if not nodes:
-                out["coords_unit"] = {}
-                out["edges"] = []
-                out["polylines_unit"] = {}
-                return out
-
-            import xml.etree.ElementTree as ET
-            import math as _m
-            from Modules.General import safe_name as _safe
-            txt = in_path.read_text(encoding='utf-8', errors='ignore')
-            xml_root = ET.fromstring(txt)
-
-            nodes_set = set()  # will be set after ID normalization
-
-            # Build adjacency and capture polylines per section
-            adj: dict[str, set[str]] = {n: set() for n in nodes}
-            edges: list[tuple[str, str]] = []
-            section_polylines: dict[str, list[list[tuple[float, float]]]] = {}
-            # Track tertiary per base edge to allow polyline splitting later
-            tert_by_edge: dict[str, set[str]] = {}
-            # Device collections
-            bus_sources: set[str] = set()
-            bus_loads: dict[str, int] = {}
-            bus_shunts: dict[str, int] = {}
-            inline_devs: dict[str, list[dict[str, str]]] = {}
-
-            def edge_key(a: str, b: str) -> str:
-                return "|".join(sorted((a, b)))
-
-            def _finite(v: float | None) -> bool:
-                try:
-                    return v is not None and _m.isfinite(v) and abs(float(v)) < 1e12
-                except Exception:
-                    return False
-
-            def _read_xy(el: ET.Element) -> tuple[float | None, float | None]:
-                # Strictly geometry fields only
-                cand = [
-                    (el.findtext('X'), el.findtext('Y')),
-                    (el.findtext('PosX'), el.findtext('PosY')),
-                    (el.findtext('CoordX'), el.findtext('CoordY')),
-                    (el.findtext('MapX'), el.findtext('MapY')),
-                ]
-                # Attribute forms
-                cand.extend([
-                    (el.get('x'), el.get('y')),
-                    (el.get('X'), el.get('Y')),
-                    (el.get('XCoord'), el.get('YCoord')),
-                    (el.get('XCOORD'), el.get('YCOORD')),
-                ])
-                for xs, ys in cand:
-                    try:
-                        xv = float(xs) if xs not in (None, '') else None
-                        yv = float(ys) if ys not in (None, '') else None
-                    except Exception:
-                        xv = None; yv = None
-                    if _finite(xv) and _finite(yv):
-                        return xv, yv
-                # Embedded Position node
-                pos = el.find('Position') or el.find('Coordinates')
-                if pos is not None:
-                    px, py = _read_xy(pos)
-                    if _finite(px) and _finite(py):
-                        return px, py
-                return None, None
-
-            def _gather_section_polylines(sec: ET.Element) -> list[list[tuple[float, float]]]:
-                outp: list[list[tuple[float, float]]] = []
-                # Accept only known geometry containers
-                holders = [
-                    sec.find('Breakpoints'),
-                    sec.find('ShapePoints'),
-                    sec.find('Polyline'),
-                    sec.find('IntermediatePoints'),  # some templates store the path here
-                ]
-                for holder in holders:
-                    if holder is None:
-                        continue
-                    pts: list[tuple[float, float]] = []
-                    for child in list(holder):
-                        tag = child.tag.split('}')[-1].lower()
-                        if tag in ('breakpoint', 'point'):
-                            x, y = _read_xy(child)
-                            if _finite(x) and _finite(y) and not (abs(float(x)) == 0.0 and abs(float(y)) == 0.0):
-                                pts.append((float(x), float(y)))  # type: ignore[arg-type]
-                    if pts:
-                        outp.append(pts)
-                return outp
-
-            # ID normalizer wraps project safe_name and adds phase/whitespace handling
-            def _norm_id(s: str) -> str:
-                try:
-                    t = _safe((s or '').strip())
-                    t = t.replace('\n', '').replace('\r', '')
-                    t = t.replace('__', '-')
-                    t = t.casefold()
-                    # strip trailing phase suffix _a/_b/_c if present
-                    if len(t) > 2 and t.endswith(('_a','_b','_c')):
-                        t = t[:-2]
-                    return t
-                except Exception:
-                    return (s or '').strip()
-
-            # Normalize node ids first
-            nodes = [(_safe(n) or n) for n in nodes]
-            nodes = [(_safe(n) or n) for n in nodes]  # ensure safe then norm
-            def _norm_id(s: str) -> str:
-                try:
-                    t = _safe((s or '').strip())
-                    t = t.replace('\n', '').replace('\r', '')
-                    t = t.replace('__', '-')
-                    t = t.casefold()
-                    if len(t) > 2 and t.endswith(('_a','_b','_c')):
-                        t = t[:-2]
-                    return t
-                except Exception:
-                    return (s or '').strip()
-            nodes = [_norm_id(n) for n in nodes]
-            nodes_set = set(nodes)
-
-            for sec in xml_root.findall('.//Sections/Section'):
-                fb = _norm_id((sec.findtext('FromNodeID') or ''))
-                tb = _norm_id((sec.findtext('ToNodeID') or ''))
-                if not fb or not tb:
-                    continue
-                if fb in nodes_set and tb in nodes_set:
-                    if tb not in adj[fb]:
-                        adj[fb].add(tb); adj[tb].add(fb)
-                        edges.append((fb, tb))
-                # Tertiary: split into two logical edges
-                tert = _norm_id((sec.findtext('TertiaryNodeID') or ''))
-                if tert:
-                    if tert in nodes_set and fb in nodes_set:
-                        if tert not in adj[fb]:
-                            adj[fb].add(tert); adj[tert].add(fb)
-                            edges.append((fb, tert))
-                    if tert in nodes_set and tb in nodes_set:
-                        if tb not in adj[tert]:
-                            adj[tert].add(tb); adj[tb].add(tert)
-                            edges.append((tert, tb))
-                    # Record for later polyline splitting
-                    tert_by_edge.setdefault(edge_key(fb, tb), set()).add(tert)
-
-                # Geometry polylines if present
-                polylists = _gather_section_polylines(sec)
-                if polylists and fb and tb:
-                    section_polylines.setdefault(edge_key(fb, tb), []).extend(polylists)
-
-            # Devices under this section
-            devs = sec.find('./Devices')
-            if devs is not None:
-                # Loads attach to From bus per sheet rules
-                if devs.find('SpotLoad') is not None or devs.find('DistributedLoad') is not None:
-                    if fb in nodes_set:
-                        bus_loads[fb] = bus_loads.get(fb, 0) + 1
-                # Shunt devices at From bus
-                if devs.find('ShuntCapacitor') is not None or devs.find('ShuntReactor') is not None:
-                    if fb in nodes_set:
-                        bus_shunts[fb] = bus_shunts.get(fb, 0) + 1
-                # Switch-like inline devices
-                for tag in ('Switch', 'Sectionalizer', 'Breaker', 'Fuse', 'Recloser'):
-                    for d in devs.findall(tag):
-                        loc = (d.findtext('Location') or 'Middle').strip().lower()
-                        name = (d.findtext('Name') or d.findtext('DeviceID') or tag)
-                        # heuristic state parse
-                        state = (d.findtext('NormalOpen') or d.findtext('NormallyOpen') or d.findtext('Open') or d.findtext('Status') or '')
-                        closed: bool | None
-                        sv = (state or '').strip().lower()
-                        if sv in ('open', '1', 'true'):
-                            closed = False
-                        elif sv in ('closed', '0', 'false'):
-                            closed = True
-                        else:
-                            closed = None
-                        rec = {'type': 'switch', 'loc': loc}
-                        if name:
-                            rec['name'] = name
-                        if closed is not None:
-                            rec['closed'] = closed
-                        inline_devs.setdefault(edge_key(fb, tb), []).append(rec)
-                # Some miscellaneous behave as inline switches (RB, LA)
-                for d in devs.findall('Miscellaneous'):
-                    did = ((d.findtext('DeviceID') or '').strip().upper())
-                    if did in {'RB', 'LA'}:
-                        loc = (d.findtext('Location') or 'Middle').strip().lower()
-                        inline_devs.setdefault(edge_key(fb, tb), []).append({'type': 'switch', 'loc': loc, 'name': did})
-                # Transformers inline (or regulators)
-                if devs.find('Transformer') is not None or devs.find('Regulator') is not None:
-                    xf = devs.find('Transformer')
-                    loc = (xf.findtext('Location') if xf is not None else 'Middle') or 'Middle'
-                    name = (xf.findtext('Name') if xf is not None else '') or 'Transformer'
-                    inline_devs.setdefault(edge_key(fb, tb), []).append({'type': 'xfmr', 'loc': loc.strip().lower(), 'name': name})
-
-            # Real coordinates per node (best-effort)
-            def _num(x: str | None) -> float | None:
-                try:
-                    return float(x) if x not in (None, '') else None
-                except Exception:
-                    return None
-            coords_real: dict[str, tuple[float, float]] = {}
-            used_geo = False  # lat/long detected
-            for elem in xml_root.iter():
-                tag = elem.tag.split('}')[-1].lower()
-                if tag in ('tag', 'tags'):
-                    continue  # ignore label containers entirely
-                # NodeID may be in text or attribute; try both
-                nid_raw = (elem.findtext('NodeID') or elem.get('NodeID') or elem.get('NodeId') or elem.get('node') or '')
-                if not nid_raw:
-                    continue
-                # Prefer diagram units first (X/Y families)
-                nx, ny = _read_xy(elem)
-                # Else try geographic
-                if not (_finite(nx) and _finite(ny)):
-                    lon_txt = elem.findtext('Longitude'); lat_txt = elem.findtext('Latitude')
-                    try:
-                        lon = float(lon_txt) if lon_txt not in (None, '') else None
-                        lat = float(lat_txt) if lat_txt not in (None, '') else None
-                    except Exception:
-                        lon = None; lat = None
-                    if _finite(lon) and _finite(lat):
-                        # Web Mercator projection to planar meters
-                        R = 6378137.0
-                        lon_rad = _m.radians(float(lon))
-                        lat_rad = _m.radians(max(-85.06, min(85.06, float(lat))))
-                        nx = R * lon_rad
-                        ny = R * _m.log(_m.tan(_m.pi/4.0 + lat_rad/2.0))
-                        used_geo = True
-                if not (_finite(nx) and _finite(ny)):
-                    continue
-                if abs(float(nx)) == 0.0 and abs(float(ny)) == 0.0:
-                    continue
-                nid = _norm_id(nid_raw)
-                if nid in nodes_set:
-                    coords_real.setdefault(nid, (float(nx), float(ny)))  # type: ignore[arg-type]
-
-            # Voltage sources from Substation topo (normalize ids)
-            try:
-                for topo in xml_root.findall('.//Topo'):
-                    ntype = (topo.findtext('NetworkType') or '').strip().lower()
-                    eq_mode = (topo.findtext('EquivalentMode') or '').strip()
-                    if ntype != 'substation' or eq_mode == '1':
-                        continue
-                    srcs = topo.find('./Sources')
-                    if srcs is None:
-                        continue
-                    for src in srcs.findall('./Source'):
-                        nid = _norm_id(src.findtext('SourceNodeID') or '')
-                        if nid and nid in nodes_set:
-                            bus_sources.add(nid)
-            except Exception:
-                pass
-
-            # Snap polyline endpoints to node anchors in RAW space; promote anchors from polylines when needed
-            try:
-                # Compute a robust epsilon based on current raw span
-                raw_xs = [x for (x, _) in coords_real.values()]
-                raw_ys = [y for (_, y) in coords_real.values()]
-                for plist in section_polylines.values():
-                    for pts in plist:
-                        for (x, y) in pts:
-                            raw_xs.append(x); raw_ys.append(y)
-                if raw_xs and raw_ys:
-                    rx_span = max(1.0, max(raw_xs) - min(raw_xs))
-                    ry_span = max(1.0, max(raw_ys) - min(raw_ys))
-                    eps = 1e-6 * max(rx_span, ry_span)
-                else:
-                    eps = 1e-3
-
-                def _snap_poly(poly: list[tuple[float, float]], frm_xy: tuple[float, float] | None, to_xy: tuple[float, float] | None, eps: float) -> list[tuple[float, float]]:
-                    if not poly or len(poly) < 2:
-                        return poly
-                    p = list(poly)
-                    if frm_xy is not None:
-                        d0 = (p[0][0]-frm_xy[0])**2 + (p[0][1]-frm_xy[1])**2
-                        d1 = (p[-1][0]-frm_xy[0])**2 + (p[-1][1]-frm_xy[1])**2
-                        if min(d0, d1) <= eps*eps:
-                            if d0 <= d1:
-                                p[0] = frm_xy
-                            else:
-                                p[-1] = frm_xy
-                    if to_xy is not None:
-                        d0 = (p[0][0]-to_xy[0])**2 + (p[0][1]-to_xy[1])**2
-                        d1 = (p[-1][0]-to_xy[0])**2 + (p[-1][1]-to_xy[1])**2
-                        if min(d0, d1) <= eps*eps:
-                            if d1 <= d0:
-                                p[-1] = to_xy
-                            else:
-                                p[0] = to_xy
-                    return p
-
-                poly_anchored: set[str] = set()
-                for k, plist in list(section_polylines.items()):
-                    try:
-                        u, v = k.split('|', 1)
-                    except Exception:
-                        continue
-                    u_xy = coords_real.get(u)
-                    v_xy = coords_real.get(v)
-                    new_list: list[list[tuple[float, float]]] = []
-                    for pts in plist:
-                        sp = _snap_poly(pts, u_xy, v_xy, eps)
-                        new_list.append(sp)
-                        if u_xy is None and v_xy is None and sp:
-                            coords_real[u] = sp[0]
-                            coords_real[v] = sp[-1]
-                            poly_anchored.add(u); poly_anchored.add(v)
-                            u_xy = coords_real.get(u); v_xy = coords_real.get(v)
-                    section_polylines[k] = new_list
-            except Exception:
-                poly_anchored = set()
-
-            # Fallback BFS layout for structure
-            from collections import deque as _dq
-            # Try to root at slack if available
-            try:
-                ctx = get_island_context() or {}
-                slack_per_island: dict[int, str] = dict(ctx.get('slack_per_island', {}))
-                root_node = slack_per_island.get(isl) or (nodes[0] if nodes else None)
-            except Exception:
-                root_node = nodes[0] if nodes else None
-            depth: dict[str, int] = {}
-            if root_node:
-                q = _dq([root_node]); depth[root_node] = 0
-                while q:
-                    u = q.popleft()
-                    for v in sorted(adj.get(u, set())):
-                        if v not in depth:
-                            depth[v] = depth[u] + 1
-                            q.append(v)
-            for n in nodes:
-                depth.setdefault(n, 0)
-            columns: dict[int, list[str]] = {}
-            for n in nodes:
-                columns.setdefault(depth[n], []).append(n)
-            for col in columns.values():
-                col.sort()
-            coords_bfs: dict[str, tuple[float, float]] = {}
-            for dlevel, col_nodes in columns.items():
-                k = max(1, len(col_nodes))
-                for i, n in enumerate(col_nodes):
-                    x = float(dlevel)
-                    y = float(i) / float(k - 1 if k > 1 else 1)
-                    coords_bfs[n] = (x, y)
-            try:
-                dmax = max((xy[0] for xy in coords_bfs.values()), default=1.0)
-                if dmax <= 0:
-                    dmax = 1.0
-                for n, (x, y) in list(coords_bfs.items()):
-                    coords_bfs[n] = (x / dmax, y)
-            except Exception:
-                pass
-
-            # If there are two or more anchors, align BFS axis with the anchors' principal direction (PCA)
-            try:
-                anchors_u = [coords_real.get(n) for n in nodes if n in coords_real]
-                anchors_u = [(x, y) for (x, y) in anchors_u if isinstance(x, float) and isinstance(y, float)]
-                if len(anchors_u) >= 2:
-                    import math as _pm
-                    ax = [x for (x, _) in anchors_u]; ay = [y for (_, y) in anchors_u]
-                    mx = sum(ax)/len(ax); my = sum(ay)/len(ay)
-                    vx = sum((x-mx)*(x-mx) for x in ax); vy = sum((y-my)*(y-my) for y in ay); vxy = sum((ax[i]-mx)*(ay[i]-my) for i in range(len(ax)))
-                    theta = 0.5 * _pm.atan2(2.0*vxy, (vx - vy) if (vx!=vy or vxy!=0) else 1.0)
-                    ct, st = _pm.cos(theta), _pm.sin(theta)
-                    coords_bfs = {n: (x*ct - y*st, x*st + y*ct) for n,(x,y) in coords_bfs.items()}
-            except Exception:
-                pass
-
-            # Collect polyline raw points (for normalization even if no node coords)
-            poly_points: list[tuple[float, float]] = []
-            for plist in section_polylines.values():
-                for pts in plist:
-                    poly_points.extend(pts)
-
-            # Build a normalization over whatever real geometry we have (filter bad values/outliers)
-            if coords_real or poly_points:
-                xs_all = [p[0] for p in coords_real.values()] + [p[0] for p in poly_points]
-                ys_all = [p[1] for p in coords_real.values()] + [p[1] for p in poly_points]
-                minxr, maxxr = min(xs_all), max(xs_all)
-                minyr, maxyr = min(ys_all), max(ys_all)
-                spanxr = max(1.0, maxxr - minxr)
-                spanyr = max(1.0, maxyr - minyr)
-                # Drop extreme outliers beyond ~5 sigma from median (basic safeguard)
-                try:
-                    import statistics as _st
-                    mx = _st.median(xs_all); my = _st.median(ys_all)
-                    sx = _st.pstdev(xs_all) or 1.0; sy = _st.pstdev(ys_all) or 1.0
-                    limx = 5.0*sx; limy = 5.0*sy
-                    def _okx(x: float) -> bool: return abs(x - mx) <= limx
-                    def _oky(y: float) -> bool: return abs(y - my) <= limy
-                    coords_real = {n:(x,y) for n,(x,y) in coords_real.items() if _okx(x) and _oky(y)}
-                    poly_points = [(x,y) for (x,y) in poly_points if _okx(x) and _oky(y)]
-                    if coords_real or poly_points:
-                        xs_all = [p[0] for p in coords_real.values()] + [p[0] for p in poly_points]
-                        ys_all = [p[1] for p in coords_real.values()] + [p[1] for p in poly_points]
-                        minxr, maxxr = min(xs_all), max(xs_all)
-                        minyr, maxyr = min(ys_all), max(ys_all)
-                        spanxr = max(1.0, maxxr - minxr)
-                        spanyr = max(1.0, maxyr - minyr)
-                except Exception:
-                    pass
-                def _norm_geom_to_unit(x: float, y: float) -> tuple[float, float]:
-                    return (x - minxr) / spanxr, (y - minyr) / spanyr
-                coords_real_unit = {n: _norm_geom_to_unit(x, y) for n, (x, y) in coords_real.items()}
-            else:
-                coords_real_unit = {}
-
-            # Merge: BFS unit, overridden by any real-unit positions
-            coords_unit: dict[str, tuple[float, float]] = dict(coords_bfs)
-            for n, xy in coords_real_unit.items():
-                coords_unit[n] = xy
-            # Pull nodes with no real coords toward average of real neighbors (jittered)
-            # Soft relaxation only on synthetic nodes, never move anchored
-            try:
-                for _ in range(8):
-                    for n in nodes:
-                        if n in coords_real_unit:
-                            continue  # locked anchors
-                        neigh_u = [coords_unit.get(v) for v in adj.get(n, set())]
-                        neigh_u = [(x, y) for (x, y) in neigh_u if x is not None and y is not None]
-                        if not neigh_u:
-                            continue
-                        ax = sum(x for x, _ in neigh_u) / float(len(neigh_u))
-                        ay = sum(y for _, y in neigh_u) / float(len(neigh_u))
-                        px, py = coords_unit.get(n, (ax, ay))
-                        # small step toward neighbors average
-                        s = 0.2
-                        nx = px + s * (ax - px)
-                        ny = py + s * (ay - py)
-                        coords_unit[n] = (min(1.0, max(0.0, nx)), min(1.0, max(0.0, ny)))
-            except Exception:
-                pass
-
-            # Normalize polylines to unit using geometry extents if available
-            polylines_unit: dict[str, list[list[tuple[float, float]]]] = {}
-            try:
-                if coords_real or poly_points:
-                    def _norm_geom_to_unit(x: float, y: float) -> tuple[float, float]:
-                        return (x - minxr) / spanxr, (y - minyr) / spanyr  # type: ignore[name-defined]
-                    for k, plist in section_polylines.items():
-                        out_list: list[list[tuple[float, float]]] = []
-                        for pts in plist:
-                            out_list.append([_norm_geom_to_unit(px, py) for (px, py) in pts])
-                        if out_list:
-                            polylines_unit[k] = out_list
-            except Exception:
-                pass
-
-            # If we have tertiary nodes and a base-edge polyline, split the polyline at
-            # the junction nearest to the tertiary anchor so each branch gets its shape.
-            try:
-                for k, tert_set in tert_by_edge.items():
-                    if k not in polylines_unit:
-                        continue
-                    try:
-                        u, v = k.split('|', 1)
-                    except Exception:
-                        continue
-                    for tert in list(tert_set):
-                        if tert not in coords_unit:
-                            continue
-                        tx, ty = coords_unit[tert]
-                        base_list = polylines_unit.get(k) or []
-                        add_uv: list[list[tuple[float, float]]] = []
-                        add_tv: list[list[tuple[float, float]]] = []
-                        tol = 0.02  # unit-space tolerance for tee snapping
-                        tol2 = tol * tol
-                        for pts in base_list:
-                            if not pts:
-                                continue
-                            # find nearest poly point to tertiary
-                            best_i = 0; best_d = 1e9
-                            for i, (px, py) in enumerate(pts):
-                                d = (px - tx) * (px - tx) + (py - ty) * (py - ty)
-                                if d < best_d:
-                                    best_d = d; best_i = i
-                            if best_d <= tol2:
-                                left = pts[:best_i+1]
-                                right = pts[best_i:]
-                                if left and right:
-                                    add_uv.append(left)
-                                    add_tv.append(right)
-                        # attach splits and leave original polyline as-is (renderer prefers edge-specific ones)
-                        if add_uv:
-                            polylines_unit.setdefault(edge_key(u, tert), []).extend(add_uv)
-                        if add_tv:
-                            polylines_unit.setdefault(edge_key(tert, v), []).extend(add_tv)
-            except Exception:
-                pass
-
-            # If nodes lack real coords, try to infer their positions from polyline endpoints
-            if polylines_unit:
-                inferred: dict[str, list[tuple[float, float]]] = {}
-                for (u, v) in edges:
-                    k = edge_key(u, v)
-                    plist = polylines_unit.get(k)
-                    if not plist:
-                        continue
-                    # Choose ends per edge to match BFS orientation
-                    bu = coords_bfs.get(u, (0.0, 0.0))
-                    bv = coords_bfs.get(v, (1.0, 1.0))
-                    for pts in plist:
-                        if not pts:
-                            continue
-                        a = pts[0]; b = pts[-1]
-                        try:
-                            s1 = (bu[0]-a[0])**2 + (bu[1]-a[1])**2 + (bv[0]-b[0])**2 + (bv[1]-b[1])**2
-                            s2 = (bu[0]-b[0])**2 + (bu[1]-b[1])**2 + (bv[0]-a[0])**2 + (bv[1]-a[1])**2
-                            if s1 <= s2:
-                                inferred.setdefault(u, []).append(a)
-                                inferred.setdefault(v, []).append(b)
-                            else:
-                                inferred.setdefault(u, []).append(b)
-                                inferred.setdefault(v, []).append(a)
-                        except Exception:
-                            continue
-                # Average candidates
-                for n, lst in inferred.items():
-                    if n in coords_real_unit:
-                        continue
-                    if not lst:
-                        continue
-                    ax = sum(x for x, _ in lst) / float(len(lst))
-                    ay = sum(y for _, y in lst) / float(len(lst))
-                    coords_unit[n] = (ax, ay)
-
-            # Prepare result
-            out["coords_unit"] = coords_unit
-            out["edges"] = edges
-            out["polylines_unit"] = polylines_unit
-            # Heuristic Y flip: diagram-like (no geo) tends to be y-down. If we have
-            # polylines, sample gradients; otherwise fall back to diagram default.
-            y_down = True
-            try:
-                if used_geo:
-                    y_down = False
-                else:
-                    grads = []
-                    for plist in polylines_unit.values():
-                        for pts in plist:
-                            for i in range(len(pts)-1):
-                                (x0, y0), (x1, y1) = pts[i], pts[i+1]
-                                if abs(x1 - x0) + abs(y1 - y0) > 1e-6:
-                                    grads.append(y1 - y0)
-                    if grads:
-                        # If most segments increase y downward (positive), treat as y-down
-                        pos = sum(1 for g in grads if g > 0)
-                        neg = sum(1 for g in grads if g < 0)
-                        y_down = pos >= neg
-            except Exception:
-                pass
-            out["y_down"] = y_down
-            # Devices
-            out["bus_sources"] = [b for b in bus_sources if b in nodes_set]
-            out["bus_loads"] = bus_loads
-            out["bus_shunts"] = bus_shunts
-            out["inline_devs"] = inline_devs
-            # Diagnostics
-            try:
-                anchors_count = len({n for n in nodes if n in coords_real_unit})
-                poly_sec_count = sum(1 for k,v in (polylines_unit or {}).items() if v)
-                poly_pts_count = sum(len(pts) for plist in (polylines_unit or {}).values() for pts in plist)
-                synth_nodes = [n for n in nodes if n not in coords_real_unit]
-                out["diag"] = {
-                    "anchors": anchors_count,
-                    "poly_sections": poly_sec_count,
-                    "poly_points": poly_pts_count,
-                    "synthetic_nodes": len(synth_nodes),
-                    "y_down": y_down,
-                }
-            except Exception:
-                pass
-            return out
-        except Exception as e:
-            out["error"] = str(e)
-            return out
+        from Modules.IslandMap import compute_island_map_data
+        return compute_island_map_data(isl, bus_to_island, in_path)
 
     def _render_island_map_from_data(self, data: dict) -> None:
         # Fast path: draw from precomputed unit coordinates/polylines
@@ -2341,11 +1686,10 @@ class App(ctk.CTk):
 
         # Build adjacency from the input file, then subgraph to selected island
         try:
-            from Modules.IslandChecker import _read_xml as _is_read_xml  # type: ignore
             from Modules.IslandChecker import _build_graph as _is_build_graph  # type: ignore
+            from Modules.SectionRecords import section_model
             in_path = Path(self.in_path.get() or "").expanduser()
-            root = _is_read_xml(in_path)
-            adj_full, _, _ = _is_build_graph(root)
+            adj_full, _, _ = _is_build_graph(section_model(in_path)["records"])
         except Exception:
             adj_full = {n: set() for n in nodes}
 
@@ -2374,7 +1718,7 @@ class App(ctk.CTk):
             #  2) Sections with From*/To* X/Y (endpoint coords)
             #  3) Sections with IntermediatePoints for bends (polyline)
             in_path = Path(self.in_path.get() or "").expanduser()
-            root = ET.fromstring(in_path.read_text(encoding='utf-8', errors='ignore'))
+            root = read_xml(in_path)  # shared parsed model (cached)
             # 1) Node-centric coords
             for elem in root.iter():
                 nid_raw = (elem.findtext('NodeID') or '').strip()
@@ -2653,7 +1997,7 @@ class App(ctk.CTk):
             import xml.etree.ElementTree as ET
             from Modules.General import safe_name as _safe
             in_path = Path(self.in_path.get() or "").expanduser()
-            xml_root = ET.fromstring(in_path.read_text(encoding='utf-8', errors='ignore'))
+            xml_root = read_xml(in_path)  # shared parsed model (cached)
 
             nodes_set = set(nodes)
 
@@ -3382,9 +2726,17 @@ class App(ctk.CTk):
             pass
 
 # ---- Entrypoint --------------------------------------------------------------
+def _report_startup() -> None:
+    elapsed = time.perf_counter() - _T_START
+    note = "" if elapsed <= STARTUP_BUDGET_S else f"  (over budget {STARTUP_BUDGET_S:.1f}s)"
+    print(f"[Startup] First window in {elapsed:.2f}s{note}")
+
 def main():
     app = App()
+    app.after_idle(_report_startup)
     app.mainloop()
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # island partitions use a spawn pool (frozen builds re-enter here)
     main()
@@ -4,20 +4,17 @@
 
 # src/main.py
 from __future__ import annotations
+import argparse
+import sys
 from pathlib import Path
-import pandas as pd  # needed for ExcelWriter (modules expect xw.book / xw.sheets)
 
 # Local imports
-from Modules.IslandChecker import analyze_and_set_island_context
-from Modules.General import write_general_sheet
-from Modules.Pins import write_pins_sheet
-from Modules.Bus import write_bus_sheet
-from Modules.Voltage_Source import write_voltage_source_sheet
-from Modules.Load import write_load_sheet
-from Modules.Line import write_line_sheet
-from Modules.Transformer import write_transformer_sheet
-from Modules.Shunt import write_shunt_sheet
-from Modules.Switch import write_switch_sheet
+from Modules.Worker import ExtractionService, WorkerClient, DEFAULT_PORT, serve_stdio, serve_tcp
+from Modules.General import LINE_MODELS, LOAD_AGGREGATIONS, PINS_LAYOUTS
+from Modules.PinSelection import parse_rules
+from Modules.Profiles import PROFILE_FORMATS
+from Modules.Scenarios import export_scenarios, load_scenarios, open_tie_scenarios
+from Modules.SectionRecords import set_parse_workers
 
 # ===== Paths (adjust as needed) =====
 
@@ -56,30 +53,133 @@ OUTPUT_PATH = Path(__file__).parent.parent / "Outputs/CYME_Extract_UNB_modified.
 
 # ====================================
 
-def main():
-    in_path = INPUT_PATH.resolve()
-    out_path = OUTPUT_PATH.resolve()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    analyze_and_set_island_context(Path(in_path), per_island_limit=50)  # prints vertical list; stores context
-
-    if not in_path.exists():
-        raise FileNotFoundError(f"Input not found: {in_path}")
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="CYME export -> Excel workbook")
+    ap.add_argument("-i", "--input", type=Path, nargs="+", default=[INPUT_PATH],
+                    help="CYME text/XML export file (also .gz / .xz / .zip, read without unpacking); "
+                         "several files are merged into one model (shared equipment kept once)")
+    ap.add_argument("-o", "--output", type=Path, default=OUTPUT_PATH, help="Target Excel workbook")
+    ap.add_argument("--island", type=int, default=None, help="Export only this island index")
+    ap.add_argument("--sourceful-only", action="store_true",
+                    help="Without --island: keep only islands with a voltage source (GUI behavior)")
+    ap.add_argument("--prune", choices=("comment", "remove"), default="comment",
+                    help="Out-of-scope rows: comment out (default) or remove")
+    ap.add_argument("--line-model", choices=LINE_MODELS, default="full",
+                    help="Three-phase lines: full phase matrices (default) or sequential R0/X0/R1/X1/B0/B1")
+    ap.add_argument("--reduce-chains", action="store_true",
+                    help="Merge series line chains (same line code, no loads/branching) into single Line rows")
+    ap.add_argument("--load-aggregation", choices=LOAD_AGGREGATIONS, default="none",
+                    help="Sum loads per bus/phasing/ZIP class, or per service transformer secondary bus")
+    ap.add_argument("--pins-layout", choices=PINS_LAYOUTS, default="rows",
+                    help="Pins sheet: one row per group (continued past 16,384 columns), or one row per pin")
+    ap.add_argument("--pin-rules", default=None,
+                    help="Voltage-pin bus selection: JSON rule list or a JSON file "
+                         "(hops / trunk / ends / buses; default: measurement buses plus one hop)")
+    ap.add_argument("--profiles", type=Path, default=None,
+                    help="CSV of normalized load profiles per CustomerType: also write P/Q time series")
+    ap.add_argument("--profiles-out", type=Path, default=None,
+                    help="Directory for the time series (default: <output>_profiles next to the workbook)")
+    ap.add_argument("--profiles-format", choices=PROFILE_FORMATS, default="auto",
+                    help="Time-series files: npy chunks, or Parquet (needs pyarrow); auto picks Parquet when available")
+    ap.add_argument("--scenarios", type=Path, default=None,
+                    help="JSON list of switching scenarios: write one workbook per scenario")
+    ap.add_argument("--tie-scenarios", action="store_true",
+                    help="One scenario per normally-open switching device, closed in turn")
+    ap.add_argument("--scenario-dir", type=Path, default=None,
+                    help="Directory for scenario workbooks (default: <output>_scenarios next to the workbook)")
+    ap.add_argument("--partition-islands", action="store_true",
+                    help="Write one workbook per island with a voltage source (in parallel)")
+    ap.add_argument("--partition-dir", type=Path, default=None,
+                    help="Directory for island workbooks (default: <output>_islands next to the workbook)")
+    ap.add_argument("--jobs", type=int, default=None,
+                    help="Processes for scenario / island exports (default: one per CPU, at most one per workbook)")
+    ap.add_argument("--parse-jobs", type=int, default=1,
+                    help="Processes that parse <Section> data in parallel for the island analysis and Pins "
+                         "(plain files; 0 = one per CPU; default 1 = serial)")
+    ap.add_argument("--serve", action="store_true",
+                    help="Run a warm worker (JSON-RPC) instead of exporting; see --port / --stdio")
+    ap.add_argument("--stdio", action="store_true", help="With --serve: talk JSON-RPC over stdin/stdout")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help="Worker port on 127.0.0.1")
+    ap.add_argument("--use-worker", action="store_true",
+                    help="Submit the export to a running worker (falls back to in-process if none)")
+    args = ap.parse_args(argv)
+    if args.pin_rules is not None:
+        try:
+            parse_rules(args.pin_rules)  # fail here, not mid-export
+        except (OSError, ValueError) as e:
+            ap.error(f"--pin-rules: {str(e).removeprefix('pin_rules: ')}")
+    return args
+
+def main(argv: list[str] | None = None):
+    args = _parse_args(argv)
+    set_parse_workers(args.parse_jobs)
+
+    if args.serve:
+        if args.stdio:
+            serve_stdio()
+        else:
+            serve_tcp(args.port)
+        return
+
+    in_paths = [p.resolve() for p in args.input]
+    out_path = args.output.resolve()
+    for p in in_paths:
+        if not p.exists():
+            raise FileNotFoundError(f"Input not found: {p}")
+
+    # Several inputs: one merged model (built in the warm worker for a plain --use-worker export)
+    service = ExtractionService()
+    in_path = in_paths[0]
+    batch = args.scenarios is not None or args.tie_scenarios or args.partition_islands
+    remote_merge = len(in_paths) > 1 and args.use_worker and not batch
+    if len(in_paths) > 1 and not remote_merge:
+        in_path = Path(service.merge([str(p) for p in in_paths], log=print)["path"])
+
+    params = {"path": str(in_path), "out": str(out_path), "island": args.island,
+              "only_sourceful": args.sourceful_only, "prune_mode": args.prune,
+              "options": {"line_model": args.line_model, "reduce_chains": args.reduce_chains,
+                          "load_aggregation": args.load_aggregation, "pins_layout": args.pins_layout,
+                          "pin_rules": args.pin_rules}}
+    if args.profiles is not None:
+        prof_out = args.profiles_out or out_path.with_name(f"{out_path.stem}_profiles")
+        params["profiles"] = {"csv": str(args.profiles.resolve()), "out": str(prof_out.resolve()),
+                              "format": args.profiles_format}
+    if args.scenarios is not None or args.tie_scenarios:
+        if args.profiles is not None or args.partition_islands:
+            raise SystemExit("--profiles / --partition-islands cannot be combined with scenario exports")
+        scenarios = load_scenarios(args.scenarios) if args.scenarios is not None else open_tie_scenarios(in_path)
+        out_dir = args.scenario_dir or out_path.with_name(f"{out_path.stem}_scenarios")
+        kw = {k: v for k, v in params.items() if k not in ("path", "out")}
+        results = export_scenarios(in_path, scenarios, out_dir.resolve(), workers=args.jobs, **kw)
+        print(f"Wrote {len(results)} scenario workbook(s) to {out_dir.resolve()}")
+        return
+
+    if args.partition_islands:
+        if args.island is not None or args.profiles is not None:
+            raise SystemExit("--partition-islands cannot be combined with --island or --profiles")
+        out_dir = args.partition_dir or out_path.with_name(f"{out_path.stem}_islands")
+        kw = {k: v for k, v in params.items() if k not in ("path", "out", "island", "only_sourceful")}
+        results = service.export_partitions(in_path, out_dir.resolve(), workers=args.jobs,
+                                             log=print, **kw)
+        print(f"Wrote {len(results)} island workbook(s) to {out_dir.resolve()}")
+        return
+
+    if args.use_worker:
+        try:
+            with WorkerClient(args.port) as client:
+                if remote_merge:
+                    params["path"] = client.call("merge", paths=[str(p) for p in in_paths])["path"]
+                result = client.call("export", **params)
+            print(f"Wrote: {result['output']}  ({result['elapsed']}s, warm worker)")
+            return
+        except OSError as e:
+            print(f"[Worker] Not available on port {args.port} ({e}); exporting in-process", file=sys.stderr)
+            if remote_merge:
+                params["path"] = service.merge([str(p) for p in in_paths], log=print)["path"]
 
     # Create workbook and let each module render its own sheet
-    with pd.ExcelWriter(out_path, engine="xlsxwriter") as xw:
-        write_general_sheet(xw, in_path)
-        write_pins_sheet(xw, in_path)
-        write_bus_sheet(xw, in_path)
-        write_voltage_source_sheet(xw, in_path)
-        write_load_sheet(xw, in_path)
-        write_line_sheet(xw, in_path)
-        write_transformer_sheet(xw, in_path)
-        write_switch_sheet(xw, in_path)
-        write_shunt_sheet(xw, in_path)
-
-
-    print(f"Wrote: {out_path}")
+    result = service.export(**params, log=print)
+    print(f"Wrote: {result['output']}")
 
 if __name__ == "__main__":
     main()
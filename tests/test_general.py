@@ -0,0 +1,25 @@
+# tests/test_general.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from Modules.General import read_xml, scan_header  # noqa: E402
+
+EXAMPLE = ROOT / "Examples" / "Example-4bus.txt"
+
+
+def test_header_scan_after_decode_fallback(tmp_path):
+    # An undecodable byte before <GlobalParameters> sends read_xml down the
+    # decode-fallback re-read; the cached header scan must still hold the block
+    data = EXAMPLE.read_bytes().replace(b"<Version>9.0</Version>", b"<Version>9.0\xff</Version>", 1)
+    path = tmp_path / "bad_byte.txt"
+    path.write_bytes(data)
+
+    root = read_xml(path)
+    assert root.findtext("Version") == "9.0"
+
+    info = scan_header(path)
+    assert info["frequency"] == 60.0
+    assert info["base_mva"] == 100.0
@@ -0,0 +1,36 @@
+# tests/test_line.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from Modules.Line import _sequence_table, sequence_per_unit  # noqa: E402
+
+
+def _balanced(self_value: float, mutual: float) -> np.ndarray:
+    m = np.full((1, 3, 3), mutual)
+    m[0, range(3), range(3)] = self_value
+    return m
+
+
+def test_sequence_per_unit_matches_hand_computed_section():
+    # Zs = 1 + 2j, Zm = 0.5 + 1j ohm/mi  ->  Z1 = Zs - Zm, Z0 = Zs + 2 Zm
+    # Bs = 6, Bm = -1 uS/mi              ->  B1 = Bs - Bm, B0 = Bs + 2 Bm
+    seq = _sequence_table(_balanced(1.0, 0.5), _balanced(2.0, 1.0), _balanced(6.0, -1.0))
+    np.testing.assert_allclose(seq[0], [2.0, 4.0, 0.5, 1.0, 4.0, 7.0], atol=1e-12)
+
+    # 2 mi at 12.47 kV LL on 100 MVA: Zbase = 12.47^2 / 100 = 1.555009 ohm
+    zbase = 1.555009
+    pu = sequence_per_unit(seq, np.array([2.0]), np.array([12.47]), 100.0)[0]
+    assert pu == pytest.approx([
+        0.5 * 2 / zbase,             # R1
+        1.0 * 2 / zbase,             # X1
+        7.0e-6 * 2 * zbase,          # B1
+        2.0 * 2 / zbase,             # R0
+        4.0 * 2 / zbase,             # X0
+        4.0e-6 * 2 * zbase,          # B0
+    ], rel=1e-9)
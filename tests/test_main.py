@@ -0,0 +1,28 @@
+# tests/test_main.py
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from main import _parse_args  # noqa: E402
+
+
+@pytest.mark.parametrize("spec, message", [
+    ('[{"rule": "nearest"}]', "needs \"rule\""),
+    ("[{", "invalid JSON"),
+    ("no_such_rules.json", "No such file"),
+])
+def test_pin_rules_errors_are_usage_errors(spec, message, capsys):
+    with pytest.raises(SystemExit) as exc:
+        _parse_args(["--pin-rules", spec])
+    assert exc.value.code == 2
+    err = capsys.readouterr().err
+    assert "--pin-rules:" in err and message in err
+
+
+def test_pin_rules_accepted():
+    args = _parse_args(["--pin-rules", '[{"rule": "ends"}]'])
+    assert args.pin_rules == '[{"rule": "ends"}]'
@@ -0,0 +1,32 @@
+# tests/test_merge.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from Modules.General import parse_xml, read_xml, unpin_xml  # noqa: E402
+from Modules.Merge import merge_exports  # noqa: E402
+from Modules.Voltage_Source import _gather_sources  # noqa: E402
+
+EXAMPLES = ROOT / "Examples"
+INPUTS = [EXAMPLES / "IEEE_34_node_test_feeder_modified.txt", EXAMPLES / "UNB Feeders_simple.txt"]
+
+
+def _source_nodes(root):
+    return {(src.findtext("SourceNodeID") or "").strip() for src in _gather_sources(root)}
+
+
+def test_merge_keeps_every_inputs_sources():
+    expected = [_source_nodes(parse_xml(p)) for p in INPUTS]
+    assert all(expected)
+
+    report = merge_exports(INPUTS, log=lambda _msg: None)
+    try:
+        merged = _source_nodes(read_xml(Path(report["path"])))
+    finally:
+        unpin_xml(report["path"])
+
+    for path, nodes in zip(INPUTS, expected):
+        assert nodes <= merged, f"sources of {path.name} missing from the merge"
+    assert merged == set().union(*expected)
@@ -0,0 +1,109 @@
+# tests/test_pins.py
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from Modules import Pins  # noqa: E402
+from Modules.General import set_export_options  # noqa: E402
+from Modules.IslandChecker import analyze_and_set_island_context  # noqa: E402
+from Modules.PinSelection import build_csr, bfs, parse_rules, select_buses  # noqa: E402
+from Modules.Workbook import WorkbookWriter  # noqa: E402
+
+
+def _model(pairs, *, loads=(), sources=()):
+    """Pins-scan shaped model over line sections `pairs`."""
+    buses = sorted({b for p in pairs for b in p})
+    return {"bus_ph": {b: {"A", "B", "C"} for b in buses}, "loads": {b: 3 for b in loads},
+            "shunts": set(), "xsec": set(), "lines": [(a, b, 3) for a, b in pairs],
+            "xf_pairs": [], "edges": list(pairs), "sources": list(sources)}
+
+
+# A - B - C - D - E, with a branch C - F
+FEEDER = [("A", "B"), ("B", "C"), ("C", "D"), ("D", "E"), ("C", "F")]
+
+
+def test_bfs_hop_distances():
+    names = ["A", "B", "C", "D", "E", "F"]
+    ix = {n: i for i, n in enumerate(names)}
+    a = np.array([ix[p[0]] for p in FEEDER])
+    b = np.array([ix[p[1]] for p in FEEDER])
+    indptr, indices = build_csr(len(names), a, b)
+
+    assert bfs(indptr, indices, [ix["A"]]).tolist() == [0, 1, 2, 3, 4, 3]
+    assert bfs(indptr, indices, [ix["A"], ix["E"]]).tolist() == [0, 1, 2, 1, 0, 3]
+    assert bfs(indptr, indices, [ix["A"]], max_hops=2).tolist() == [0, 1, 2, -1, -1, -1]
+
+
+def test_hops_rule():
+    model = _model(FEEDER, loads=["E"])
+    assert select_buses(model, parse_rules([{"rule": "hops", "k": 1}])) == {"D", "E"}
+    assert select_buses(model, parse_rules([{"rule": "hops", "k": 2}])) == {"C", "D", "E"}
+
+
+def test_trunk_on_sourceless_component():
+    # No source: the trunk is a longest path, picked every 2nd bus from one end
+    model = _model([("P0", "P1"), ("P1", "P2"), ("P2", "P3"), ("P3", "P4"), ("P2", "Q")])
+    assert select_buses(model, parse_rules([{"rule": "trunk", "every": 2}])) == {"P0", "P2", "P4"}
+
+
+def test_trunk_from_source():
+    model = _model(FEEDER, sources=["A"])
+    # farthest bus from the source is E: A-B-C-D-E, every 2nd hop from A
+    assert select_buses(model, parse_rules([{"rule": "trunk", "every": 2}])) == {"A", "C", "E"}
+
+
+def test_ends_rule_skips_sources():
+    model = _model(FEEDER, sources=["A"])
+    assert select_buses(model, parse_rules([{"rule": "ends"}])) == {"E", "F"}
+
+
+@pytest.mark.parametrize("spec", [
+    [{"rule": "nearest"}],
+    [{"rule": "hops", "k": -1}],
+    [{"rule": "ends", "every": 2}],
+    [{"rule": "hops", "edges": "cables"}],
+    "[{",
+    [],
+])
+def test_parse_rules_errors(spec):
+    with pytest.raises(ValueError, match="pin_rules"):
+        parse_rules(spec)
+
+
+# ---------- sheet: continuation rows and the .pins.json sidecar ----------
+IEEE34 = ROOT / "Examples" / "IEEE_34_node_test_feeder_modified.txt"
+
+
+def _write_pins(out):
+    with WorkbookWriter(out) as xw:
+        Pins.write_pins_sheet(xw, IEEE34)
+
+
+def test_pins_rows_spill_and_sidecar(tmp_path, monkeypatch):
+    analyze_and_set_island_context(IEEE34, per_island_limit=50)
+    set_export_options(None)
+    out = tmp_path / "pins.xlsx"
+    sidecar = out.with_suffix(".pins.json")
+
+    monkeypatch.setattr(Pins, "ROW_PINS", 3)
+    _write_pins(out)
+    manifest = json.loads(sidecar.read_text(encoding="utf-8"))
+    big = next(g for g in manifest["groups"] if g["count"] > 3)
+
+    rows = [r for r in openpyxl.load_workbook(out)["Pins"].iter_rows(values_only=True)
+            if (r[0], r[1]) == (big["direction"], big["group"])]
+    assert len(rows) == -(-big["count"] // 3)
+    assert all(r[2 + 3:] == (None,) * (len(r) - 5) for r in rows)  # at most ROW_PINS pins a row
+    assert [p for r in rows for p in r[2:] if p is not None] == big["pins"]
+
+    # A smaller export (every group fits one row) removes the stale sidecar
+    monkeypatch.setattr(Pins, "ROW_PINS", Pins.MAX_COLS - 2)
+    _write_pins(out)
+    assert not sidecar.exists()
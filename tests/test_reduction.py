@@ -0,0 +1,39 @@
+# tests/test_reduction.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import xml.etree.ElementTree as ET  # noqa: E402
+
+from Modules.General import parse_xml  # noqa: E402
+from Modules.Reduction import LINE_TAGS, _find_chains  # noqa: E402
+
+UNB = ROOT / "Examples" / "UNB Feeders_simple.txt"
+# A six-section chain of UNB; 6124_37 sits in the middle of it
+CHAIN = ["6124_4", "6124_1_27", "6124_37", "6124_1_7", "6124_1_16", "6124_SUB_156-B006"]
+
+
+def _chain_sections(root):
+    return [[s["section_id"] for s in c["sections"]] for c in _find_chains(root)["chains"]]
+
+
+def test_closed_chain_is_merged():
+    assert CHAIN in _chain_sections(parse_xml(UNB))
+
+
+def test_open_section_mid_chain_is_not_merged():
+    root = parse_xml(UNB)
+    sec = next(s for s in root.iter("Section") if s.findtext("SectionID") == "6124_37")
+    line = next(d for d in sec.find("Devices") if d.tag in LINE_TAGS)
+    status = line.find("NormalStatus")
+    if status is None:
+        status = ET.SubElement(line, "NormalStatus")
+    status.text = "Open"
+
+    chains = _chain_sections(root)
+    assert all("6124_37" not in sids for sids in chains)
+    # the closed runs on either side still reduce, without bridging the open section
+    assert CHAIN[:2] in chains
+    assert CHAIN[3:] in chains
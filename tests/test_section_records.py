@@ -0,0 +1,73 @@
+# tests/test_section_records.py
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from Modules import SectionRecords  # noqa: E402
+from Modules.General import input_buffer, parse_xml  # noqa: E402
+from Modules.SectionRecords import (  # noqa: E402
+    SECTION_OPEN, _chunk_prefix, _parse_chunk, parse_sections_parallel, section_blocks, section_chunks,
+    section_model, set_parse_workers, tree_model,
+)
+
+EXAMPLES = sorted((ROOT / "Examples").glob("*.txt"))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Chunks of a few kB so the examples split into many of them
+    monkeypatch.setattr(SectionRecords, "MIN_CHUNK_BYTES", 2048)
+    yield
+    set_parse_workers(1)
+
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=lambda p: p.stem)
+def test_chunks_cut_at_section_starts(path):
+    with input_buffer(path) as buf:
+        blocks = section_blocks(buf)
+        # 700 bytes lands inside a <Section> for every example; the cut moves to the next one
+        chunks = section_chunks(buf, blocks, 700)
+        spans = [span for chunk in chunks for span in chunk]
+        assert all(buf[a:a + len(SECTION_OPEN)] == SECTION_OPEN for a, _b in spans)
+        for a, b in blocks:
+            inside = [(s, e) for s, e in spans if a <= s < b]
+            first = buf.find(SECTION_OPEN, a, b)
+            if first < 0:
+                assert not inside
+                continue
+            # the runs of a block tile it from its first <Section> to </Sections>
+            assert inside[0][0] == first and inside[-1][1] == b
+            assert all(e == s2 for (_s, e), (s2, _e) in zip(inside, inside[1:]))
+
+        prefix = _chunk_prefix(bytes(buf[:4096]))
+    records = [r for chunk in chunks for r in _parse_chunk(str(path), chunk, prefix)]
+    assert records == tree_model(parse_xml(path))["records"]
+
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=lambda p: p.stem)
+def test_parallel_parse_matches_serial(path, small_chunks, tmp_path):
+    copy = tmp_path / path.name  # not in the read_xml cache
+    shutil.copyfile(path, copy)
+    model = parse_sections_parallel(copy, 2, full_tree=False, log=lambda _msg: None)
+    assert model["records"] == tree_model(parse_xml(path))["records"]
+
+
+def test_skeleton_model_not_served_as_full_tree(small_chunks, tmp_path):
+    path = tmp_path / "UNB.txt"
+    shutil.copyfile(ROOT / "Examples" / "UNB Feeders_simple.txt", path)
+    set_parse_workers(2)
+
+    skeleton = section_model(path, full_tree=False, log=lambda _msg: None)
+    assert not skeleton["full_tree"]
+    assert next(skeleton["root"].iter("Section"), None) is None
+
+    full = section_model(path)
+    assert full["full_tree"]
+    assert len(list(full["root"].iter("Section"))) == len(full["records"])
+    assert full["records"] == skeleton["records"]
+    assert section_model(path) is full